@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -5,12 +6,20 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from database import Base, Student, Teacher, TeacherComment, Assignment
-
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# DATABASE_URL wins over alembic.ini so migrations hit the database the app
+# uses; without it the app modules below are pointed at the ini URL
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+else:
+    os.environ["DATABASE_URL"] = config.get_main_option("sqlalchemy.url")
+
+from database import Base
+import models  # noqa: F401, registers the tables on Base.metadata
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -0,0 +1,47 @@
+"""reconcile students with models
+
+Revision ID: 0b5f7d2c9e64
+Revises: e41c6a9f0b38
+Create Date: 2025-09-22 10:14:51.307662
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b5f7d2c9e64'
+down_revision: Union[str, Sequence[str], None] = 'e41c6a9f0b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # models.py has allowed 100 character names and 255 character emails
+    # since the initial revision, the database never followed
+    op.alter_column('students', 'name', existing_type=sa.VARCHAR(length=50), type_=sa.String(length=100), existing_nullable=False)
+    op.alter_column('students', 'email', existing_type=sa.VARCHAR(), type_=sa.String(length=255), existing_nullable=False)
+    # Existing rows have no recorded time, they get the migration time
+    op.add_column('students', sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+    # Submissions look students up by name, which models.py declares unique
+    duplicates = op.get_bind().execute(
+        sa.text("SELECT name FROM students GROUP BY name HAVING count(*) > 1 LIMIT 10")
+    ).scalars().all()
+    if duplicates:
+        raise RuntimeError(f"Duplicate student names must be resolved before this migration: {duplicates}")
+
+    with op.get_context().autocommit_block():
+        op.create_index('students_name_key', 'students', ['name'], unique=True, postgresql_concurrently=True)
+    op.execute("ALTER TABLE students ADD CONSTRAINT students_name_key UNIQUE USING INDEX students_name_key")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('students_name_key', 'students', type_='unique')
+    op.drop_column('students', 'created_at')
+    op.alter_column('students', 'email', existing_type=sa.String(length=255), type_=sa.VARCHAR(), existing_nullable=False)
+    op.alter_column('students', 'name', existing_type=sa.String(length=100), type_=sa.VARCHAR(length=50), existing_nullable=False)
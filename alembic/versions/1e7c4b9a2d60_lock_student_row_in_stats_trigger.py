@@ -0,0 +1,67 @@
+"""lock student row in stats trigger
+
+Revision ID: 1e7c4b9a2d60
+Revises: 8e3b5d7f1c26
+Create Date: 2025-10-15 10:17:26.584013
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e7c4b9a2d60'
+down_revision: Union[str, Sequence[str], None] = '8e3b5d7f1c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _stats_update(subject: str) -> str:
+    return f"""
+        CREATE OR REPLACE FUNCTION assignment_stats_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+                AND OLD.subject = NEW.subject
+                AND OLD.student_id IS NOT DISTINCT FROM NEW.student_id
+                AND (OLD.teacher_comment_id IS NULL) = (NEW.teacher_comment_id IS NULL) THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM assignment_stats_apply(
+                    {subject.format(row='OLD')}, OLD.student_id, -1,
+                    CASE WHEN OLD.teacher_comment_id IS NULL THEN -1 ELSE 0 END
+                );
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM assignment_stats_apply(
+                    {subject.format(row='NEW')}, NEW.student_id, 1,
+                    CASE WHEN NEW.teacher_comment_id IS NULL THEN 1 ELSE 0 END
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The student row is locked whatever its deleted_at, and only then tested.
+    # Filtering on deleted_at IS NOT NULL first read the row as of the
+    # statement's snapshot, where a soft delete still in progress is not
+    # visible, so nothing was locked and nothing waited. Now FOR SHARE waits
+    # for that delete to commit and returns the row as it committed.
+    op.execute(_stats_update(
+        "CASE WHEN (SELECT deleted_at FROM students WHERE id = {row}.student_id FOR SHARE) IS NOT NULL "
+        "THEN NULL ELSE {row}.subject END"
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(_stats_update(
+        "CASE WHEN EXISTS (SELECT 1 FROM students WHERE id = {row}.student_id AND deleted_at IS NOT NULL FOR SHARE) "
+        "THEN NULL ELSE {row}.subject END"
+    ))
@@ -0,0 +1,48 @@
+"""unique among live accounts
+
+Revision ID: 2f8d5c0b3e71
+Revises: 1e7c4b9a2d60
+Create Date: 2025-10-15 11:02:48.913570
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f8d5c0b3e71'
+down_revision: Union[str, Sequence[str], None] = '1e7c4b9a2d60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE_UNIQUE = [
+    ('students_email_live_key', 'students', 'email', 'students_email_key'),
+    ('students_name_live_key', 'students', 'name', 'students_name_key'),
+    ('teachers_email_live_key', 'teachers', 'email', 'teachers_email_key'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A soft-deleted account keeps its row until the reaper gets to it, and
+    # must not keep its email or name from being registered again meanwhile.
+    # The partial indexes are built before the old constraints go, so
+    # uniqueness among live accounts is enforced throughout.
+    with op.get_context().autocommit_block():
+        for index, table, column, _ in LIVE_UNIQUE:
+            op.create_index(index, table, [column], unique=True, postgresql_where=sa.text('deleted_at IS NULL'), postgresql_concurrently=True)
+    for _, table, _, constraint in LIVE_UNIQUE:
+        op.drop_constraint(constraint, table, type_='unique')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fails while a deleted account and a live one share an email or name,
+    # until the reaper has removed the deleted one
+    for _, table, column, constraint in LIVE_UNIQUE:
+        op.create_unique_constraint(constraint, table, [column])
+    with op.get_context().autocommit_block():
+        for index, table, _, _ in LIVE_UNIQUE:
+            op.drop_index(index, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,111 @@
+"""add scope versions
+
+Revision ID: 3a9e6d1c4f82
+Revises: 2f8d5c0b3e71
+Create Date: 2025-10-16 09:26:40.271958
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a9e6d1c4f82'
+down_revision: Union[str, Sequence[str], None] = '2f8d5c0b3e71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The keys a row maps to, as services.table_versions names them
+ASSIGNMENT_KEYS = """
+    SELECT 'subject:' || r.subject FROM {rows} r
+    UNION SELECT 'student:' || s.name FROM {rows} r JOIN students s ON s.id = r.student_id
+"""
+STUDENT_KEYS = """
+    SELECT 'student:' || r.name FROM {rows} r
+"""
+COMMENT_KEYS = """
+    SELECT 'subject:' || a.subject FROM {rows} c JOIN assignments a ON a.teacher_comment_id = c.id
+    UNION SELECT 'student:' || s.name FROM {rows} c
+        JOIN assignments a ON a.teacher_comment_id = c.id JOIN students s ON s.id = a.student_id
+"""
+
+
+def _scope_function(name: str, keys: str, extra_update: str = "") -> str:
+    # One bump per statement, over the keys of every row it wrote. UPDATE
+    # takes the keys of the rows before and after, in a single sorted call.
+    return f"""
+        CREATE FUNCTION {name}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM table_version_bump_keys(ARRAY({keys.format(rows='new_rows')}));
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM table_version_bump_keys(ARRAY({keys.format(rows='old_rows')}));
+            ELSE
+                PERFORM table_version_bump_keys(ARRAY(
+                    {keys.format(rows='new_rows')} UNION {keys.format(rows='old_rows')} {extra_update}
+                ));
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """
+
+
+SCOPED_TABLES = {
+    'assignments': ('assignments_scope_version', ASSIGNMENT_KEYS, ""),
+    # A soft delete or restore moves the student's rows in or out of every
+    # listing by subject they appear in
+    'students': ('students_scope_version', STUDENT_KEYS, """
+        UNION SELECT 'subject:' || a.subject FROM new_rows n
+            JOIN old_rows o ON o.id = n.id AND (o.deleted_at IS NULL) <> (n.deleted_at IS NULL)
+            JOIN assignments a ON a.student_id = n.id
+    """),
+    # A new comment shows once the assignment links it, which bumps on its own
+    'teacher_comments': ('teacher_comments_scope_version', COMMENT_KEYS, ""),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A student's name can be up to 100 characters
+    op.alter_column('table_versions', 'table_name', existing_type=sa.VARCHAR(length=63), type_=sa.VARCHAR(length=255), existing_nullable=False)
+
+    # Keys are created on their first bump and taken in sorted order, so two
+    # statements bumping overlapping sets cannot deadlock on them
+    op.execute("""
+        CREATE FUNCTION table_version_bump_keys(keys text[]) RETURNS void AS $$
+            INSERT INTO table_versions AS v (table_name, version)
+            SELECT DISTINCT key, 1 FROM unnest(keys) AS key WHERE key IS NOT NULL ORDER BY key
+            ON CONFLICT (table_name) DO UPDATE SET version = v.version + 1
+        $$ LANGUAGE sql
+    """)
+
+    for table, (function, keys, extra_update) in SCOPED_TABLES.items():
+        op.execute(_scope_function(function, keys, extra_update))
+        # Transition tables need a trigger per operation; on the assignments
+        # parent they hold the rows of every partition
+        op.execute(f"""
+            CREATE TRIGGER {table}_scope_version_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_scope_version_update AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_scope_version_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, (function, _, _) in SCOPED_TABLES.items():
+        for operation in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER {table}_scope_version_{operation} ON {table}")
+        op.execute(f"DROP FUNCTION {function}()")
+    op.execute("DROP FUNCTION table_version_bump_keys(text[])")
+    op.execute("DELETE FROM table_versions WHERE table_name LIKE '%:%'")
+    op.alter_column('table_versions', 'table_name', existing_type=sa.VARCHAR(length=255), type_=sa.VARCHAR(length=63), existing_nullable=False)
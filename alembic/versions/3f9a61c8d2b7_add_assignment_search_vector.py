@@ -0,0 +1,87 @@
+"""add assignment search vector
+
+Revision ID: 3f9a61c8d2b7
+Revises: 7c2e8f41a5d9
+Create Date: 2025-09-26 14:51:22.486035
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a61c8d2b7'
+down_revision: Union[str, Sequence[str], None] = '7c2e8f41a5d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('assignments', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # 'simple' keeps names and subject codes unstemmed, so prefix queries match
+    # what was typed. Student name and subject outrank the description.
+    op.execute("""
+        CREATE FUNCTION assignments_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce((SELECT name FROM students WHERE id = NEW.student_id), '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.subject, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER assignments_search_vector
+        BEFORE INSERT OR UPDATE OF subject, description, student_id ON assignments
+        FOR EACH ROW EXECUTE FUNCTION assignments_search_vector_update()
+    """)
+
+    # A rename re-indexes the student's submissions; listing subject in the SET
+    # is enough to fire the trigger above
+    op.execute("""
+        CREATE FUNCTION students_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE assignments SET subject = subject WHERE student_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER students_search_vector
+        AFTER UPDATE OF name ON students
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE FUNCTION students_search_vector_update()
+    """)
+
+    # Backfill and index outside one long transaction so writers are only
+    # ever blocked for one batch
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            result = bind.execute(sa.text(
+                "UPDATE assignments SET subject = subject WHERE id IN "
+                "(SELECT id FROM assignments WHERE search_vector IS NULL LIMIT :batch_size)"
+            ), {"batch_size": BACKFILL_BATCH_SIZE})
+            if result.rowcount == 0:
+                break
+
+        op.create_index('ix_assignments_search_vector', 'assignments', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_assignments_search_vector', table_name='assignments', postgresql_concurrently=True)
+    op.execute("DROP TRIGGER students_search_vector ON students")
+    op.execute("DROP FUNCTION students_search_vector_update()")
+    op.execute("DROP TRIGGER assignments_search_vector ON assignments")
+    op.execute("DROP FUNCTION assignments_search_vector_update()")
+    op.drop_column('assignments', 'search_vector')
@@ -0,0 +1,79 @@
+"""shard table versions
+
+Revision ID: 4c6f0a8e2d19
+Revises: 3a9e6d1c4f82
+Create Date: 2025-10-17 14:52:09.638214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c6f0a8e2d19'
+down_revision: Union[str, Sequence[str], None] = '3a9e6d1c4f82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOLD_SHARDS = """
+    WITH folded AS (
+        DELETE FROM table_versions WHERE shard <> 0 RETURNING table_name, version
+    )
+    INSERT INTO table_versions AS v (table_name, shard, version)
+    SELECT table_name, 0, sum(version) FROM folded GROUP BY table_name
+    ON CONFLICT (table_name, shard) DO UPDATE SET version = v.version + excluded.version
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A key's version is the sum of its rows. Every transaction bumps the row
+    # of its own backend, which no other transaction in progress can hold, so
+    # writers to one table or key no longer queue behind each other's row lock
+    # until commit. The existing counts become shard 0, which only the fold
+    # in services.table_versions writes to.
+    op.add_column('table_versions', sa.Column('shard', sa.Integer(), server_default='0', nullable=False))
+    op.drop_constraint('table_versions_pkey', 'table_versions', type_='primary')
+    op.create_primary_key('table_versions_pkey', 'table_versions', ['table_name', 'shard'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION table_version_bump_keys(keys text[]) RETURNS void AS $$
+            INSERT INTO table_versions AS v (table_name, shard, version)
+            SELECT DISTINCT key, pg_backend_pid(), 1 FROM unnest(keys) AS key WHERE key IS NOT NULL
+            ON CONFLICT (table_name, shard) DO UPDATE SET version = v.version + 1
+        $$ LANGUAGE sql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION table_version_bump() RETURNS trigger AS $$
+        BEGIN
+            PERFORM table_version_bump_keys(ARRAY[TG_TABLE_NAME::text]);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(FOLD_SHARDS)
+    op.drop_constraint('table_versions_pkey', 'table_versions', type_='primary')
+    op.drop_column('table_versions', 'shard')
+    op.create_primary_key('table_versions_pkey', 'table_versions', ['table_name'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION table_version_bump_keys(keys text[]) RETURNS void AS $$
+            INSERT INTO table_versions AS v (table_name, version)
+            SELECT DISTINCT key, 1 FROM unnest(keys) AS key WHERE key IS NOT NULL ORDER BY key
+            ON CONFLICT (table_name) DO UPDATE SET version = v.version + 1
+        $$ LANGUAGE sql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION table_version_bump() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
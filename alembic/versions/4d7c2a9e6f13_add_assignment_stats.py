@@ -0,0 +1,111 @@
+"""add assignment stats
+
+Revision ID: 4d7c2a9e6f13
+Revises: 9e0d4b7a6c15
+Create Date: 2025-10-01 10:12:57.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d7c2a9e6f13'
+down_revision: Union[str, Sequence[str], None] = '9e0d4b7a6c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('assignment_subject_stats',
+    sa.Column('subject', sa.VARCHAR(length=25), nullable=False),
+    sa.Column('submissions', sa.BigInteger(), nullable=False),
+    sa.Column('uncommented', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('subject')
+    )
+    op.create_table('assignment_student_stats',
+    sa.Column('student_id', sa.UUID(), nullable=False),
+    sa.Column('submissions', sa.BigInteger(), nullable=False),
+    sa.Column('uncommented', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('student_id')
+    )
+
+    # Adds a delta to both counter rows, creating them on first use and
+    # dropping them when the last submission goes away
+    op.execute("""
+        CREATE FUNCTION assignment_stats_apply(p_subject varchar, p_student_id uuid, p_submissions bigint, p_uncommented bigint)
+        RETURNS void AS $$
+        BEGIN
+            INSERT INTO assignment_subject_stats AS s (subject, submissions, uncommented)
+            VALUES (p_subject, p_submissions, p_uncommented)
+            ON CONFLICT (subject) DO UPDATE
+            SET submissions = s.submissions + EXCLUDED.submissions,
+                uncommented = s.uncommented + EXCLUDED.uncommented;
+            DELETE FROM assignment_subject_stats WHERE subject = p_subject AND submissions = 0;
+
+            IF p_student_id IS NOT NULL THEN
+                INSERT INTO assignment_student_stats AS s (student_id, submissions, uncommented)
+                VALUES (p_student_id, p_submissions, p_uncommented)
+                ON CONFLICT (student_id) DO UPDATE
+                SET submissions = s.submissions + EXCLUDED.submissions,
+                    uncommented = s.uncommented + EXCLUDED.uncommented;
+                DELETE FROM assignment_student_stats WHERE student_id = p_student_id AND submissions = 0;
+            END IF;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION assignment_stats_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+                AND OLD.subject = NEW.subject
+                AND OLD.student_id IS NOT DISTINCT FROM NEW.student_id
+                AND (OLD.teacher_comment_id IS NULL) = (NEW.teacher_comment_id IS NULL) THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM assignment_stats_apply(
+                    OLD.subject, OLD.student_id, -1,
+                    CASE WHEN OLD.teacher_comment_id IS NULL THEN -1 ELSE 0 END
+                );
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM assignment_stats_apply(
+                    NEW.subject, NEW.student_id, 1,
+                    CASE WHEN NEW.teacher_comment_id IS NULL THEN 1 ELSE 0 END
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER assignment_stats
+        AFTER INSERT OR DELETE OR UPDATE OF subject, student_id, teacher_comment_id ON assignments
+        FOR EACH ROW EXECUTE FUNCTION assignment_stats_update()
+    """)
+
+    # CREATE TRIGGER holds off writers until this migration commits, so the
+    # backfill sees every row exactly once: either here or through the trigger
+    op.execute("""
+        INSERT INTO assignment_subject_stats (subject, submissions, uncommented)
+        SELECT subject, count(*), count(*) FILTER (WHERE teacher_comment_id IS NULL)
+        FROM assignments GROUP BY subject
+    """)
+    op.execute("""
+        INSERT INTO assignment_student_stats (student_id, submissions, uncommented)
+        SELECT student_id, count(*), count(*) FILTER (WHERE teacher_comment_id IS NULL)
+        FROM assignments WHERE student_id IS NOT NULL GROUP BY student_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER assignment_stats ON assignments")
+    op.execute("DROP FUNCTION assignment_stats_update()")
+    op.execute("DROP FUNCTION assignment_stats_apply(varchar, uuid, bigint, bigint)")
+    op.drop_table('assignment_student_stats')
+    op.drop_table('assignment_subject_stats')
@@ -0,0 +1,40 @@
+"""add content-addressed file blobs
+
+Revision ID: 5c1e9a7d3b20
+Revises: 282a975db7f2
+Create Date: 2025-09-08 10:12:41.532904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9a7d3b20'
+down_revision: Union[str, Sequence[str], None] = '282a975db7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('file_blobs',
+    sa.Column('sha256', sa.VARCHAR(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.add_column('assignments', sa.Column('blob_sha256', sa.VARCHAR(length=64), nullable=True))
+    op.create_foreign_key('assignments_blob_sha256_fkey', 'assignments', 'file_blobs', ['blob_sha256'], ['sha256'])
+    op.create_index(op.f('ix_assignments_blob_sha256'), 'assignments', ['blob_sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_assignments_blob_sha256'), table_name='assignments')
+    op.drop_constraint('assignments_blob_sha256_fkey', 'assignments', type_='foreignkey')
+    op.drop_column('assignments', 'blob_sha256')
+    op.drop_table('file_blobs')
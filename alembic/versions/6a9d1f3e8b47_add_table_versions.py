@@ -0,0 +1,64 @@
+"""add table versions
+
+Revision ID: 6a9d1f3e8b47
+Revises: f17b9d3c5a82
+Create Date: 2025-10-10 09:41:18.207635
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a9d1f3e8b47'
+down_revision: Union[str, Sequence[str], None] = 'f17b9d3c5a82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ['students', 'teachers', 'assignments', 'teacher_comments']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('table_versions',
+    sa.Column('table_name', sa.VARCHAR(length=63), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute(
+        "INSERT INTO table_versions (table_name, version) VALUES "
+        + ", ".join(f"('{table}', 0)" for table in VERSIONED_TABLES)
+    )
+
+    # Once per statement rather than per row, so a bulk write bumps the
+    # version once. The update takes effect with the writing transaction,
+    # and the row lock it takes at the first write to a table is held until
+    # that transaction ends: writers to one table run one after another from
+    # their first write on, so transactions writing to it must stay short.
+    # Cascaded deletes and SET NULL updates run as statements of their own
+    # and bump the referencing table too.
+    op.execute("""
+        CREATE FUNCTION table_version_bump() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in VERSIONED_TABLES:
+        # On the assignments parent this covers every partition
+        op.execute(f"""
+            CREATE TRIGGER {table}_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION table_version_bump()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_version ON {table}")
+    op.execute("DROP FUNCTION table_version_bump()")
+    op.drop_table('table_versions')
@@ -0,0 +1,35 @@
+"""add hot lookup indexes
+
+Revision ID: 7c2e8f41a5d9
+Revises: 0b5f7d2c9e64
+Create Date: 2025-09-22 10:38:09.914273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e8f41a5d9'
+down_revision: Union[str, Sequence[str], None] = '0b5f7d2c9e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # student_id leads so plain student_id lookups (listing, student deletes)
+    # use it too; the trailing columns serve a student's keyset pages in order
+    with op.get_context().autocommit_block():
+        op.create_index('ix_assignments_student_id_submitted_at_id', 'assignments', ['student_id', 'submitted_at', 'id'], unique=False, postgresql_concurrently=True)
+        # ON DELETE CASCADE from teacher_comments would otherwise scan assignments
+        op.create_index(op.f('ix_assignments_teacher_comment_id'), 'assignments', ['teacher_comment_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_assignments_teacher_comment_id'), table_name='assignments', postgresql_concurrently=True)
+        op.drop_index('ix_assignments_student_id_submitted_at_id', table_name='assignments', postgresql_concurrently=True)
@@ -0,0 +1,141 @@
+"""exclude deleted students from subject stats
+
+Revision ID: 8e3b5d7f1c26
+Revises: 6a9d1f3e8b47
+Create Date: 2025-10-13 14:08:52.730418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3b5d7f1c26'
+down_revision: Union[str, Sequence[str], None] = '6a9d1f3e8b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _stats_update(subject: str) -> str:
+    return f"""
+        CREATE OR REPLACE FUNCTION assignment_stats_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+                AND OLD.subject = NEW.subject
+                AND OLD.student_id IS NOT DISTINCT FROM NEW.student_id
+                AND (OLD.teacher_comment_id IS NULL) = (NEW.teacher_comment_id IS NULL) THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM assignment_stats_apply(
+                    {subject.format(row='OLD')}, OLD.student_id, -1,
+                    CASE WHEN OLD.teacher_comment_id IS NULL THEN -1 ELSE 0 END
+                );
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM assignment_stats_apply(
+                    {subject.format(row='NEW')}, NEW.student_id, 1,
+                    CASE WHEN NEW.teacher_comment_id IS NULL THEN 1 ELSE 0 END
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """
+
+
+def _stats_apply(subject_condition: str) -> str:
+    return f"""
+        CREATE OR REPLACE FUNCTION assignment_stats_apply(p_subject varchar, p_student_id uuid, p_submissions bigint, p_uncommented bigint)
+        RETURNS void AS $$
+        BEGIN
+            IF {subject_condition} THEN
+                INSERT INTO assignment_subject_stats AS s (subject, submissions, uncommented)
+                VALUES (p_subject, p_submissions, p_uncommented)
+                ON CONFLICT (subject) DO UPDATE
+                SET submissions = s.submissions + EXCLUDED.submissions,
+                    uncommented = s.uncommented + EXCLUDED.uncommented;
+                DELETE FROM assignment_subject_stats WHERE subject = p_subject AND submissions = 0;
+            END IF;
+
+            IF p_student_id IS NOT NULL THEN
+                INSERT INTO assignment_student_stats AS s (student_id, submissions, uncommented)
+                VALUES (p_student_id, p_submissions, p_uncommented)
+                ON CONFLICT (student_id) DO UPDATE
+                SET submissions = s.submissions + EXCLUDED.submissions,
+                    uncommented = s.uncommented + EXCLUDED.uncommented;
+                DELETE FROM assignment_student_stats WHERE student_id = p_student_id AND submissions = 0;
+            END IF;
+        END
+        $$ LANGUAGE plpgsql
+    """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A NULL subject now leaves the subject counters alone
+    op.execute(_stats_apply("p_subject IS NOT NULL"))
+
+    # Rows of a soft-deleted student are already out of the subject counters,
+    # so the reaper deleting them, or anything else touching them, must not
+    # count them again. The per-student row is still kept exact. FOR SHARE
+    # waits for a soft delete in progress, and makes one wait for this row,
+    # so a submission racing its student's deletion is counted exactly once.
+    op.execute(_stats_update(
+        "CASE WHEN EXISTS (SELECT 1 FROM students WHERE id = {row}.student_id AND deleted_at IS NOT NULL FOR SHARE) "
+        "THEN NULL ELSE {row}.subject END"
+    ))
+
+    # Takes a student's submissions out of the subject counters when it is
+    # soft-deleted, and puts them back should deleted_at be cleared again
+    op.execute("""
+        CREATE FUNCTION student_subject_stats_update() RETURNS trigger AS $$
+        DECLARE
+            counts record;
+            sign bigint := CASE WHEN NEW.deleted_at IS NULL THEN 1 ELSE -1 END;
+        BEGIN
+            FOR counts IN
+                SELECT subject, count(*) AS submissions,
+                       count(*) FILTER (WHERE teacher_comment_id IS NULL) AS uncommented
+                FROM assignments WHERE student_id = NEW.id GROUP BY subject
+            LOOP
+                PERFORM assignment_stats_apply(counts.subject, NULL, sign * counts.submissions, sign * counts.uncommented);
+            END LOOP;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER student_subject_stats
+        AFTER UPDATE OF deleted_at ON students
+        FOR EACH ROW WHEN ((OLD.deleted_at IS NULL) <> (NEW.deleted_at IS NULL))
+        EXECUTE FUNCTION student_subject_stats_update()
+    """)
+
+    # Students deleted before this migration
+    op.execute("""
+        SELECT assignment_stats_apply(subject, NULL, -submissions, -uncommented) FROM (
+            SELECT a.subject, count(*) AS submissions,
+                   count(*) FILTER (WHERE a.teacher_comment_id IS NULL) AS uncommented
+            FROM assignments a JOIN students s ON s.id = a.student_id
+            WHERE s.deleted_at IS NOT NULL GROUP BY a.subject
+        ) AS counts
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        SELECT assignment_stats_apply(subject, NULL, submissions, uncommented) FROM (
+            SELECT a.subject, count(*) AS submissions,
+                   count(*) FILTER (WHERE a.teacher_comment_id IS NULL) AS uncommented
+            FROM assignments a JOIN students s ON s.id = a.student_id
+            WHERE s.deleted_at IS NOT NULL GROUP BY a.subject
+        ) AS counts
+    """)
+    op.execute("DROP TRIGGER student_subject_stats ON students")
+    op.execute("DROP FUNCTION student_subject_stats_update()")
+    op.execute(_stats_update("{row}.subject"))
+    op.execute(_stats_apply("TRUE"))
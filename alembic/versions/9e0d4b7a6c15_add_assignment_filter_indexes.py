@@ -0,0 +1,38 @@
+"""add assignment filter indexes
+
+Revision ID: 9e0d4b7a6c15
+Revises: 3f9a61c8d2b7
+Create Date: 2025-09-29 09:33:40.172508
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e0d4b7a6c15'
+down_revision: Union[str, Sequence[str], None] = '3f9a61c8d2b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        # Subject filter, walked in keyset order
+        op.create_index('ix_assignments_subject_submitted_at_id', 'assignments', ['subject', 'submitted_at', 'id'], unique=False, postgresql_concurrently=True)
+        # Time-range filters combined with anything else; a few pages per
+        # block range instead of a btree entry per row
+        op.create_index('ix_assignments_submitted_at_brin', 'assignments', ['submitted_at'], unique=False, postgresql_using='brin', postgresql_concurrently=True)
+        # commented=false, the grading queue, only indexes the rows still waiting
+        op.create_index('ix_assignments_uncommented_submitted_at_id', 'assignments', ['submitted_at', 'id'], unique=False, postgresql_where=sa.text('teacher_comment_id IS NULL'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_assignments_uncommented_submitted_at_id', table_name='assignments', postgresql_concurrently=True)
+        op.drop_index('ix_assignments_submitted_at_brin', table_name='assignments', postgresql_concurrently=True)
+        op.drop_index('ix_assignments_subject_submitted_at_id', table_name='assignments', postgresql_concurrently=True)
@@ -0,0 +1,29 @@
+"""add assignments.submitted_at
+
+Revision ID: a3f04b6e91c7
+Revises: 5c1e9a7d3b20
+Create Date: 2025-09-10 16:41:03.118452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f04b6e91c7'
+down_revision: Union[str, Sequence[str], None] = '5c1e9a7d3b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows have no recorded time, they get the migration time
+    op.add_column('assignments', sa.Column('submitted_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('assignments', 'submitted_at')
@@ -0,0 +1,43 @@
+"""link teacher comments to teachers
+
+Revision ID: b62f1e8d04a9
+Revises: 4d7c2a9e6f13
+Create Date: 2025-10-03 15:40:08.215377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b62f1e8d04a9'
+down_revision: Union[str, Sequence[str], None] = '4d7c2a9e6f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_comment_foreign_key(ondelete: str) -> None:
+    # NOT VALID takes the lock only long enough to swap the definition; the
+    # existing rows are checked afterwards without blocking writers
+    op.drop_constraint('assignments_teacher_comment_id_fkey', 'assignments', type_='foreignkey')
+    op.create_foreign_key('assignments_teacher_comment_id_fkey', 'assignments', 'teacher_comments', ['teacher_comment_id'], ['id'], onupdate='CASCADE', ondelete=ondelete, postgresql_not_valid=True)
+    op.execute("ALTER TABLE assignments VALIDATE CONSTRAINT assignments_teacher_comment_id_fkey")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Deleting a comment, or through it a teacher, used to delete the student's submission
+    _replace_comment_foreign_key('SET NULL')
+
+    # ON DELETE CASCADE from teachers would otherwise scan teacher_comments
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_teacher_comments_teacher_id'), 'teacher_comments', ['teacher_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_teacher_comments_teacher_id'), table_name='teacher_comments', postgresql_concurrently=True)
+    _replace_comment_foreign_key('CASCADE')
@@ -0,0 +1,165 @@
+"""partition assignments by month
+
+Revision ID: c3a8e5f27b90
+Revises: b62f1e8d04a9
+Create Date: 2025-10-06 11:05:31.648902
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8e5f27b90'
+down_revision: Union[str, Sequence[str], None] = 'b62f1e8d04a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 3
+
+COLUMNS = "id, student_id, subject, description, filename, teacher_comment_id, blob_sha256, submitted_at, search_vector"
+
+# Indexes of the original table, renamed once it becomes the legacy partition
+LEGACY_INDEXES = [
+    'assignments_pkey',
+    'ix_assignments_blob_sha256',
+    'ix_assignments_teacher_comment_id',
+    'ix_assignments_submitted_at_id',
+    'ix_assignments_student_id_submitted_at_id',
+    'ix_assignments_search_vector',
+    'ix_assignments_subject_submitted_at_id',
+    'ix_assignments_submitted_at_brin',
+    'ix_assignments_uncommented_submitted_at_id',
+]
+
+SEARCH_VECTOR_TRIGGER = """
+    CREATE TRIGGER assignments_search_vector
+    BEFORE INSERT OR UPDATE OF subject, description, student_id ON assignments
+    FOR EACH ROW EXECUTE FUNCTION assignments_search_vector_update()
+"""
+STATS_TRIGGER = """
+    CREATE TRIGGER assignment_stats
+    AFTER INSERT OR DELETE OR UPDATE OF subject, student_id, teacher_comment_id ON assignments
+    FOR EACH ROW EXECUTE FUNCTION assignment_stats_update()
+"""
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The existing table becomes one partition holding everything before the
+    # cutover, so no row is copied. The cutover is two months out: rows written
+    # while this migration runs must still fall below it.
+    cutover = _add_months(_month_start(datetime.now(timezone.utc)), 2)
+
+    # Built without blocking writers; with these in place ATTACH below only
+    # checks the catalog instead of scanning or re-indexing the table
+    with op.get_context().autocommit_block():
+        op.create_index('assignments_legacy_id_submitted_at_key', 'assignments', ['id', 'submitted_at'], unique=True, postgresql_concurrently=True)
+        op.execute(f"ALTER TABLE assignments ADD CONSTRAINT assignments_legacy_bounds CHECK (submitted_at < '{cutover.isoformat()}') NOT VALID")
+        op.execute("ALTER TABLE assignments VALIDATE CONSTRAINT assignments_legacy_bounds")
+
+    op.execute("LOCK TABLE assignments IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER assignments_search_vector ON assignments")
+    op.execute("DROP TRIGGER assignment_stats ON assignments")
+    # A foreign key into a partitioned table would have to include submitted_at
+    op.drop_constraint('processing_jobs_assignment_id_fkey', 'processing_jobs', type_='foreignkey')
+
+    op.rename_table('assignments', 'assignments_legacy')
+    for name in LEGACY_INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('assignments', 'assignments_legacy', 1)}")
+
+    op.create_table('assignments',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('student_id', sa.UUID(), nullable=True),
+    sa.Column('subject', sa.VARCHAR(length=25), nullable=False),
+    sa.Column('description', sa.VARCHAR(length=150), nullable=True),
+    sa.Column('filename', sa.VARCHAR(length=100), nullable=True),
+    sa.Column('teacher_comment_id', sa.UUID(), nullable=True),
+    sa.Column('blob_sha256', sa.VARCHAR(length=64), nullable=True),
+    sa.Column('submitted_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['teacher_comment_id'], ['teacher_comments.id'], onupdate='CASCADE', ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['blob_sha256'], ['file_blobs.sha256'], name='assignments_blob_sha256_fkey'),
+    sa.PrimaryKeyConstraint('id', 'submitted_at'),
+    postgresql_partition_by='RANGE (submitted_at)'
+    )
+    # The parent has no partitions yet, so these are instant; ATTACH adopts the
+    # legacy table's identical indexes and every new partition gets its own
+    op.create_index(op.f('ix_assignments_blob_sha256'), 'assignments', ['blob_sha256'], unique=False)
+    op.create_index(op.f('ix_assignments_teacher_comment_id'), 'assignments', ['teacher_comment_id'], unique=False)
+    op.create_index('ix_assignments_submitted_at_id', 'assignments', ['submitted_at', 'id'], unique=False)
+    op.create_index('ix_assignments_student_id_submitted_at_id', 'assignments', ['student_id', 'submitted_at', 'id'], unique=False)
+    op.create_index('ix_assignments_search_vector', 'assignments', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_assignments_subject_submitted_at_id', 'assignments', ['subject', 'submitted_at', 'id'], unique=False)
+    op.create_index('ix_assignments_submitted_at_brin', 'assignments', ['submitted_at'], unique=False, postgresql_using='brin')
+    op.create_index('ix_assignments_uncommented_submitted_at_id', 'assignments', ['submitted_at', 'id'], unique=False, postgresql_where=sa.text('teacher_comment_id IS NULL'))
+
+    op.execute(f"ALTER TABLE assignments ATTACH PARTITION assignments_legacy FOR VALUES FROM (MINVALUE) TO ('{cutover.isoformat()}')")
+    op.execute("ALTER TABLE assignments_legacy DROP CONSTRAINT assignments_legacy_bounds")
+
+    for offset in range(PARTITIONS_AHEAD):
+        lower = _add_months(cutover, offset)
+        upper = _add_months(cutover, offset + 1)
+        op.execute(
+            f"CREATE TABLE assignments_p{lower:%Y_%m} PARTITION OF assignments "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+    # Catches rows beyond the newest partition, should services.partitions
+    # ever fall behind, instead of failing the insert
+    op.execute("CREATE TABLE assignments_default PARTITION OF assignments DEFAULT")
+
+    # Created on the parent, so every partition, present and future, gets them
+    op.execute(SEARCH_VECTOR_TRIGGER)
+    op.execute(STATS_TRIGGER)
+    # Stands in for processing_jobs' ON DELETE CASCADE. submitted_at is never
+    # updated, so no row moves between partitions (which runs as DELETE + INSERT).
+    op.execute("""
+        CREATE FUNCTION assignments_delete_jobs() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM processing_jobs WHERE assignment_id = OLD.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER assignments_delete_jobs
+        AFTER DELETE ON assignments
+        FOR EACH ROW EXECUTE FUNCTION assignments_delete_jobs()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER assignments_delete_jobs ON assignments")
+    op.execute("DROP FUNCTION assignments_delete_jobs()")
+    op.execute("DROP TRIGGER assignment_stats ON assignments")
+    op.execute("DROP TRIGGER assignments_search_vector ON assignments")
+
+    # Folds every other partition back into the legacy table. Partitions
+    # already detached by services.partitions are left as they are.
+    op.execute("ALTER TABLE assignments DETACH PARTITION assignments_legacy")
+    op.execute(f"INSERT INTO assignments_legacy ({COLUMNS}) SELECT {COLUMNS} FROM assignments")
+    op.drop_table('assignments')
+
+    op.drop_index('assignments_legacy_id_submitted_at_key', table_name='assignments_legacy')
+    for name in LEGACY_INDEXES:
+        op.execute(f"ALTER INDEX {name.replace('assignments', 'assignments_legacy', 1)} RENAME TO {name}")
+    op.rename_table('assignments_legacy', 'assignments')
+
+    op.execute(SEARCH_VECTOR_TRIGGER)
+    op.execute(STATS_TRIGGER)
+    op.create_foreign_key('processing_jobs_assignment_id_fkey', 'processing_jobs', 'assignments', ['assignment_id'], ['id'], ondelete='CASCADE')
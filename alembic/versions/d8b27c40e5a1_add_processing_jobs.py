@@ -0,0 +1,48 @@
+"""add processing jobs
+
+Revision ID: d8b27c40e5a1
+Revises: a3f04b6e91c7
+Create Date: 2025-09-15 09:27:55.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b27c40e5a1'
+down_revision: Union[str, Sequence[str], None] = 'a3f04b6e91c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('processing_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('assignment_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.VARCHAR(length=30), nullable=False),
+    sa.Column('status', sa.VARCHAR(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['assignment_id'], ['assignments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_processing_jobs_assignment_id'), 'processing_jobs', ['assignment_id'], unique=False)
+    op.create_index('ix_processing_jobs_status_run_after', 'processing_jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_processing_jobs_status_run_after', table_name='processing_jobs')
+    op.drop_index(op.f('ix_processing_jobs_assignment_id'), table_name='processing_jobs')
+    op.drop_table('processing_jobs')
@@ -0,0 +1,36 @@
+"""add keyset pagination indexes
+
+Revision ID: e41c6a9f0b38
+Revises: d8b27c40e5a1
+Create Date: 2025-09-18 11:02:37.520914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41c6a9f0b38'
+down_revision: Union[str, Sequence[str], None] = 'd8b27c40e5a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps the tables writable while the indexes build, and it
+    # cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_students_name_id', 'students', ['name', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_teachers_name_id', 'teachers', ['name', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_assignments_submitted_at_id', 'assignments', ['submitted_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_assignments_submitted_at_id', table_name='assignments', postgresql_concurrently=True)
+        op.drop_index('ix_teachers_name_id', table_name='teachers', postgresql_concurrently=True)
+        op.drop_index('ix_students_name_id', table_name='students', postgresql_concurrently=True)
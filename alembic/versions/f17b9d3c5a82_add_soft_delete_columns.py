@@ -0,0 +1,38 @@
+"""add soft delete columns
+
+Revision ID: f17b9d3c5a82
+Revises: c3a8e5f27b90
+Create Date: 2025-10-08 16:22:47.319560
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f17b9d3c5a82'
+down_revision: Union[str, Sequence[str], None] = 'c3a8e5f27b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default, so adding them does not rewrite the tables
+    op.add_column('students', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('teachers', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_students_deleted_at', 'students', ['deleted_at'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL'), postgresql_concurrently=True)
+        op.create_index('ix_teachers_deleted_at', 'teachers', ['deleted_at'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_teachers_deleted_at', table_name='teachers', postgresql_concurrently=True)
+        op.drop_index('ix_students_deleted_at', table_name='students', postgresql_concurrently=True)
+    op.drop_column('teachers', 'deleted_at')
+    op.drop_column('students', 'deleted_at')
@@ -1,23 +1,152 @@
-from fastapi import Depends
+import logging, os, time, uuid
+from fastapi import Depends, Request, Response
 from typing import Annotated
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from services.pool_metrics import PoolMetrics, instrument_engine, timed_pool_class
+from services.replicas import ReplicaRouter
+
+logger = logging.getLogger(__name__)
 
 #create database connection
-DATABASE_URL = ""
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+# Comma separated read replicas; read-only routes use the primary when empty
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a client's reads stay on the primary after it writes, should exceed replica lag
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+PRIMARY_COOKIE = "db_primary_until"
+
+# Pool tuning, see GET /metrics/pool for the numbers to size these from
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 never recycles
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+
+def _async_url(url: str) -> str:
+    # Same database, reached through asyncpg for the request path
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        # Lets replica routing be tried against local SQLite files
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _engine_options(queue_pool, metrics: PoolMetrics) -> dict:
+    if DB_PGBOUNCER:
+        # PgBouncer owns the pooling; a second pool here would only pin server
+        # connections that other clients could be using between transactions
+        return {"poolclass": timed_pool_class(NullPool, metrics), "pool_pre_ping": DB_POOL_PRE_PING}
+    return {
+        "poolclass": timed_pool_class(queue_pool, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
-engine = create_engine(DATABASE_URL)
+
+def _async_connect_args() -> dict:
+    if not DB_PGBOUNCER:
+        return {}
+    # Consecutive transactions can land on different server connections, so
+    # asyncpg must not rely on statements it prepared on an earlier one
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+# Sync engine for background tools and workers that run outside the event loop
+engine = create_engine(DATABASE_URL, **_engine_options(QueuePool, sync_pool_metrics))
 SessionLocal = sessionmaker(autocommit= False, autoflush= False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
-    try:
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_async_connect_args(),
+    **_engine_options(AsyncAdaptedQueuePool, async_pool_metrics),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine, sync_pool_metrics)
+instrument_engine(async_engine, async_pool_metrics)
+
+pool_metrics = {"async": async_pool_metrics, "sync": sync_pool_metrics}
+replica_engines = []
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS):
+    replica_metrics = PoolMetrics(f"replica-{index}")
+    replica_engine = create_async_engine(
+        _async_url(replica_url),
+        connect_args=_async_connect_args(),
+        **_engine_options(AsyncAdaptedQueuePool, replica_metrics),
+    )
+    instrument_engine(replica_engine, replica_metrics)
+    pool_metrics[replica_metrics.name] = replica_metrics
+    replica_engines.append(replica_engine)
+
+replica_router = ReplicaRouter(replica_engines)
+
+def _pin_to_primary(response: Response):
+    # The client's reads stay on the primary until replicas have caught up with its write
+    response.set_cookie(
+        PRIMARY_COOKIE,
+        str(int(time.time()) + READ_YOUR_WRITES_SECONDS),
+        max_age=READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        samesite="lax",
+    )
+
+async def get_db(response: Response):
+    async with AsyncSessionLocal() as db:
+        # Only once something commits; a rejected write rolls back and leaves reads on the replicas
+        event.listen(db.sync_session, "after_commit", lambda session: _pin_to_primary(response))
         yield db
-    finally:
-        db.close()
 
-db_dependency= Annotated[Session, get_db]
+def _reads_from_primary(request: Request) -> bool:
+    try:
+        return int(request.cookies.get(PRIMARY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
 
-Base = declarative_base()
+async def get_read_db(request: Request):
+    # Session for read-only routes: a healthy replica when there is one, the primary otherwise
+    if replica_engines and not _reads_from_primary(request):
+        for replica in replica_router.candidates():
+            db = AsyncSessionLocal(bind=replica)
+            try:
+                # Connect up front so a dead replica fails over before the route runs
+                await db.connection()
+            except (DBAPIError, OSError) as e:
+                await db.close()
+                replica_router.mark_down(replica, e)
+                continue
+
+            replica_router.mark_up(replica)
+            try:
+                yield db
+            finally:
+                await db.close()
+            return
 
+    async with AsyncSessionLocal() as db:
+        yield db
 
+db_dependency= Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+
+Base = declarative_base()
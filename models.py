@@ -1,43 +1,150 @@
 import uuid
 from sqlalchemy.orm import relationship
-from sqlalchemy import TIMESTAMP, UUID, VARCHAR, Column, ForeignKey, String, func
+from sqlalchemy import TIMESTAMP, UUID, VARCHAR, BigInteger, Column, ForeignKey, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from database import Base
 
 
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (
+        # Keyset pagination sort key
+        Index("ix_students_name_id", "name", "id"),
+        # The reaper's queue, only the few rows waiting to be removed
+        Index("ix_students_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        # Unique among live students only, a deleted one waiting for the reaper frees its email and name
+        Index("students_email_live_key", "email", unique=True,
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("students_name_live_key", "name", unique=True,
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, nullable=False, default=uuid.uuid4)
-    name = Column(String(100), nullable=False, unique=True)
-    email = Column(String(255), nullable=False, unique=True)
+    name = Column(String(100), nullable=False)
+    email = Column(String(255), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    # Set by a delete; services.reaper removes the row and its submissions later
+    deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
-    assignments = relationship("Assignment", back_populates="student", cascade="all, delete-orphan")
+    # Rows are removed by the database's ON DELETE CASCADE, never loaded just to be deleted
+    assignments = relationship("Assignment", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Teacher(Base):
     __tablename__ = "teachers"
+    __table_args__ = (
+        Index("ix_teachers_name_id", "name", "id"),
+        Index("ix_teachers_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        Index("teachers_email_live_key", "email", unique=True,
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+    )
 
     id = Column(UUID(as_uuid= True), primary_key=True, default=uuid.uuid4)
     name = Column(VARCHAR(50), nullable= False)
-    email = Column(VARCHAR(), nullable= False, unique=True)
+    email = Column(VARCHAR(), nullable= False)
+    deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
 class TeacherComment(Base):
     __tablename__ = "teacher_comments"
 
     id = Column(UUID(as_uuid= True), primary_key=True, default=uuid.uuid4)
-    teacher_id= Column(UUID(as_uuid= True), ForeignKey("teachers.id", ondelete="CASCADE", onupdate="CASCADE"))
+    teacher_id= Column(UUID(as_uuid= True), ForeignKey("teachers.id", ondelete="CASCADE", onupdate="CASCADE"), index=True)
     comment= Column(VARCHAR(250), nullable= False)
 
+class FileBlob(Base):
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(VARCHAR(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
 class Assignment(Base):
     __tablename__ = "assignments"
+    __table_args__ = (
+        Index("ix_assignments_submitted_at_id", "submitted_at", "id"),
+        Index("ix_assignments_student_id_submitted_at_id", "student_id", "submitted_at", "id"),
+        Index("ix_assignments_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_assignments_subject_submitted_at_id", "subject", "submitted_at", "id"),
+        # Rows arrive in submitted_at order, so block ranges summarise time well at a fraction of a btree's size
+        Index("ix_assignments_submitted_at_brin", "submitted_at", postgresql_using="brin"),
+        # The grading queue: uncommented submissions in submission order
+        Index(
+            "ix_assignments_uncommented_submitted_at_id",
+            "submitted_at",
+            "id",
+            postgresql_where=text("teacher_comment_id IS NULL"),
+        ),
+        # Monthly partitions, created ahead of time by services.partitions
+        {"postgresql_partition_by": "RANGE (submitted_at)"},
+    )
 
+    # The partition key has to be part of the primary key; the ORM still
+    # identifies an assignment by id alone (see __mapper_args__)
     id= Column(UUID(as_uuid= True), primary_key=True, default=uuid.uuid4)
     student_id= Column(UUID(as_uuid= True), ForeignKey("students.id", ondelete="CASCADE", onupdate="CASCADE"))
     subject= Column(VARCHAR(25), nullable=False)
     description = Column(VARCHAR(150), nullable=True)
     filename= Column(VARCHAR(100), nullable= True)
-    teacher_comment_id= Column(UUID(as_uuid= True), ForeignKey("teacher_comments.id", ondelete="CASCADE", onupdate="CASCADE"))
+    # Removing a comment (or the teacher who wrote it) puts the submission back in the grading queue
+    teacher_comment_id= Column(UUID(as_uuid= True), ForeignKey("teacher_comments.id", ondelete="SET NULL", onupdate="CASCADE"), index=True)
+    blob_sha256= Column(VARCHAR(64), ForeignKey("file_blobs.sha256"), nullable=True, index=True)
+    submitted_at= Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False, server_default=func.now())
+    # Maintained by the assignments_search_vector trigger, never written by the app
+    search_vector= Column(TSVECTOR, nullable=True)
+
+    student = relationship("Student", back_populates="assignments")
+
+    __mapper_args__ = {"primary_key": [id]}
+
+class AssignmentSubjectStats(Base):
+    # Maintained by the assignment_stats trigger in the same transaction as the
+    # assignment write, never written by the app
+    __tablename__ = "assignment_subject_stats"
 
+    subject= Column(VARCHAR(25), primary_key=True)
+    submissions= Column(BigInteger, nullable=False, default=0)
+    uncommented= Column(BigInteger, nullable=False, default=0)
 
+class AssignmentStudentStats(Base):
+    # Same trigger as above. No foreign key: deleting a student cascades to
+    # its assignments, whose triggers drop this row once it reaches zero.
+    __tablename__ = "assignment_student_stats"
+
+    student_id= Column(UUID(as_uuid= True), primary_key=True)
+    submissions= Column(BigInteger, nullable=False, default=0)
+    uncommented= Column(BigInteger, nullable=False, default=0)
+
+class TableVersion(Base):
+    # Bumped by a statement-level trigger on every write to the table, in the
+    # writing transaction; services.etag builds ETags from these. Also holds
+    # the student:<name> and subject:<subject> keys of services.table_versions.
+    # A key's version is the sum of its shards, one per writing backend.
+    __tablename__ = "table_versions"
+
+    table_name= Column(VARCHAR(255), primary_key=True)
+    shard= Column(Integer, primary_key=True, default=0, server_default="0")
+    version= Column(BigInteger, nullable=False, default=0)
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+    __table_args__ = (
+        Index("ix_processing_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id= Column(UUID(as_uuid= True), primary_key=True, default=uuid.uuid4)
+    # No foreign key: a partitioned assignments table can only be referenced
+    # together with submitted_at. The assignments_delete_jobs trigger stands in
+    # for ON DELETE CASCADE.
+    assignment_id= Column(UUID(as_uuid= True), nullable=False, index=True)
+    kind= Column(VARCHAR(30), nullable=False)
+    status= Column(VARCHAR(20), nullable=False, default="pending")
+    attempts= Column(Integer, nullable=False, default=0)
+    max_attempts= Column(Integer, nullable=False, default=5)
+    run_after= Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    locked_at= Column(TIMESTAMP(timezone=True), nullable=True)
+    result= Column(JSONB, nullable=True)
+    error= Column(Text, nullable=True)
+    created_at= Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    updated_at= Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
@@ -1,15 +1,37 @@
+from datetime import datetime
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, Form, File, UploadFile, status, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Form, File, Header, Query, Request, Response, UploadFile, status, HTTPException
+from fastapi.responses import RedirectResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 import models
-from database import get_db
-from schemas.assignment import AssignmentOut
+from database import get_db, get_read_db
+from schemas.assignment import (
+    AssignmentFilters,
+    AssignmentOut,
+    AssignmentSearchOut,
+    CommentBatchIn,
+    CommentBatchOut,
+    DirectUploadConfirm,
+    DirectUploadCreate,
+    DirectUploadOut,
+    ProcessingJobOut,
+    UploadSessionCreate,
+    UploadSessionOut,
+)
+from schemas.pagination import Page
 from services.assignment import AssignmentService
+from services.etag import conditional_get
+from services.file_transfer import file_response
+from services.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from services.zip_export import stream_zip
 import logging
 
 logger = logging.getLogger(__name__)
 
 assignment_router = APIRouter(prefix="/assignment", tags=["assignment"])
+# Listings show the student name and comment text, and hide deleted students
+assignments_etag = conditional_get("assignments", "students", "teacher_comments")
 
 @assignment_router.post("/", status_code=status.HTTP_201_CREATED, response_model=AssignmentOut)
 async def submit_assignment(
@@ -17,7 +39,7 @@ async def submit_assignment(
     subject: str = Form(...),
     description: str = Form(...),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         return await AssignmentService.submit_assignment(
@@ -36,22 +58,113 @@ async def submit_assignment(
             detail="An unexpected error occurred"
         )
 
-@assignment_router.get("/", status_code=status.HTTP_200_OK, response_model=list[AssignmentOut])
-def get_all_assignments(db: Session = Depends(get_db)):
+@assignment_router.post("/uploads", status_code=status.HTTP_201_CREATED, response_model=UploadSessionOut)
+async def create_upload_session(session_in: UploadSessionCreate, response: Response, db: AsyncSession = Depends(get_db)):
     try:
-        assignments = db.query(models.Assignment).join(models.Student).all()
-
-        results = []
-        for a in assignments:
-            results.append({
-                "id": a.id,
-                "student_name": a.student.name if a.student else "Unknown",
-                "subject": a.subject,
-                "description": a.description,
-                "filename": a.filename,
-                "comments": a.comments,
-            })
-        return results
+        session = await AssignmentService.create_upload_session(db, session_in)
+        response.headers["Upload-Offset"] = "0"
+        return session
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in create_upload_session endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.get("/uploads/{session_id}", status_code=status.HTTP_200_OK, response_model=UploadSessionOut)
+def get_upload_session(session_id: UUID, response: Response):
+    session = AssignmentService.get_upload_session(session_id)
+    response.headers["Upload-Offset"] = str(session["offset"])
+    response.headers["Cache-Control"] = "no-store"
+    return session
+
+@assignment_router.patch("/uploads/{session_id}", status_code=status.HTTP_200_OK, response_model=UploadSessionOut)
+async def upload_chunk(
+    session_id: UUID,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+):
+    try:
+        offset = await AssignmentService.append_upload_chunk(session_id, upload_offset, request.stream())
+        session = AssignmentService.get_upload_session(session_id)
+        response.headers["Upload-Offset"] = str(offset)
+        return session
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in upload_chunk endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.post("/uploads/{session_id}/complete", status_code=status.HTTP_201_CREATED, response_model=AssignmentOut)
+async def complete_upload_session(session_id: UUID, db: AsyncSession = Depends(get_db)):
+    try:
+        return await AssignmentService.complete_upload_session(session_id, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in complete_upload_session endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.delete("/uploads/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def cancel_upload_session(session_id: UUID):
+    try:
+        AssignmentService.cancel_upload_session(session_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in cancel_upload_session endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.post("/direct-uploads", status_code=status.HTTP_200_OK, response_model=DirectUploadOut)
+async def create_direct_upload(upload_in: DirectUploadCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        return await AssignmentService.create_direct_upload(db, upload_in)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in create_direct_upload endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.post("/direct-uploads/confirm", status_code=status.HTTP_201_CREATED, response_model=AssignmentOut)
+async def confirm_direct_upload(upload_in: DirectUploadConfirm, db: AsyncSession = Depends(get_db)):
+    try:
+        return await AssignmentService.confirm_direct_upload(db, upload_in)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in confirm_direct_upload endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.get("/", status_code=status.HTTP_200_OK, response_model=Page[AssignmentOut], dependencies=[Depends(assignments_etag)])
+async def get_all_assignments(
+    filters: AssignmentFilters = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    try:
+        return await AssignmentService.get_all_assignments(db, filters, cursor, limit, include_total)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving all assignments: {str(e)}")
         raise HTTPException(
@@ -59,10 +172,37 @@ def get_all_assignments(db: Session = Depends(get_db)):
             detail="Failed to retrieve assignments"
         )
 
-@assignment_router.get("/student/{student_name}", status_code=status.HTTP_200_OK, response_model=list[AssignmentOut])
-def get_assignments_by_student_name(student_name: str, db: Session = Depends(get_db)):
+@assignment_router.get("/search", status_code=status.HTTP_200_OK, response_model=Page[AssignmentSearchOut], dependencies=[Depends(assignments_etag)])
+async def search_assignments(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+):
+    try:
+        return await AssignmentService.search_assignments(db, q, cursor, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in search_assignments endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while searching assignments"
+        )
+
+@assignment_router.get("/student/{student_name}", status_code=status.HTTP_200_OK, response_model=Page[AssignmentOut], dependencies=[Depends(assignments_etag)])
+async def get_assignments_by_student_name(
+    student_name: str,
+    filters: AssignmentFilters = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
     try:
-        assignments = AssignmentService.get_assignments_by_student_name(db, student_name)
+        assignments = await AssignmentService.get_assignments_by_student_name(
+            db, student_name, filters, cursor, limit, include_total
+        )
         return assignments
     except HTTPException:
         raise
@@ -73,10 +213,68 @@ def get_assignments_by_student_name(student_name: str, db: Session = Depends(get
             detail="An unexpected error occurred"
         )
 
+@assignment_router.get("/export", status_code=status.HTTP_200_OK)
+async def export_assignments(
+    subject: str | None = None,
+    student_name: str | None = None,
+    submitted_from: datetime | None = None,
+    submitted_to: datetime | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    try:
+        entries = await AssignmentService.get_export_entries(db, subject, student_name, submitted_from, submitted_to)
+        return StreamingResponse(
+            stream_zip(entries),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="assignments.zip"'},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in export_assignments endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.get("/{assignment_id}/file", status_code=status.HTTP_200_OK)
+async def download_assignment_file(assignment_id: UUID, request: Request, db: AsyncSession = Depends(get_read_db)):
+    try:
+        stored = await AssignmentService.get_assignment_file(db, assignment_id)
+        if "url" in stored:
+            return RedirectResponse(stored["url"], status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        return file_response(request, stored["path"], stored["filename"], stored["etag"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in download_assignment_file endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
+@assignment_router.get("/{assignment_id}/processing", status_code=status.HTTP_200_OK, response_model=list[ProcessingJobOut])
+async def get_processing_results(assignment_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    try:
+        return await AssignmentService.get_processing_results(db, assignment_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in get_processing_results endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
+
 @assignment_router.patch("/{assignment_id}/comment", response_model=AssignmentOut)
-def add_comment(assignment_id: UUID, comment: str, db: Session = Depends(get_db)):
+async def add_comment(
+    assignment_id: UUID,
+    comment: str,
+    teacher_id: Optional[UUID] = None,
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        result = AssignmentService.add_teacher_comment(db, assignment_id, comment)
+        result = await AssignmentService.add_teacher_comment(db, assignment_id, comment, teacher_id)
         return result
     except HTTPException:
         raise
@@ -85,4 +283,17 @@ def add_comment(assignment_id: UUID, comment: str, db: Session = Depends(get_db)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
-        )
\ No newline at end of file
+        )
+
+@assignment_router.post("/comments", status_code=status.HTTP_200_OK, response_model=CommentBatchOut)
+async def add_comments(batch: CommentBatchIn, db: AsyncSession = Depends(get_db)):
+    try:
+        return await AssignmentService.add_teacher_comments(db, batch)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in add_comments endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
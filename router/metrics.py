@@ -0,0 +1,49 @@
+import logging
+from fastapi import APIRouter, HTTPException, Response, status
+from database import pool_metrics, replica_router
+from services.cache import response_cache, to_prometheus as cache_to_prometheus
+from services.pool_metrics import to_prometheus
+
+
+logger = logging.getLogger(__name__)
+
+metrics_router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@metrics_router.get("/pool", status_code=status.HTTP_200_OK)
+def get_pool_metrics(format: str = "json"):
+    try:
+        snapshot = {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+        if format == "prometheus":
+            return Response(content=to_prometheus(snapshot), media_type="text/plain; version=0.0.4")
+        return snapshot
+    except Exception as e:
+        logger.error(f"Unexpected error in get_pool_metrics endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while retrieving pool metrics"
+        )
+
+@metrics_router.get("/replicas", status_code=status.HTTP_200_OK)
+def get_replica_status():
+    try:
+        return replica_router.status()
+    except Exception as e:
+        logger.error(f"Unexpected error in get_replica_status endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while retrieving replica status"
+        )
+
+@metrics_router.get("/cache", status_code=status.HTTP_200_OK)
+def get_cache_metrics(format: str = "json"):
+    try:
+        snapshot = response_cache.snapshot()
+        if format == "prometheus":
+            return Response(content=cache_to_prometheus(snapshot), media_type="text/plain; version=0.0.4")
+        return snapshot
+    except Exception as e:
+        logger.error(f"Unexpected error in get_cache_metrics endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while retrieving cache metrics"
+        )
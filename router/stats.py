@@ -0,0 +1,48 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, status, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_db
+from schemas.pagination import Page
+from schemas.stats import AssignmentStatsOut, StudentStatsOut
+from services.etag import conditional_get
+from services.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from services.stats import stats_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+stats_router = APIRouter(prefix="/stats", tags=["stats"])
+# The counters are written by the assignments triggers, in the same statements,
+# and by the students trigger when a student is soft-deleted
+assignment_stats_etag = conditional_get("assignments", "students")
+student_stats_etag = conditional_get("assignments", "students")
+
+@stats_router.get("/assignments", status_code=status.HTTP_200_OK, response_model=AssignmentStatsOut, dependencies=[Depends(assignment_stats_etag)])
+async def get_assignment_stats(db: AsyncSession = Depends(get_read_db)):
+    try:
+        return await stats_service.get_assignment_stats(db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in get_assignment_stats endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while retrieving assignment stats"
+        )
+
+@stats_router.get("/students", status_code=status.HTTP_200_OK, response_model=Page[StudentStatsOut], dependencies=[Depends(student_stats_etag)])
+async def get_student_stats(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+):
+    try:
+        return await stats_service.get_student_stats(db, cursor, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in get_student_stats endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while retrieving student stats"
+        )
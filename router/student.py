@@ -1,21 +1,28 @@
-from typing import List
+from typing import Any, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
-from database import get_db
+from database import get_db, get_read_db
+from schemas.bulk_import import BulkImportOut
+from schemas.pagination import Page
 from schemas.student import StudentCreate, StudentOut
+from services.bulk_import import BulkImportError, read_csv_rows
+from services.etag import conditional_get
+from services.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from services.student import student_service
 
 
 logger = logging.getLogger(__name__)
 
 student_router = APIRouter(prefix="/student", tags=["student"])
+students_etag = conditional_get("students")
 
 @student_router.post("/", status_code=status.HTTP_201_CREATED, response_model=StudentOut)
-def register_student(student_in: StudentCreate, db: Session = Depends(get_db)):
+async def register_student(student_in: StudentCreate, db: AsyncSession = Depends(get_db)):
     try:
-        student_data = student_service.create_student(db, student_in)
+        student_data = await student_service.create_student(db, student_in)
         return student_data
     except HTTPException:
         raise
@@ -26,10 +33,52 @@ def register_student(student_in: StudentCreate, db: Session = Depends(get_db)):
             detail="An unexpected error occurred while registering student"
         )
 
-@student_router.get("/", status_code=status.HTTP_200_OK, response_model=List[StudentOut])
-def get_all_students(db: Session = Depends(get_db)):
+@student_router.post("/bulk", status_code=status.HTTP_200_OK, response_model=BulkImportOut)
+async def bulk_register_students(rows: list[Any] = Body(...), db: AsyncSession = Depends(get_db)):
     try:
-        return student_service.get_all_students(db)
+        return await student_service.bulk_create_students(db, rows)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in bulk_register_students endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while importing students"
+        )
+
+@student_router.post("/bulk/csv", status_code=status.HTTP_200_OK, response_model=BulkImportOut)
+async def bulk_register_students_csv(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
+    try:
+        rows = await run_in_threadpool(read_csv_rows, file.file)
+        return await student_service.bulk_create_students(db, rows)
+    except BulkImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV must be UTF-8 encoded"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in bulk_register_students_csv endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while importing students"
+        )
+
+@student_router.get("/", status_code=status.HTTP_200_OK, response_model=Page[StudentOut], dependencies=[Depends(students_etag)])
+async def get_all_students(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    try:
+        return await student_service.get_all_students(db, cursor, limit, include_total)
     except HTTPException:
         raise
     except Exception as e:
@@ -39,10 +88,10 @@ def get_all_students(db: Session = Depends(get_db)):
             detail="An unexpected error occurred while retrieving students"
         )
 
-@student_router.get("/{student_id}", status_code=status.HTTP_200_OK, response_model=StudentOut)
-def get_student(student_id: UUID, db: Session = Depends(get_db)):
+@student_router.get("/{student_id}", status_code=status.HTTP_200_OK, response_model=StudentOut, dependencies=[Depends(students_etag)])
+async def get_student(student_id: UUID, db: AsyncSession = Depends(get_read_db)):
     try:
-        return student_service.get_student_by_id(db, student_id)
+        return await student_service.get_student_by_id(db, student_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -53,9 +102,9 @@ def get_student(student_id: UUID, db: Session = Depends(get_db)):
         )
 
 @student_router.delete("/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_student(student_id: UUID, db: Session = Depends(get_db)):
+async def delete_student(student_id: UUID, db: AsyncSession = Depends(get_db)):
     try:
-        return student_service.delete_student(db, student_id)
+        return await student_service.delete_student(db, student_id)
     except HTTPException:
         raise
     except Exception as e:
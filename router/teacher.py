@@ -1,21 +1,28 @@
-from typing import List
+from typing import Any, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
-from database import get_db
+from database import get_db, get_read_db
+from schemas.bulk_import import BulkImportOut
+from schemas.pagination import Page
 from schemas.teacher import TeacherCreate, TeacherOut
+from services.bulk_import import BulkImportError, read_csv_rows
+from services.etag import conditional_get
+from services.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from services.teacher import teacher_service
 
 
 logger = logging.getLogger(__name__)
 
 teacher_router = APIRouter(prefix="/teacher", tags=["teacher"])
+teachers_etag = conditional_get("teachers")
 
 @teacher_router.post("/", status_code=status.HTTP_201_CREATED, response_model=TeacherOut)
-def register_teacher(teacher_in: TeacherCreate, db: Session = Depends(get_db)):
+async def register_teacher(teacher_in: TeacherCreate, db: AsyncSession = Depends(get_db)):
     try:
-        teacher_data = teacher_service.create_teacher(db, teacher_in)
+        teacher_data = await teacher_service.create_teacher(db, teacher_in)
         return teacher_data
     except HTTPException:
         raise
@@ -26,10 +33,52 @@ def register_teacher(teacher_in: TeacherCreate, db: Session = Depends(get_db)):
             detail="An unexpected error occurred while registering teacher"
         )
 
-@teacher_router.get("/", status_code=status.HTTP_200_OK, response_model=List[TeacherOut])
-def get_all_teachers(db: Session = Depends(get_db)):
+@teacher_router.post("/bulk", status_code=status.HTTP_200_OK, response_model=BulkImportOut)
+async def bulk_register_teachers(rows: list[Any] = Body(...), db: AsyncSession = Depends(get_db)):
     try:
-        return teacher_service.get_all_teachers(db)
+        return await teacher_service.bulk_create_teachers(db, rows)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in bulk_register_teachers endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while importing teachers"
+        )
+
+@teacher_router.post("/bulk/csv", status_code=status.HTTP_200_OK, response_model=BulkImportOut)
+async def bulk_register_teachers_csv(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
+    try:
+        rows = await run_in_threadpool(read_csv_rows, file.file)
+        return await teacher_service.bulk_create_teachers(db, rows)
+    except BulkImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV must be UTF-8 encoded"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in bulk_register_teachers_csv endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while importing teachers"
+        )
+
+@teacher_router.get("/", status_code=status.HTTP_200_OK, response_model=Page[TeacherOut], dependencies=[Depends(teachers_etag)])
+async def get_all_teachers(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    try:
+        return await teacher_service.get_all_teachers(db, cursor, limit, include_total)
     except HTTPException:
         raise
     except Exception as e:
@@ -39,10 +88,10 @@ def get_all_teachers(db: Session = Depends(get_db)):
             detail="An unexpected error occurred while retrieving teachers"
         )
 
-@teacher_router.get("/{teacher_id}", status_code=status.HTTP_200_OK, response_model=TeacherOut)
-def get_teacher(teacher_id: UUID, db: Session = Depends(get_db)):
+@teacher_router.get("/{teacher_id}", status_code=status.HTTP_200_OK, response_model=TeacherOut, dependencies=[Depends(teachers_etag)])
+async def get_teacher(teacher_id: UUID, db: AsyncSession = Depends(get_read_db)):
     try:
-        return teacher_service.get_teacher_by_id(db, teacher_id)
+        return await teacher_service.get_teacher_by_id(db, teacher_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -54,9 +103,9 @@ def get_teacher(teacher_id: UUID, db: Session = Depends(get_db)):
 
 
 @teacher_router.put("/{teacher_id}", status_code=status.HTTP_200_OK, response_model=TeacherOut)
-def update_teacher(teacher_id: UUID, teacher_in: TeacherCreate, db: Session = Depends(get_db)):
+async def update_teacher(teacher_id: UUID, teacher_in: TeacherCreate, db: AsyncSession = Depends(get_db)):
     try:
-        return teacher_service.update_teacher(db, teacher_id, teacher_in)
+        return await teacher_service.update_teacher(db, teacher_id, teacher_in)
     except HTTPException:
         raise
     except Exception as e:
@@ -67,9 +116,9 @@ def update_teacher(teacher_id: UUID, teacher_in: TeacherCreate, db: Session = De
         )
 
 @teacher_router.delete("/{teacher_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_teacher(teacher_id: UUID, db: Session = Depends(get_db)):
+async def delete_teacher(teacher_id: UUID, db: AsyncSession = Depends(get_db)):
     try:
-        return teacher_service.delete_teacher(db, teacher_id)
+        return await teacher_service.delete_teacher(db, teacher_id)
     except HTTPException:
         raise
     except Exception as e:
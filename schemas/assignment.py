@@ -1,6 +1,7 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, Literal, Optional
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AssignmentBase(BaseModel):
@@ -28,4 +29,83 @@ class AssignmentOut(BaseModel):
 
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+class AssignmentFilters(BaseModel):
+    subject: Optional[str] = None
+    student_name: Optional[str] = None
+    submitted_from: Optional[datetime] = None
+    # Exclusive, so consecutive ranges never overlap
+    submitted_to: Optional[datetime] = None
+    commented: Optional[bool] = None
+    sort: Literal["newest", "oldest"] = "newest"
+
+class AssignmentSearchOut(AssignmentOut):
+    rank: float
+
+class CommentBatchItem(BaseModel):
+    assignment_id: UUID
+    comment: str
+
+class CommentBatchIn(BaseModel):
+    teacher_id: UUID
+    items: list[CommentBatchItem]
+
+class CommentResult(BaseModel):
+    # Zero-based position in the submitted items
+    row: int
+    assignment_id: UUID
+    status: Literal["created", "updated", "not_found", "duplicate", "invalid"]
+    error: Optional[str] = None
+
+class CommentBatchOut(BaseModel):
+    created: int
+    updated: int
+    not_found: int
+    duplicate: int
+    invalid: int
+    rows: list[CommentResult]
+
+class UploadSessionCreate(BaseModel):
+    name: str
+    subject: str
+    description: str
+    filename: str
+    size: int
+
+class UploadSessionOut(BaseModel):
+    id: UUID
+    offset: int
+    size: int
+    expires_at: datetime
+
+class DirectUploadCreate(BaseModel):
+    name: str
+    subject: str
+    description: str
+    filename: str
+    size: int
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+
+class DirectUploadConfirm(DirectUploadCreate):
+    upload_id: UUID
+
+class DirectUploadOut(BaseModel):
+    upload_required: bool
+    upload_id: Optional[UUID] = None
+    url: Optional[str] = None
+    method: Optional[str] = None
+    headers: dict[str, str] = {}
+    expires_in: Optional[int] = None
+
+class ProcessingJobOut(BaseModel):
+    kind: str
+    status: str
+    attempts: int
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    updated_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
@@ -0,0 +1,19 @@
+from typing import Literal, Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class BulkRowResult(BaseModel):
+    # Zero-based position in the submitted array, or among the CSV data rows
+    row: int
+    status: Literal["created", "duplicate", "invalid"]
+    name: Optional[str] = None
+    email: Optional[str] = None
+    id: Optional[UUID] = None
+    error: Optional[str] = None
+
+class BulkImportOut(BaseModel):
+    created: int
+    duplicate: int
+    invalid: int
+    rows: list[BulkRowResult]
@@ -0,0 +1,14 @@
+from typing import Generic, Optional, TypeVar
+from pydantic import BaseModel
+
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    # Pass back as ?cursor= for the following page, null on the last page
+    next: Optional[str] = None
+    limit: int
+    # Estimated row count, only filled in when include_total=true
+    total: Optional[int] = None
@@ -0,0 +1,20 @@
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class SubjectStatsOut(BaseModel):
+    subject: str
+    submissions: int
+    uncommented: int
+
+class AssignmentStatsOut(BaseModel):
+    submissions: int
+    # Submissions still waiting for a teacher comment
+    uncommented: int
+    subjects: list[SubjectStatsOut]
+
+class StudentStatsOut(BaseModel):
+    student_id: UUID
+    student_name: str
+    submissions: int
+    uncommented: int
@@ -1,34 +1,146 @@
-import uuid, logging, os, models
+import base64, hashlib, uuid, logging, os, re, models
+from datetime import datetime
 from fastapi import HTTPException, status, UploadFile
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import column, exists, func, literal, select, update, values
+from sqlalchemy.dialects.postgresql import REAL, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from services.blob_store import (
+    UPLOAD_DIR,
+    MAX_FILE_SIZE,
+    FileTooLargeError,
+    acquire_blob,
+    blob_exists,
+    blob_key,
+    hash_file,
+    hash_upload,
+    resolve_assignment_path,
+    staging_key,
+    store_file,
+    store_upload,
+)
+from services import upload_session
+from services.cache import cached
+from services.pagination import InvalidCursorError, estimate_total, paginate
+from services.processing import enqueue_jobs
+from services.query_budget import query_budget
+from services.storage import DirectUploadNotSupported, get_storage
+from services.table_versions import student_scope, subject_scope
+from schemas.assignment import AssignmentFilters, CommentBatchIn, DirectUploadConfirm, DirectUploadCreate, UploadSessionCreate
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-UPLOAD_DIR = "assignments"
-MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
 ALLOWED_FILE_TYPES = {".pdf", ".doc", ".docx", ".txt", ".zip"}
 
+# Must match the configuration used by the assignments_search_vector trigger
+SEARCH_CONFIG = "simple"
+SEARCH_TERM = re.compile(r"\w+")
+MAX_SEARCH_TERMS = 8
+
+COMMENT_MAX_LENGTH = 250  # teacher_comments.comment
+BATCH_MAX_COMMENTS = 500  # items per grading batch, keeps bind parameters per statement bounded
+
+
+def _filtered_scope(filters: AssignmentFilters, *args, **kwargs):
+    # A student or subject filter confines the listing to rows whose writes bump that key
+    if filters.student_name:
+        return [student_scope(filters.student_name)]
+    if filters.subject:
+        return [subject_scope(filters.subject)]
+    return None
+
 
 class AssignmentService:
+    @staticmethod
+    async def _get_student_or_404(db: AsyncSession, student_name: str):
+        result = await db.execute(
+            select(models.Student).where(models.Student.name == student_name, models.Student.deleted_at.is_(None))
+        )
+        student = result.scalars().first()
+        if not student:
+            logger.warning(f"Student '{student_name}' not found")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Student '{student_name}' not found"
+            )
+        return student
+
+    @staticmethod
+    def _validate_file_extension(filename: str) -> str:
+        file_extension = os.path.splitext(filename)[1].lower()
+        if file_extension not in ALLOWED_FILE_TYPES:
+            logger.error(f"Invalid file type: {file_extension}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_FILE_TYPES)}"
+            )
+        return file_extension
+
+    @staticmethod
+    async def _create_assignment_record(
+            db: AsyncSession,
+            student,
+            subject: str,
+            description: str,
+            file_extension: str,
+            sha256: str,
+            file_size: int,
+    ):
+        filename = f"{student.name}-{uuid.uuid4()}{file_extension}"
+
+        try:
+            new_assignment = models.Assignment(
+                student_id=student.id,
+                subject=subject,
+                description=description,
+                filename=filename,
+                blob_sha256=sha256,
+            )
+
+            await db.run_sync(acquire_blob, sha256, file_size)
+            db.add(new_assignment)
+            await db.flush()
+            # Same transaction, so a committed assignment always has its jobs queued
+            enqueue_jobs(db, new_assignment.id, file_extension)
+            await db.commit()
+            await db.refresh(new_assignment)
+
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Database error while creating assignment: {str(e)}")
+            # A blob this request wrote is left for the reconciler: once past its
+            # grace period it is removed if no row claimed it, while removing it
+            # here could race a submission of the same content
+
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to save assignment record"
+            )
+
+        logger.info(f"Assignment submitted successfully: {new_assignment.id}")
+
+        return {
+            "id": new_assignment.id,
+            "student_name": student.name,
+            "subject": new_assignment.subject,
+            "description": new_assignment.description,
+            "filename": new_assignment.filename,
+            "comment": None,
+        }
+
     @staticmethod
     async def submit_assignment(
             student_name: str,
             subject: str,
             description: str,
             file: UploadFile,
-            db: Session,
+            db: AsyncSession,
     ):
         try:
-            student = db.query(models.Student).filter(models.Student.name == student_name).first()
-            if not student:
-                logger.warning(f"Student '{student_name}' not found")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Student '{student_name}' not found"
-                )
+            student = await AssignmentService._get_student_or_404(db, student_name)
 
             if not file or not file.filename:
                 logger.error("No file provided in request")
@@ -37,124 +149,327 @@ class AssignmentService:
                     detail="File is required"
                 )
 
-            # Validate file type
-            file_extension = os.path.splitext(file.filename)[1].lower()
-            if file_extension not in ALLOWED_FILE_TYPES:
-                logger.error(f"Invalid file type: {file_extension}")
+            file_extension = AssignmentService._validate_file_extension(file.filename)
+
+            # Hash first so a duplicate upload never touches the disk
+            try:
+                sha256, file_size = await hash_upload(file)
+            except FileTooLargeError:
+                logger.error(f"File size exceeds limit of {MAX_FILE_SIZE} bytes")
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_FILE_TYPES)}"
+                    detail=f"File exceeds {MAX_FILE_SIZE // (1024 * 1024)}MB"
+                )
+
+            try:
+                written = await store_upload(file, sha256)
+            except IOError as e:
+                logger.error(f"Failed to save file {file.filename}: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to save file"
                 )
 
-            # Validate file size
-            content = await file.read()
-            if len(content) > MAX_FILE_SIZE:
-                logger.error(f"File size exceeds limit: {len(content)} bytes")
+            if written:
+                logger.info(f"Stored new blob {sha256} ({file_size} bytes)")
+            else:
+                logger.info(f"Blob {sha256} already stored, adding reference")
+
+            result = await AssignmentService._create_assignment_record(
+                db, student, subject, description, file_extension, sha256, file_size
+            )
+
+            # A concurrent delete may have released the blob between the write and the commit
+            if not await run_in_threadpool(blob_exists, sha256):
+                await store_upload(file, sha256)
+
+            return result
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in submit_assignment: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while submitting the assignment"
+            )
+
+    @staticmethod
+    async def create_upload_session(db: AsyncSession, session_in: UploadSessionCreate):
+        try:
+            await AssignmentService._get_student_or_404(db, session_in.name)
+            AssignmentService._validate_file_extension(session_in.filename)
+
+            if session_in.size <= 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File is required"
+                )
+            if session_in.size > MAX_FILE_SIZE:
+                logger.error(f"Declared upload size exceeds limit: {session_in.size} bytes")
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"File exceeds {MAX_FILE_SIZE // (1024 * 1024)}MB"
                 )
 
-            await file.seek(0)
+            await run_in_threadpool(upload_session.maybe_purge_expired_sessions)
+            session = await run_in_threadpool(upload_session.create_session, session_in.model_dump())
 
-            filename = f"{student.name}-{uuid.uuid4()}{file_extension}"
-            file_path = os.path.join(UPLOAD_DIR, filename)
+            logger.info(f"Upload session created: {session['id']}")
+            return session
 
-            try:
-                os.makedirs(UPLOAD_DIR, exist_ok=True)
-            except OSError as e:
-                logger.error(f"Failed to create directory {UPLOAD_DIR}: {str(e)}")
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while creating upload session: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create upload session"
+            )
+        except OSError as e:
+            logger.error(f"Failed to create upload session: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create upload session"
+            )
+
+    @staticmethod
+    def get_upload_session(session_id: uuid.UUID):
+        try:
+            return upload_session.load_session(session_id)
+        except upload_session.SessionNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload session not found"
+            )
+
+    @staticmethod
+    async def append_upload_chunk(session_id: uuid.UUID, offset: int, chunks):
+        try:
+            return await upload_session.append_chunk(session_id, offset, chunks)
+        except upload_session.SessionNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload session not found"
+            )
+        except upload_session.OffsetMismatchError as e:
+            logger.warning(f"Offset mismatch for upload {session_id}: got {offset}, at {e.offset}")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload offset is {e.offset}",
+                headers={"Upload-Offset": str(e.offset)},
+            )
+        except upload_session.SessionBusyError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Another request is writing to this upload"
+            )
+        except FileTooLargeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Chunk extends past the declared upload size"
+            )
+
+    @staticmethod
+    async def complete_upload_session(session_id: uuid.UUID, db: AsyncSession):
+        try:
+            session = AssignmentService.get_upload_session(session_id)
+            if session["offset"] != session["size"]:
                 raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to create upload directory"
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Upload incomplete: {session['offset']} of {session['size']} bytes received",
+                    headers={"Upload-Offset": str(session["offset"])},
                 )
 
-            # Save file to disk
             try:
-                with open(file_path, "wb") as f:
-                    f.write(content)
-            except IOError as e:
-                logger.error(f"Failed to save file {filename}: {str(e)}")
+                upload_session.claim_session(session_id)
+            except upload_session.SessionNotFoundError:
                 raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to save file"
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Upload session not found"
+                )
+            except upload_session.SessionBusyError:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This upload is already being completed"
                 )
 
-            # Create database record
             try:
-                new_assignment = models.Assignment(
-                    student_id=student.id,
-                    subject=subject,
-                    description=description,
-                    filename=filename,
-                )
-
-                db.add(new_assignment)
-                db.commit()
-                db.refresh(new_assignment)
-
-                logger.info(f"Assignment submitted successfully: {new_assignment.id}")
-
-                return {
-                    "id": new_assignment.id,
-                    "student_name": student.name,
-                    "subject": new_assignment.subject,
-                    "description": new_assignment.description,
-                    "filename": new_assignment.filename,
-                    "comments": new_assignment.comments,
-                }
+                student = await AssignmentService._get_student_or_404(db, session["name"])
+                file_extension = AssignmentService._validate_file_extension(session["filename"])
 
-            except SQLAlchemyError as e:
-                db.rollback()
-                logger.error(f"Database error while creating assignment: {str(e)}")
-
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                except OSError as cleanup_error:
-                    logger.error(f"Failed to clean up file {file_path}: {str(cleanup_error)}")
+                data_path = upload_session.data_path(session_id)
+                sha256, file_size = await run_in_threadpool(hash_file, data_path)
+                await run_in_threadpool(store_file, data_path, sha256)
 
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to save assignment record"
+                result = await AssignmentService._create_assignment_record(
+                    db, student, session["subject"], session["description"],
+                    file_extension, sha256, file_size,
                 )
+            except BaseException:
+                upload_session.release_session(session_id)
+                raise
+
+            # A concurrent delete may have released the blob between the write and the commit
+            if not await run_in_threadpool(blob_exists, sha256):
+                await run_in_threadpool(store_file, data_path, sha256)
+            await run_in_threadpool(upload_session.discard_session, session_id)
+            return result
 
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Unexpected error in submit_assignment: {str(e)}")
+            logger.error(f"Unexpected error in complete_upload_session: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="An unexpected error occurred while submitting the assignment"
+                detail="An unexpected error occurred while completing the upload"
+            )
+
+    @staticmethod
+    def cancel_upload_session(session_id: uuid.UUID):
+        AssignmentService.get_upload_session(session_id)
+        upload_session.discard_session(session_id)
+
+    @staticmethod
+    def _listing_query():
+        # Columns AssignmentOut needs plus the sort key, no ORM objects to hydrate
+        return (
+            select(
+                models.Assignment.id,
+                models.Student.name.label("student_name"),
+                models.Assignment.subject,
+                models.Assignment.description,
+                models.Assignment.filename,
+                models.TeacherComment.comment,
+                models.Assignment.submitted_at,
+            )
+            .join(models.Student, models.Assignment.student_id == models.Student.id)
+            .outerjoin(models.TeacherComment, models.Assignment.teacher_comment_id == models.TeacherComment.id)
+            # A deleted student's submissions disappear at once, the reaper removes them later
+            .where(models.Student.deleted_at.is_(None))
+        )
+
+    @staticmethod
+    def _apply_filters(query, filters: AssignmentFilters):
+        if filters.subject:
+            query = query.where(models.Assignment.subject == filters.subject)
+        if filters.student_name:
+            query = query.where(models.Student.name == filters.student_name)
+        if filters.submitted_from:
+            query = query.where(models.Assignment.submitted_at >= filters.submitted_from)
+        if filters.submitted_to:
+            query = query.where(models.Assignment.submitted_at < filters.submitted_to)
+        if filters.commented is not None:
+            commented = models.Assignment.teacher_comment_id.isnot(None)
+            query = query.where(commented if filters.commented else ~commented)
+        return query
+
+    @staticmethod
+    def _filters_scope(prefix: str, filters: AssignmentFilters) -> str:
+        # A cursor only continues the listing it came from, with the same filters and order
+        digest = hashlib.sha1(filters.model_dump_json().encode()).hexdigest()[:12]
+        return f"{prefix}:{digest}"
+
+    @staticmethod
+    async def _listing_page(
+            db: AsyncSession,
+            stmt,
+            filters: AssignmentFilters,
+            scope: str,
+            cursor: str | None,
+            limit: int,
+    ):
+        # id breaks ties between equal timestamps
+        rows, next_cursor = await paginate(
+            db,
+            AssignmentService._apply_filters(stmt, filters),
+            (models.Assignment.submitted_at, models.Assignment.id),
+            AssignmentService._filters_scope(scope, filters),
+            cursor,
+            limit,
+            descending=filters.sort == "newest",
+        )
+        return [dict(row._mapping) for row in rows], next_cursor
+
+    @staticmethod
+    @cached("assignments", "students", "teacher_comments", scope=_filtered_scope)
+    @query_budget(2)
+    async def get_all_assignments(
+            db: AsyncSession,
+            filters: AssignmentFilters,
+            cursor: str | None,
+            limit: int,
+            include_total: bool = False,
+    ):
+        try:
+            items, next_cursor = await AssignmentService._listing_page(
+                db, AssignmentService._listing_query(), filters, "assignments", cursor, limit
+            )
+            # The planner estimate covers the whole table, filtered listings get no total
+            unfiltered = not filters.model_dump(exclude_defaults=True, exclude={"sort"})
+            total = await estimate_total(db, "assignments") if include_total and unfiltered else None
+            return {"items": items, "next": next_cursor, "limit": limit, "total": total}
+
+        except InvalidCursorError as e:
+            logger.warning(f"Invalid assignments cursor: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while fetching assignments: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve assignments"
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error in get_all_assignments: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while retrieving assignments"
             )
 
     @staticmethod
-    def get_assignments_by_student_name(db: Session, student_name: str):
+    @cached("assignments", "students", "teacher_comments", scope=lambda student_name, *args, **kwargs: [student_scope(student_name)])
+    @query_budget(3)
+    async def get_assignments_by_student_name(
+            db: AsyncSession,
+            student_name: str,
+            filters: AssignmentFilters,
+            cursor: str | None,
+            limit: int,
+            include_total: bool = False,
+    ):
         try:
-            student = db.query(models.Student).filter(models.Student.name == student_name).first()
-            if not student:
-                logger.warning(f"Student '{student_name}' not found")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Student '{student_name}' not found"
-                )
+            student = await AssignmentService._get_student_or_404(db, student_name)
+            # The path names the student, a student_name filter would only contradict it
+            filters = filters.model_copy(update={"student_name": None})
 
-            assignments = db.query(models.Assignment).filter(
-                models.Assignment.student_id == student.id
-            ).all()
+            student_query = AssignmentService._listing_query().where(models.Assignment.student_id == student.id)
+            items, next_cursor = await AssignmentService._listing_page(
+                db, student_query, filters, f"student:{student.id}", cursor, limit
+            )
 
-            return [
-                {
-                    "id": a.id,
-                    "student_name": student.name,
-                    "subject": a.subject,
-                    "description": a.description,
-                    "filename": a.filename,
-                    "comments": a.comments,
-                }
-                for a in assignments
-            ]
+            total = None
+            if include_total:
+                # One student's rows, small enough to count exactly
+                total = await db.scalar(
+                    AssignmentService._apply_filters(
+                        select(func.count()).select_from(models.Assignment)
+                        .where(models.Assignment.student_id == student.id),
+                        filters,
+                    )
+                )
+            return {"items": items, "next": next_cursor, "limit": limit, "total": total}
 
+        except HTTPException:
+            raise
+        except InvalidCursorError as e:
+            logger.warning(f"Invalid assignments cursor for '{student_name}': {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
         except SQLAlchemyError as e:
             logger.error(f"Database error while fetching assignments: {str(e)}")
             raise HTTPException(
@@ -169,54 +484,166 @@ class AssignmentService:
             )
 
     @staticmethod
-    def add_teacher_comment(db: Session, assignment_id: uuid.UUID, comment: str):
+    def _search_query(search: str):
+        # Every word must match, whole or as the start of a longer word, so
+        # results narrow as the user types
+        terms = SEARCH_TERM.findall(search.lower())[:MAX_SEARCH_TERMS]
+        if not terms:
+            return None
+        return func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+
+    @staticmethod
+    @cached("assignments", "students", "teacher_comments")
+    @query_budget(1)
+    async def search_assignments(db: AsyncSession, search: str, cursor: str | None, limit: int):
         try:
-            if not comment or not comment.strip():
-                logger.error("Empty comment provided")
+            query = AssignmentService._search_query(search)
+            if query is None:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Comment cannot be empty"
+                    detail="Search query must contain at least one word"
                 )
 
-            assignment = db.query(models.Assignment).filter(
-                models.Assignment.id == assignment_id
-            ).first()
+            rank = func.ts_rank_cd(models.Assignment.search_vector, query, type_=REAL).label("rank")
+            rows, next_cursor = await paginate(
+                db,
+                AssignmentService._listing_query()
+                .add_columns(rank)
+                .where(models.Assignment.search_vector.op("@@")(query)),
+                (rank, models.Assignment.id),
+                "search:" + " ".join(SEARCH_TERM.findall(search.lower())),
+                cursor,
+                limit,
+                descending=True,
+            )
+            return {"items": [dict(row._mapping) for row in rows], "next": next_cursor, "limit": limit}
 
-            if not assignment:
-                logger.warning(f"Assignment {assignment_id} not found")
+        except HTTPException:
+            raise
+        except InvalidCursorError as e:
+            logger.warning(f"Invalid search cursor: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while searching assignments: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to search assignments"
+            )
+
+    @staticmethod
+    def _comment_error(comment: str) -> str | None:
+        if not comment or not comment.strip():
+            return "Comment cannot be empty"
+        if len(comment.strip()) > COMMENT_MAX_LENGTH:
+            return f"Comment is longer than {COMMENT_MAX_LENGTH} characters"
+        return None
+
+    @staticmethod
+    @query_budget(1)
+    async def add_teacher_comment(
+            db: AsyncSession,
+            assignment_id: uuid.UUID,
+            comment: str,
+            teacher_id: uuid.UUID | None = None,
+    ):
+        try:
+            error = AssignmentService._comment_error(comment)
+            if error:
+                logger.error(f"Rejected comment for assignment {assignment_id}: {error}")
                 raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Assignment not found"
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=error
                 )
 
-            assignment.comments = comment.strip()
+            comment = comment.strip()
+            Assignment, TeacherComment = models.Assignment, models.TeacherComment
+            # Without a teacher an existing comment keeps its author
+            author = {"teacher_id": teacher_id} if teacher_id else {}
+
+            # Everything below is one statement: lock the assignment, then either
+            # rewrite its existing comment or insert one and link it. The outer
+            # SELECT reads the pre-statement snapshot, so it returns the new text
+            # as a literal rather than joining teacher_comments.
+            target = (
+                select(Assignment.id, Assignment.teacher_comment_id)
+                .join(models.Student, Assignment.student_id == models.Student.id)
+                .where(Assignment.id == assignment_id, models.Student.deleted_at.is_(None))
+                .with_for_update(of=Assignment)
+                .cte("target")
+            )
+            updated = (
+                update(TeacherComment)
+                .where(TeacherComment.id == target.c.teacher_comment_id)
+                .values(comment=comment, **author)
+                .returning(TeacherComment.id)
+                .cte("updated")
+            )
+            inserted = (
+                insert(TeacherComment)
+                .from_select(
+                    ["id", "teacher_id", "comment"],
+                    select(
+                        literal(uuid.uuid4(), TeacherComment.id.type),
+                        literal(teacher_id, TeacherComment.teacher_id.type),
+                        literal(comment, TeacherComment.comment.type),
+                    )
+                    .where(target.c.teacher_comment_id.is_(None)),
+                )
+                .returning(TeacherComment.id)
+                .cte("inserted")
+            )
+            linked = (
+                update(Assignment)
+                .where(Assignment.id == assignment_id, exists(select(inserted.c.id)))
+                .values(teacher_comment_id=select(inserted.c.id).scalar_subquery())
+                .returning(Assignment.id)
+                .cte("linked")
+            )
 
             try:
-                db.commit()
-                db.refresh(assignment)
+                result = await db.execute(
+                    select(
+                        Assignment.id,
+                        models.Student.name.label("student_name"),
+                        Assignment.subject,
+                        Assignment.description,
+                        Assignment.filename,
+                        literal(comment, TeacherComment.comment.type).label("comment"),
+                    )
+                    .join(models.Student, Assignment.student_id == models.Student.id)
+                    .where(Assignment.id == assignment_id, models.Student.deleted_at.is_(None))
+                    .add_cte(target, updated, inserted, linked)
+                )
+                assignment = result.mappings().first()
+                await db.commit()
+            except IntegrityError:
+                # The only foreign key this statement can miss is the teacher's
+                await db.rollback()
+                logger.warning(f"Teacher {teacher_id} not found")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Teacher with ID {teacher_id} not found"
+                )
             except SQLAlchemyError as e:
-                db.rollback()
+                await db.rollback()
                 logger.error(f"Database error while updating comment: {str(e)}")
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Failed to update comment"
                 )
 
-            # Get student name for the response
-            student = db.query(models.Student).filter(
-                models.Student.id == assignment.student_id
-            ).first()
+            if not assignment:
+                logger.warning(f"Assignment {assignment_id} not found")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Assignment not found"
+                )
 
             logger.info(f"Comment added to assignment: {assignment_id}")
-
-            return {
-                "id": assignment.id,
-                "student_name": student.name if student else "Unknown",
-                "subject": assignment.subject,
-                "description": assignment.description,
-                "filename": assignment.filename,
-                "comments": assignment.comments,
-            }
+            return assignment
 
         except HTTPException:
             raise
@@ -225,4 +652,359 @@ class AssignmentService:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An unexpected error occurred while adding comment"
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    @query_budget(5)
+    async def add_teacher_comments(db: AsyncSession, batch: CommentBatchIn):
+        # Grades many assignments in one transaction with a fixed number of
+        # statements, however many items there are; a bad item is reported
+        # in its row instead of failing the batch
+        try:
+            if len(batch.items) > BATCH_MAX_COMMENTS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"At most {BATCH_MAX_COMMENTS} comments can be added at once"
+                )
+
+            Assignment, TeacherComment = models.Assignment, models.TeacherComment
+            outcomes = {}
+            comments = {}
+            for row, item in enumerate(batch.items):
+                error = AssignmentService._comment_error(item.comment)
+                if error:
+                    outcomes[row] = {"row": row, "assignment_id": item.assignment_id, "status": "invalid", "error": error}
+                elif item.assignment_id in comments:
+                    outcomes[row] = {"row": row, "assignment_id": item.assignment_id, "status": "duplicate",
+                                     "error": "Repeated earlier in this batch"}
+                else:
+                    comments[item.assignment_id] = (row, item.comment.strip())
+
+            teacher = await db.scalar(
+                select(models.Teacher.id).where(models.Teacher.id == batch.teacher_id, models.Teacher.deleted_at.is_(None))
+            )
+            if teacher is None:
+                logger.warning(f"Teacher {batch.teacher_id} not found")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Teacher with ID {batch.teacher_id} not found"
+                )
+
+            if comments:
+                # Locked in id order so two overlapping batches cannot deadlock;
+                # a deleted student's submissions count as not found
+                result = await db.execute(
+                    select(Assignment.id, Assignment.teacher_comment_id)
+                    .join(models.Student, Assignment.student_id == models.Student.id)
+                    .where(Assignment.id.in_(list(comments)), models.Student.deleted_at.is_(None))
+                    .order_by(Assignment.id)
+                    .with_for_update(of=Assignment)
+                )
+                existing = dict(result.all())
+
+                rewritten = [
+                    (comment_id, comments[assignment_id][1])
+                    for assignment_id, comment_id in existing.items() if comment_id is not None
+                ]
+                created = [
+                    (assignment_id, uuid.uuid4(), comments[assignment_id][1])
+                    for assignment_id, comment_id in existing.items() if comment_id is None
+                ]
+
+                if rewritten:
+                    new_text = values(
+                        column("id", TeacherComment.id.type),
+                        column("comment", TeacherComment.comment.type),
+                        name="new_text",
+                    ).data(rewritten)
+                    await db.execute(
+                        update(TeacherComment)
+                        .where(TeacherComment.id == new_text.c.id)
+                        .values(comment=new_text.c.comment, teacher_id=batch.teacher_id)
+                        .execution_options(synchronize_session=False)
+                    )
+
+                if created:
+                    await db.execute(
+                        insert(TeacherComment).values([
+                            {"id": comment_id, "teacher_id": batch.teacher_id, "comment": comment}
+                            for _, comment_id, comment in created
+                        ])
+                    )
+                    links = values(
+                        column("id", Assignment.id.type),
+                        column("teacher_comment_id", Assignment.teacher_comment_id.type),
+                        name="links",
+                    ).data([(assignment_id, comment_id) for assignment_id, comment_id, _ in created])
+                    await db.execute(
+                        update(Assignment)
+                        .where(Assignment.id == links.c.id)
+                        .values(teacher_comment_id=links.c.teacher_comment_id)
+                        .execution_options(synchronize_session=False)
+                    )
+
+                await db.commit()
+
+                for assignment_id, (row, _) in comments.items():
+                    if assignment_id not in existing:
+                        outcomes[row] = {"row": row, "assignment_id": assignment_id, "status": "not_found",
+                                         "error": "Assignment not found"}
+                    else:
+                        outcomes[row] = {"row": row, "assignment_id": assignment_id,
+                                         "status": "updated" if existing[assignment_id] else "created"}
+
+            rows = [outcomes[row] for row in sorted(outcomes)]
+            summary = {state: 0 for state in ("created", "updated", "not_found", "duplicate", "invalid")}
+            for outcome in rows:
+                summary[outcome["status"]] += 1
+
+            logger.info(
+                f"Teacher {batch.teacher_id} graded {summary['created'] + summary['updated']} assignments "
+                f"({summary['not_found']} not found, {summary['duplicate'] + summary['invalid']} rejected)"
+            )
+            return {**summary, "rows": rows}
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Database error while adding comments: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to add comments"
+            )
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Unexpected error in add_teacher_comments: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while adding comments"
+            )
+
+    @staticmethod
+    @query_budget(1)
+    async def get_assignment_file(db: AsyncSession, assignment_id: uuid.UUID):
+        try:
+            result = await db.execute(
+                select(models.Assignment.blob_sha256, models.Assignment.filename)
+                .join(models.Student, models.Assignment.student_id == models.Student.id)
+                .where(models.Assignment.id == assignment_id, models.Student.deleted_at.is_(None))
+            )
+            assignment = result.first()
+
+            if not assignment:
+                logger.warning(f"Assignment {assignment_id} not found")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Assignment not found"
+                )
+
+            file_path = resolve_assignment_path(assignment)
+            if not file_path and assignment.blob_sha256:
+                # Remote storage, hand the client a short-lived direct link
+                url = await run_in_threadpool(
+                    get_storage().presign_download, blob_key(assignment.blob_sha256), assignment.filename
+                )
+                return {"url": url, "filename": assignment.filename}
+
+            if not file_path or not await run_in_threadpool(os.path.exists, file_path):
+                logger.error(f"File for assignment {assignment_id} is missing")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="File not found"
+                )
+
+            if assignment.blob_sha256:
+                # Content-addressed, so the hash is a strong validator for free
+                etag = f'"{assignment.blob_sha256}"'
+            else:
+                stat_result = os.stat(file_path)
+                etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+            return {"path": file_path, "filename": assignment.filename, "etag": etag}
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while fetching assignment file: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve assignment file"
+            )
+
+    @staticmethod
+    @query_budget(1)
+    async def get_export_entries(
+            db: AsyncSession,
+            subject: str | None = None,
+            student_name: str | None = None,
+            submitted_from: datetime | None = None,
+            submitted_to: datetime | None = None,
+    ):
+        try:
+            query = select(
+                models.Assignment.filename,
+                models.Assignment.blob_sha256,
+                models.Assignment.submitted_at,
+                models.Student.name.label("student_name"),
+            ).join(models.Student, models.Assignment.student_id == models.Student.id).where(
+                models.Student.deleted_at.is_(None)
+            )
+
+            query = AssignmentService._apply_filters(query, AssignmentFilters(
+                subject=subject,
+                student_name=student_name,
+                submitted_from=submitted_from,
+                submitted_to=submitted_to,
+            ))
+
+            result = await db.execute(query.order_by(models.Assignment.submitted_at))
+
+            # Only keys and names are held in memory, file contents are streamed
+            entries = [
+                {
+                    "blob_sha256": row.blob_sha256,
+                    "filename": row.filename,
+                    "student_name": row.student_name,
+                    "submitted_at": row.submitted_at,
+                }
+                for row in result.all()
+            ]
+
+            if not entries:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="No assignments match the given filters"
+                )
+
+            return entries
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while preparing export: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to export assignments"
+            )
+
+    @staticmethod
+    async def _validate_direct_upload(db: AsyncSession, upload_in: DirectUploadCreate):
+        student = await AssignmentService._get_student_or_404(db, upload_in.name)
+        file_extension = AssignmentService._validate_file_extension(upload_in.filename)
+
+        if upload_in.size <= 0 or upload_in.size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File must be between 1 byte and {MAX_FILE_SIZE // (1024 * 1024)}MB"
+            )
+        return student, file_extension
+
+    @staticmethod
+    async def create_direct_upload(db: AsyncSession, upload_in: DirectUploadCreate):
+        try:
+            await AssignmentService._validate_direct_upload(db, upload_in)
+
+            # Uploaded even when the blob is already stored: knowing a file's
+            # sha256, which downloads send as their ETag, must not be enough
+            # to attach its content to a submission
+            upload_id = uuid.uuid4()
+            presigned = await run_in_threadpool(
+                get_storage().presign_upload, staging_key(upload_id), upload_in.sha256, upload_in.size
+            )
+            logger.info(f"Issued direct upload URL {upload_id} for blob {upload_in.sha256}")
+            return {"upload_required": True, "upload_id": upload_id, **presigned}
+
+        except HTTPException:
+            raise
+        except DirectUploadNotSupported:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Direct uploads are not supported by the configured storage backend"
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error in create_direct_upload: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while preparing the upload"
+            )
+
+    @staticmethod
+    async def confirm_direct_upload(db: AsyncSession, upload_in: DirectUploadConfirm):
+        try:
+            student, file_extension = await AssignmentService._validate_direct_upload(db, upload_in)
+            storage = get_storage()
+            key = staging_key(upload_in.upload_id)
+            stored = await run_in_threadpool(storage.stat, key)
+
+            if stored is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="File has not been uploaded"
+                )
+
+            # The signed URL only accepts content with the declared checksum
+            expected_checksum = base64.b64encode(bytes.fromhex(upload_in.sha256)).decode()
+            if stored["size"] != upload_in.size or stored["checksum_sha256"] != expected_checksum:
+                logger.error(f"Staged upload {upload_in.upload_id} does not match the declared file")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Uploaded file does not match the declared size or checksum"
+                )
+
+            # The API never sees the bytes, the store copies them into the blob
+            blob = blob_key(upload_in.sha256)
+            await run_in_threadpool(storage.copy, key, blob)
+            result = await AssignmentService._create_assignment_record(
+                db, student, upload_in.subject, upload_in.description,
+                file_extension, upload_in.sha256, upload_in.size,
+            )
+
+            # A concurrent delete may have released the blob between the copy and the commit
+            if not await run_in_threadpool(blob_exists, upload_in.sha256):
+                await run_in_threadpool(storage.copy, key, blob)
+            # Each staged upload backs a single submission
+            await run_in_threadpool(storage.delete, key)
+            return result
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in confirm_direct_upload: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while confirming the upload"
+            )
+
+    @staticmethod
+    @query_budget(2)
+    async def get_processing_results(db: AsyncSession, assignment_id: uuid.UUID):
+        try:
+            assignment = (
+                select(models.Assignment.id)
+                .join(models.Student, models.Assignment.student_id == models.Student.id)
+                .where(models.Assignment.id == assignment_id, models.Student.deleted_at.is_(None))
+            )
+            result = await db.execute(
+                select(models.ProcessingJob)
+                .where(models.ProcessingJob.assignment_id.in_(assignment))
+                .order_by(models.ProcessingJob.created_at)
+            )
+            jobs = result.scalars().all()
+
+            if not jobs and await db.scalar(assignment) is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Assignment not found"
+                )
+
+            return jobs
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while fetching processing results: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve processing results"
+            )
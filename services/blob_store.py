@@ -0,0 +1,153 @@
+import hashlib, logging, os, models
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from services.storage import (
+    UPLOAD_DIR,
+    MAX_FILE_SIZE,
+    CHUNK_SIZE,
+    FileTooLargeError,
+    get_storage,
+)
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def blob_key(sha256: str) -> str:
+    # Sharded as ab/cd/<sha256> so no single directory grows unbounded
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def staging_key(upload_id) -> str:
+    # Direct uploads land here first and are copied into the blob key on confirm.
+    # Abandoned ones are left to a lifecycle rule on the prefix.
+    return f"staging/{upload_id}"
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(UPLOAD_DIR, *blob_key(sha256).split("/"))
+
+
+def blob_exists(sha256: str) -> bool:
+    return get_storage().exists(blob_key(sha256))
+
+
+def resolve_assignment_path(assignment) -> str | None:
+    # Local path for the file, or None when it only lives in remote storage
+    if assignment.blob_sha256:
+        return get_storage().local_path(blob_key(assignment.blob_sha256))
+    if assignment.filename:
+        # Submissions saved before the blob store live flat in UPLOAD_DIR
+        return os.path.join(UPLOAD_DIR, assignment.filename)
+    return None
+
+
+def open_assignment_file(blob_sha256: str | None, filename: str | None):
+    if blob_sha256:
+        return get_storage().open(blob_key(blob_sha256))
+    return open(os.path.join(UPLOAD_DIR, filename), "rb")
+
+
+async def hash_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise FileTooLargeError(f"Upload exceeded {max_size} bytes")
+        # hashlib releases the GIL on large buffers
+        await run_in_threadpool(digest.update, chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
+async def store_upload(file: UploadFile, sha256: str, max_size: int = MAX_FILE_SIZE) -> bool:
+    # Returns True when the blob was written, False when it was already stored
+    storage = get_storage()
+    key = blob_key(sha256)
+    if await run_in_threadpool(storage.exists, key):
+        return False
+
+    await file.seek(0)
+    await storage.put_upload(file, key, max_size)
+    return True
+
+
+def hash_file(path: str, max_size: int = MAX_FILE_SIZE) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError(f"File exceeded {max_size} bytes")
+            digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+def store_file(source_path: str, sha256: str) -> bool:
+    # Copies an already-written file into the store, leaving the source in place.
+    # Returns True when the blob was created, False when it was already stored.
+    return get_storage().put_file(source_path, blob_key(sha256))
+
+
+def acquire_blob(db: Session, sha256: str, size: int):
+    stmt = insert(models.FileBlob).values(sha256=sha256, size=size, ref_count=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.FileBlob.sha256],
+        set_={"ref_count": models.FileBlob.ref_count + 1},
+    )
+    db.execute(stmt)
+
+
+def release_blobs(db: Session, counts: dict[str, int]) -> list[str]:
+    # Drops the given references and returns the blobs no longer referenced.
+    # Their rows stay behind at ref_count 0 until remove_blob_files takes
+    # them; callers commit, then pass the result to it.
+    if not counts:
+        return []
+
+    for sha256, count in counts.items():
+        db.execute(
+            update(models.FileBlob)
+            .where(models.FileBlob.sha256 == sha256)
+            .values(ref_count=models.FileBlob.ref_count - count)
+        )
+
+    released = db.execute(
+        select(models.FileBlob.sha256)
+        .where(models.FileBlob.sha256.in_(list(counts)), models.FileBlob.ref_count <= 0)
+    ).scalars().all()
+    return list(released)
+
+
+def remove_blob_files(db: Session, shas: list[str]):
+    # Each file is removed under the lock of its unreferenced row, and the row
+    # only goes with it. acquire_blob upserts that row, so a submission of the
+    # same content either commits first, and the file stays, or waits for the
+    # removal, and then finds the file gone and stores it again.
+    storage = get_storage()
+    for sha256 in shas:
+        try:
+            ref_count = db.scalar(
+                select(models.FileBlob.ref_count)
+                .where(models.FileBlob.sha256 == sha256)
+                .with_for_update()
+            )
+            if ref_count is not None and ref_count <= 0:
+                storage.delete(blob_key(sha256))
+                db.execute(delete(models.FileBlob).where(models.FileBlob.sha256 == sha256))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to remove blob {sha256}: {str(e)}")
@@ -0,0 +1,108 @@
+import codecs, csv, os
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "20000"))
+INSERT_BATCH_SIZE = 1000  # rows per INSERT, keeps bind parameters well under the driver limit
+
+_email_adapter = TypeAdapter(EmailStr)
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def read_csv_rows(source) -> list[dict]:
+    # Expects a header with name and email columns; a BOM from spreadsheet exports is dropped
+    reader = csv.DictReader(codecs.getreader("utf-8-sig")(source))
+    if not reader.fieldnames or not {"name", "email"} <= {field.strip().lower() for field in reader.fieldnames}:
+        raise BulkImportError("CSV header must contain name and email columns")
+
+    rows = []
+    for record in reader:
+        if len(rows) >= BULK_MAX_ROWS:
+            raise BulkImportError(f"At most {BULK_MAX_ROWS} rows can be imported at once")
+        rows.append({(key or "").strip().lower(): value for key, value in record.items()})
+    return rows
+
+
+def validate_rows(
+        rows: list,
+        name_max_length: int,
+        email_max_length: int | None,
+        lowercase_email: bool,
+        unique_name: bool,
+):
+    # Returns (row number, name, email) for insertable rows plus the outcome of
+    # every rejected one, so a bad line never sinks the whole import
+    if len(rows) > BULK_MAX_ROWS:
+        raise BulkImportError(f"At most {BULK_MAX_ROWS} rows can be imported at once")
+
+    valid = []
+    outcomes = {}
+    seen_emails = set()
+    seen_names = set()
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            outcomes[index] = {"row": index, "status": "invalid", "error": "Row must be an object"}
+            continue
+
+        name = str(row.get("name") or "").strip()
+        email = str(row.get("email") or "").strip()
+        if lowercase_email:
+            email = email.lower()
+
+        error = None
+        if not name:
+            error = "Name is required"
+        elif len(name) > name_max_length:
+            error = f"Name is longer than {name_max_length} characters"
+        elif not email:
+            error = "Email is required"
+        elif email_max_length and len(email) > email_max_length:
+            error = f"Email is longer than {email_max_length} characters"
+        else:
+            try:
+                _email_adapter.validate_python(email)
+            except ValidationError:
+                error = "Email is not valid"
+
+        if error:
+            outcomes[index] = {"row": index, "name": name, "email": email, "status": "invalid", "error": error}
+        elif email in seen_emails or (unique_name and name in seen_names):
+            outcomes[index] = {"row": index, "name": name, "email": email, "status": "duplicate",
+                               "error": "Repeated earlier in this import"}
+        else:
+            seen_emails.add(email)
+            seen_names.add(name)
+            valid.append((index, name, email))
+    return valid, outcomes
+
+
+async def insert_rows(db: AsyncSession, model, valid: list, outcomes: dict) -> dict:
+    # Multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING; whatever does not
+    # come back hit a unique constraint. The caller commits.
+    for start in range(0, len(valid), INSERT_BATCH_SIZE):
+        batch = valid[start:start + INSERT_BATCH_SIZE]
+        result = await db.execute(
+            insert(model)
+            .values([{"name": name, "email": email} for _, name, email in batch])
+            .on_conflict_do_nothing()
+            .returning(model.id, model.email)
+        )
+        created = {email: row_id for row_id, email in result.all()}
+
+        for index, name, email in batch:
+            if email in created:
+                outcomes[index] = {"row": index, "name": name, "email": email, "status": "created", "id": created[email]}
+            else:
+                outcomes[index] = {"row": index, "name": name, "email": email, "status": "duplicate",
+                                   "error": "Already exists"}
+
+    rows = [outcomes[index] for index in sorted(outcomes)]
+    summary = {status: 0 for status in ("created", "duplicate", "invalid")}
+    for outcome in rows:
+        summary[outcome["status"]] += 1
+    return {**summary, "rows": rows}
@@ -0,0 +1,184 @@
+import json, logging, os, time
+from collections import OrderedDict
+from functools import wraps
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import SQLAlchemyError
+from services.table_versions import read_table_versions
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+# Entries are keyed by table versions, so writes never need this to expire
+# them; it bounds how long superseded entries hold memory, and how old a
+# planner estimate in include_total can get
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+CACHE_KEY_PREFIX = "cache:"
+
+
+class LocalCache:
+    # In-process LRU; every entry also expires after its TTL
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.counters["expirations"] += 1
+            self.counters["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return value
+
+    def set(self, key: str, value, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def snapshot(self) -> dict:
+        return {**self.counters, "entries": len(self._entries)}
+
+
+class SharedCache:
+    # Any asyncio client with Redis' get and set, such as redis.asyncio.Redis.
+    # Redis evicts on its own, so only hits, misses and errors are counted here.
+
+    def __init__(self, client):
+        self.client = client
+        self.counters = {"hits": 0, "misses": 0, "errors": 0}
+
+    async def get(self, key: str):
+        raw = await self.client.get(key)
+        if raw is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value, ttl: float):
+        await self.client.set(key, json.dumps(value, separators=(",", ":")), ex=max(1, int(ttl)))
+
+    def snapshot(self) -> dict:
+        return dict(self.counters)
+
+
+class ResponseCache:
+    # Entries are keyed by the version of every table they read, taken from
+    # table_versions on the session that would load them. A committed write
+    # changes the key for every process at once, with no invalidation step.
+    # A lagging replica reports the versions its rows are at, so it can only
+    # fill entries for those, which a client reading its own writes from the
+    # primary never looks up. Superseded entries age out of the LRU and TTL.
+
+    def __init__(self, local: LocalCache, shared: SharedCache | None = None, ttl: float = CACHE_TTL):
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+
+    async def get_or_load(self, db, tables, key: str, loader):
+        try:
+            versions = await read_table_versions(db, tables)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Failed to read table versions, reading through: {str(e)}")
+            return await loader()
+
+        scope = ",".join(f"{table}:{version}" for table, version in zip(tables, versions))
+        key = f"{CACHE_KEY_PREFIX}{scope}|{key}"
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(key)
+            except Exception as e:
+                self.shared.counters["errors"] += 1
+                logger.error(f"Failed to read shared cache: {str(e)}")
+            if value is not None:
+                self.local.set(key, value, self.ttl)
+                return value
+
+        # Stored in its JSON form, which both tiers hold and the response models accept
+        value = jsonable_encoder(await loader())
+        self.local.set(key, value, self.ttl)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, value, self.ttl)
+            except Exception as e:
+                self.shared.counters["errors"] += 1
+                logger.error(f"Failed to write shared cache: {str(e)}")
+        return value
+
+    def snapshot(self) -> dict:
+        return {
+            "local": self.local.snapshot(),
+            "shared": self.shared.snapshot() if self.shared is not None else None,
+        }
+
+
+def _shared_cache() -> SharedCache | None:
+    if not CACHE_REDIS_URL:
+        return None
+    try:
+        from redis.asyncio import Redis
+    except ImportError:
+        raise RuntimeError("redis is required for CACHE_REDIS_URL")
+    return SharedCache(Redis.from_url(CACHE_REDIS_URL))
+
+
+response_cache = ResponseCache(LocalCache(), _shared_cache())
+
+
+def cached(*tables: str, scope=None):
+    # For service read methods taking the session first, naming every table
+    # the result is built from. The key is the method plus its remaining
+    # arguments, i.e. the route and its query. `scope` is called with those
+    # arguments and may return narrower version keys covering everything the
+    # result reads, so writes elsewhere in the tables leave the entry alone;
+    # None falls back to the tables.
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(db, *args, **kwargs):
+            if not CACHE_ENABLED:
+                return await func(db, *args, **kwargs)
+            key = json.dumps(
+                [func.__qualname__, jsonable_encoder(args), jsonable_encoder(kwargs)],
+                sort_keys=True,
+                separators=(",", ":"),
+            )
+            versions = (scope(*args, **kwargs) if scope else None) or tables
+            return await response_cache.get_or_load(db, versions, key, lambda: func(db, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def to_prometheus(snapshot: dict) -> str:
+    samples = {}
+    for tier, counters in snapshot.items():
+        for name, value in (counters or {}).items():
+            samples.setdefault(name, []).append((tier, value))
+
+    lines = []
+    for name, values in samples.items():
+        metric, kind = ("cache_entries", "gauge") if name == "entries" else (f"cache_{name}_total", "counter")
+        lines.append(f"# TYPE {metric} {kind}")
+        for tier, value in values:
+            lines.append(f'{metric}{{tier="{tier}"}} {value}')
+    return "\n".join(lines) + "\n"
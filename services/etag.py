@@ -0,0 +1,50 @@
+import logging
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_db
+from services.table_versions import read_table_versions
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_etag(versions) -> str:
+    # Strong: a given URL renders the same bytes for as long as none of the
+    # tables it reads has been written to
+    return '"' + ".".join(str(version) for version in versions) + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match compares weakly, so a W/ prefix added by a proxy still matches
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate == "*" or candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def conditional_get(*tables: str):
+    # Route dependency: answers 304 from the version counters before the route
+    # queries anything, otherwise sets the ETag on the response. Shares the
+    # route's read session, and with it the versions the response cache keys
+    # the body by, so a cached body is never older than its ETag. A write
+    # landing before the body is loaded can only make the ETag older than
+    # the body, which costs the client one more full response.
+    async def dependency(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+        # Totals are planner estimates that move without any write
+        if request.query_params.get("include_total", "").lower() in ("1", "true", "yes", "on"):
+            return
+
+        try:
+            etag = make_etag(await read_table_versions(db, tables))
+        except SQLAlchemyError as e:
+            # Serve the request without an ETag rather than fail it
+            await db.rollback()
+            logger.error(f"Failed to read table versions: {str(e)}")
+            return
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _matches(request.headers.get("if-none-match", ""), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
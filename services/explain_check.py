@@ -0,0 +1,184 @@
+import argparse, json, logging, sys, uuid, models
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.orm import Session
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_SAMPLE_ID = uuid.UUID("00000000-0000-0000-0000-000000000000")
+_SAMPLE_TIME = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def _listing(*where):
+    return (
+        select(models.Assignment.id, models.Student.name, models.TeacherComment.comment)
+        .join(models.Student, models.Assignment.student_id == models.Student.id)
+        .outerjoin(models.TeacherComment, models.Assignment.teacher_comment_id == models.TeacherComment.id)
+        .where(*where)
+        .order_by(models.Assignment.submitted_at.desc(), models.Assignment.id.desc())
+        .limit(51)
+    )
+
+
+# Queries on the request path, with the tables each one must reach through an index
+HOT_QUERIES = {
+    "student_by_name": (
+        select(models.Student).where(models.Student.name == "sample", models.Student.deleted_at.is_(None)),
+        {"students"},
+    ),
+    "student_by_email": (
+        select(models.Student).where(models.Student.email == "sample@example.com", models.Student.deleted_at.is_(None)),
+        {"students"},
+    ),
+    "teacher_by_email": (
+        select(models.Teacher).where(models.Teacher.email == "sample@example.com", models.Teacher.deleted_at.is_(None)),
+        {"teachers"},
+    ),
+    "assignments_by_student": (
+        select(models.Assignment.blob_sha256, func.count())
+        .where(models.Assignment.student_id == _SAMPLE_ID)
+        .group_by(models.Assignment.blob_sha256),
+        {"assignments"},
+    ),
+    "assignment_listing_page": (
+        _listing(
+            tuple_(models.Assignment.submitted_at, models.Assignment.id) < tuple_(_SAMPLE_TIME, _SAMPLE_ID),
+            models.Assignment.submitted_at <= _SAMPLE_TIME,
+        ),
+        {"assignments"},
+    ),
+    "student_assignment_page": (
+        _listing(models.Assignment.student_id == _SAMPLE_ID),
+        {"assignments"},
+    ),
+    "assignment_subject_page": (
+        _listing(models.Assignment.subject == "sample"),
+        {"assignments"},
+    ),
+    "assignment_time_range": (
+        _listing(
+            models.Assignment.submitted_at >= _SAMPLE_TIME,
+            models.Assignment.submitted_at < _SAMPLE_TIME + timedelta(days=30),
+        ),
+        {"assignments"},
+    ),
+    "uncommented_assignment_page": (
+        _listing(models.Assignment.teacher_comment_id.is_(None)),
+        {"assignments"},
+    ),
+    "student_listing_page": (
+        select(models.Student.id, models.Student.name, models.Student.email)
+        .where(tuple_(models.Student.name, models.Student.id) > tuple_("sample", _SAMPLE_ID))
+        .order_by(models.Student.name, models.Student.id)
+        .limit(51),
+        {"students"},
+    ),
+    "teacher_listing_page": (
+        select(models.Teacher.id, models.Teacher.name, models.Teacher.email)
+        .where(tuple_(models.Teacher.name, models.Teacher.id) > tuple_("sample", _SAMPLE_ID))
+        .order_by(models.Teacher.name, models.Teacher.id)
+        .limit(51),
+        {"teachers"},
+    ),
+    "assignment_search": (
+        select(models.Assignment.id).where(
+            models.Assignment.search_vector.op("@@")(func.to_tsquery("simple", "sample:*"))
+        ),
+        {"assignments"},
+    ),
+    "student_stats_page": (
+        select(models.Student.name, models.AssignmentStudentStats.submissions)
+        .join(models.AssignmentStudentStats, models.AssignmentStudentStats.student_id == models.Student.id)
+        .where(tuple_(models.Student.name, models.Student.id) > tuple_("sample", _SAMPLE_ID))
+        .order_by(models.Student.name, models.Student.id)
+        .limit(51),
+        {"students", "assignment_student_stats"},
+    ),
+    "processing_jobs_by_assignment": (
+        select(models.ProcessingJob).where(models.ProcessingJob.assignment_id == _SAMPLE_ID),
+        {"processing_jobs"},
+    ),
+}
+
+
+# Queries bounded on submitted_at, which must skip some assignments partitions
+PRUNED_QUERIES = {"assignment_listing_page", "assignment_time_range"}
+
+
+def _partition_parents(db: Session) -> dict[str, str]:
+    # Plans name the partitions they scan; failures are reported per parent table
+    result = db.execute(text(
+        "SELECT c.relname, p.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent"
+    ))
+    return dict(result.all())
+
+
+def _scanned(plan: dict) -> set[str]:
+    relations = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        relations |= _scanned(child)
+    return relations
+
+
+def _seq_scans(plan: dict, parents: dict[str, str]) -> set[str]:
+    tables = set()
+    if plan.get("Node Type") == "Seq Scan":
+        relation = plan.get("Relation Name")
+        tables.add(parents.get(relation, relation))
+    for child in plan.get("Plans", []):
+        tables |= _seq_scans(child, parents)
+    return tables
+
+
+def explain(db: Session, stmt) -> dict:
+    compiled = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    result = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    return plan[0]["Plan"]
+
+
+def check_hot_queries(db: Session, names=None) -> dict:
+    # Small or freshly created tables make the planner prefer sequential scans
+    # whatever indexes exist, so they are priced out for the check: a Seq Scan
+    # that still shows up means no index can answer the query.
+    failures = {}
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    try:
+        parents = _partition_parents(db)
+        partitions = {child for child, parent in parents.items() if parent == "assignments"}
+        for name, (stmt, tables) in HOT_QUERIES.items():
+            if names and name not in names:
+                continue
+            plan = explain(db, stmt)
+            scanned = _seq_scans(plan, parents) & tables
+            if scanned:
+                failures[name] = sorted(scanned)
+                logger.error(f"{name} falls back to a sequential scan on {', '.join(sorted(scanned))}")
+                continue
+
+            if name in PRUNED_QUERIES and len(partitions) > 1 and partitions <= _scanned(plan):
+                failures[name] = ["assignments"]
+                logger.error(f"{name} scans every assignments partition")
+            else:
+                logger.info(f"{name} uses an index")
+    finally:
+        db.rollback()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when a hot query would scan a whole table")
+    parser.add_argument("queries", nargs="*", help=f"limit the check to these of: {', '.join(HOT_QUERIES)}")
+    args = parser.parse_args()
+    unknown = set(args.queries) - set(HOT_QUERIES)
+    if unknown:
+        parser.error(f"unknown queries: {', '.join(sorted(unknown))}")
+
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        failed = check_hot_queries(session, set(args.queries))
+    sys.exit(1 if failed else 0)
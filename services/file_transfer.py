@@ -0,0 +1,149 @@
+import logging, os
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+from fastapi import Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from services.blob_store import CHUNK_SIZE
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    # Returns an inclusive (start, end) for a single byte range, or None to
+    # send the whole file. Multi-range requests are answered with the full body.
+    units, _, ranges = header.partition("=")
+    if units.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_text, sep, end_text = ranges.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if not start_text:
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(header: str, etag: str, mtime: float) -> bool:
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        # Ranges are only safe against a strong validator
+        return header == etag
+    try:
+        return parsedate_to_datetime(header).timestamp() >= int(mtime)
+    except (TypeError, ValueError):
+        return False
+
+
+class FileRangeResponse(Response):
+    # Streams [start, end] of a file, handing the file descriptor to the server
+    # when it supports the ASGI zero-copy send extension (sendfile under the hood).
+
+    def __init__(self, path: str, start: int, end: int, headers: dict, status_code: int = status.HTTP_200_OK):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        count = self.end - self.start + 1
+        if scope.get("method") == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in extensions:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+                return
+
+            await run_in_threadpool(f.seek, self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+            if remaining > 0:
+                # File shrank underneath us, close the body rather than hang the client
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(request: Request, path: str, filename: str, etag: str) -> Response:
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+    headers["Content-Type"] = "application/octet-stream"  # download regardless of file type
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or _if_range_matches(if_range, etag, stat_result.st_mtime)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE, headers=headers)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return FileRangeResponse(path, 0, size - 1, headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return FileRangeResponse(path, start, end, headers, status.HTTP_206_PARTIAL_CONTENT)
@@ -0,0 +1,157 @@
+import argparse, hashlib, logging, os, time, models
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from services.blob_store import (
+    UPLOAD_DIR,
+    CHUNK_SIZE,
+    acquire_blob,
+    blob_exists,
+    store_file,
+)
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_SLEEP = 0.5  # seconds between batches
+DEFAULT_MAX_BYTES_PER_SECOND = 50 * 1024 * 1024
+
+
+class _Throttle:
+    def __init__(self, max_bytes_per_second: int):
+        self.max_bytes_per_second = max_bytes_per_second
+        self.started = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, size: int):
+        if not self.max_bytes_per_second:
+            return
+        self.consumed += size
+        expected = self.consumed / self.max_bytes_per_second
+        elapsed = time.monotonic() - self.started
+        if expected > elapsed:
+            time.sleep(expected - elapsed)
+
+
+def _hash_legacy_file(path: str, throttle: _Throttle) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            digest.update(chunk)
+            throttle.consume(len(chunk))
+    return digest.hexdigest(), size
+
+
+def migrate_batch(db: Session, after_id, batch_size: int, throttle: _Throttle, dry_run: bool = False):
+    # Moves one batch of flat-layout files into the sharded blob store.
+    # Returns (last id seen, migrated count), last id is None when nothing is left.
+    rows = db.execute(
+        select(models.Assignment.id, models.Assignment.filename)
+        .where(
+            models.Assignment.blob_sha256.is_(None),
+            models.Assignment.filename.isnot(None),
+            *([models.Assignment.id > after_id] if after_id else []),
+        )
+        .order_by(models.Assignment.id)
+        .limit(batch_size)
+    ).all()
+    # No locks are held while the files are hashed
+    db.rollback()
+
+    if not rows:
+        return None, 0
+
+    hashed = {}
+    for assignment_id, filename in rows:
+        legacy_path = os.path.join(UPLOAD_DIR, filename)
+        if not os.path.isfile(legacy_path):
+            logger.warning(f"Legacy file missing for assignment {assignment_id}: {legacy_path}")
+            continue
+
+        sha256, size = _hash_legacy_file(legacy_path, throttle)
+        if dry_run:
+            logger.info(f"Would migrate {legacy_path} -> blob {sha256}")
+            continue
+
+        store_file(legacy_path, sha256)
+        hashed[assignment_id] = (legacy_path, sha256, size)
+
+    # Only rows still there and still unmigrated take a blob reference. Rows
+    # the reaper is deleting are skipped rather than waited for; a blob
+    # stored for them is an orphan the reconciler removes.
+    migrated = []
+    if hashed:
+        locked = db.execute(
+            select(models.Assignment)
+            .where(models.Assignment.id.in_(list(hashed)), models.Assignment.blob_sha256.is_(None))
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        for assignment in locked:
+            legacy_path, sha256, size = hashed[assignment.id]
+            acquire_blob(db, sha256, size)
+            assignment.blob_sha256 = sha256
+            migrated.append((legacy_path, sha256))
+        db.commit()
+
+    # Readers follow blob_sha256 once the batch commits, so the old copies can
+    # go, unless the blob was released and removed before this batch committed
+    for legacy_path, sha256 in migrated:
+        try:
+            if not blob_exists(sha256):
+                store_file(legacy_path, sha256)
+            os.remove(legacy_path)
+        except OSError as e:
+            logger.error(f"Failed to remove migrated file {legacy_path}: {str(e)}")
+
+    return rows[-1].id, len(migrated)
+
+
+def migrate_upload_layout(
+        db: Session,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sleep: float = DEFAULT_SLEEP,
+        max_bytes_per_second: int = DEFAULT_MAX_BYTES_PER_SECOND,
+        dry_run: bool = False,
+):
+    # Progress is the set of rows still without a blob, so an interrupted run
+    # resumes where it stopped when started again.
+    throttle = _Throttle(max_bytes_per_second)
+    after_id = None
+    total = 0
+
+    while True:
+        after_id, migrated = migrate_batch(db, after_id, batch_size, throttle, dry_run)
+        if after_id is None:
+            break
+        total += migrated
+        logger.info(f"Migrated {total} files so far")
+        time.sleep(sleep)
+
+    logger.info(f"Layout migration finished, {total} files migrated")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move flat UPLOAD_DIR files into the sharded blob layout")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--sleep", type=float, default=DEFAULT_SLEEP, help="seconds to pause between batches")
+    parser.add_argument("--max-mb-per-second", type=float, default=DEFAULT_MAX_BYTES_PER_SECOND / (1024 * 1024))
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        migrate_upload_layout(
+            session,
+            batch_size=args.batch_size,
+            sleep=args.sleep,
+            max_bytes_per_second=int(args.max_mb_per_second * 1024 * 1024),
+            dry_run=args.dry_run,
+        )
@@ -0,0 +1,94 @@
+import base64, json, os, uuid
+from datetime import datetime
+from sqlalchemy import text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", "200"))
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _from_json(column, value):
+    python_type = column.type.python_type
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(scope: str, values) -> str:
+    # Opaque to clients; the scope stops a cursor from one listing being replayed on another
+    payload = json.dumps({"s": scope, "v": [_to_json(value) for value in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(scope: str, cursor: str, columns) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != scope or len(payload["v"]) != len(columns):
+            raise ValueError("cursor does not belong to this listing")
+        return [_from_json(column, value) for column, value in zip(columns, payload["v"])]
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidCursorError(str(e))
+
+
+async def paginate(
+        db: AsyncSession,
+        stmt,
+        columns,
+        scope: str,
+        cursor: str | None,
+        limit: int,
+        descending: bool = False,
+):
+    # Seeks past the last row of the previous page instead of using OFFSET, so
+    # page N costs the same as page 1 when an index covers the sort columns.
+    # The sort columns must be selected by stmt and together be unique.
+    if cursor:
+        decoded = decode_cursor(scope, cursor, columns)
+        after = tuple_(*columns)
+        values = tuple_(*decoded)
+        stmt = stmt.where(after < values if descending else after > values)
+        # Redundant with the row comparison, but partition pruning only
+        # understands plain comparisons, so later pages skip whole partitions
+        stmt = stmt.where(columns[0] <= decoded[0] if descending else columns[0] >= decoded[0])
+
+    order_by = [column.desc() for column in columns] if descending else list(columns)
+    rows = (await db.execute(stmt.order_by(*order_by).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor(scope, [last[column] for column in columns])
+    return rows, next_cursor
+
+
+async def estimate_total(db: AsyncSession, table_name: str) -> int | None:
+    # Planner estimate from the last ANALYZE, no table scan; None when unknown.
+    # Autovacuum never analyzes a partitioned parent, so its estimate is the
+    # sum over its partitions, skipping those not analyzed yet (-1).
+    result = await db.execute(
+        text(
+            "SELECT CASE WHEN c.relkind = 'p' THEN ("
+            "SELECT sum(p.reltuples) FILTER (WHERE p.reltuples >= 0) "
+            "FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid"
+            ") ELSE c.reltuples END::bigint "
+            "FROM pg_class c WHERE c.oid = to_regclass(:table_name)"
+        ),
+        {"table_name": table_name},
+    )
+    estimate = result.scalar()
+    return estimate if estimate is not None and estimate >= 0 else None
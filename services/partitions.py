@@ -0,0 +1,203 @@
+import argparse, json, logging, os, re
+from datetime import datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from services.blob_store import release_blobs, remove_blob_files
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "assignments"
+LEGACY_PARTITION = "assignments_legacy"  # everything submitted before partitioning
+DEFAULT_PARTITION = "assignments_default"  # rows past the newest monthly partition
+PARTITIONS_AHEAD = int(os.getenv("PARTITIONS_AHEAD", "3"))  # months kept ready past the current one
+PARTITION_LOCK_TIMEOUT = "5s"  # give up rather than queue every query behind a waiting DDL lock
+
+MONTHLY_PARTITION = re.compile(r"^assignments_p(\d{4})_(\d{2})$")
+
+# Lookups by assignment id alone, as downloads, comments and processing jobs
+# make them, cannot be pruned to one partition: Postgres probes the
+# (id, submitted_at) index of every attached partition. That is one index
+# probe per attached month, so archived terms should be detached and dropped
+# rather than left attached.
+
+
+class PartitionError(Exception):
+    pass
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"assignments_p{month:%Y_%m}"
+
+
+def _is_archivable(name: str) -> bool:
+    return name == LEGACY_PARTITION or bool(MONTHLY_PARTITION.match(name))
+
+
+def list_partitions(db: Session) -> list[dict]:
+    result = db.execute(
+        text(
+            "SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bounds, "
+            "c.reltuples::bigint AS estimated_rows "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent) ORDER BY c.relname"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    return [dict(row) for row in result.mappings()]
+
+
+def _move_out_of_default(db: Session, name: str, bounds: str, start: datetime, end: datetime):
+    # Postgres refuses a partition whose range the default partition already
+    # holds rows for. With the default detached, the month is built as a plain
+    # table, filled from the default and attached. Detached tables carry none
+    # of the parent's triggers, so the stats and processing jobs of the moved
+    # rows are left as they are. Holds an exclusive lock on assignments until
+    # the commit, which the caller makes.
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING ALL)"))
+    in_range = "submitted_at >= :start AND submitted_at < :end"
+    db.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"), {"start": start, "end": end})
+    db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), {"start": start, "end": end})
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def ensure_partitions(db: Session, ahead: int = PARTITIONS_AHEAD, now: datetime | None = None) -> list[str]:
+    # Continues the monthly series from the newest partition until `ahead`
+    # months past the current one are ready. Run from cron through the CLI's
+    # ensure command; a failure raises, so the job exits non-zero.
+    created = []
+    try:
+        months = [
+            datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            for match in (MONTHLY_PARTITION.match(partition["name"]) for partition in list_partitions(db))
+            if match
+        ]
+
+        current = _month_start(now or datetime.now(timezone.utc))
+        month = _add_months(max(months), 1) if months else current
+        while month <= _add_months(current, ahead):
+            name = partition_name(month)
+            end = _add_months(month, 1)
+            bounds = f"FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            stray = db.scalar(
+                text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE submitted_at >= :start AND submitted_at < :end"),
+                {"start": month, "end": end},
+            )
+            db.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+            if stray:
+                logger.warning(f"{DEFAULT_PARTITION} holds {stray} rows for {name}, moving them into it")
+                _move_out_of_default(db, name, bounds, month, end)
+            else:
+                db.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES {bounds}"))
+            db.commit()
+            created.append(name)
+            logger.info(f"Created partition {name}")
+            month = end
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Failed to create assignment partitions: {str(e)}")
+        raise
+    return created
+
+
+def detach_partition(db: Session, name: str) -> dict:
+    # The rows stay in a standalone table that can be dumped and dropped;
+    # the stats counters stop counting them in the same transaction
+    if not _is_archivable(name):
+        raise PartitionError(f"{name} is not an assignments partition")
+    if name not in {partition["name"] for partition in list_partitions(db)}:
+        raise PartitionError(f"{name} is not attached to {PARENT_TABLE}")
+
+    try:
+        db.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        # The rows leave every listing without a DML statement to bump the
+        # version, or the student and subject keys of every row that left
+        db.execute(text(
+            f"SELECT table_version_bump_keys(ARRAY['{PARENT_TABLE}'] || ARRAY("
+            f"SELECT 'subject:' || a.subject FROM {name} a "
+            f"UNION SELECT 'student:' || s.name FROM {name} a JOIN students s ON s.id = a.student_id))"
+        ))
+        # A soft-deleted student's rows are already out of the subject counters
+        rows = db.execute(text(
+            f"SELECT assignment_stats_apply(subject, student_id, -submissions, -uncommented) FROM ("
+            f"SELECT CASE WHEN s.deleted_at IS NULL THEN a.subject END AS subject, a.student_id, "
+            f"count(*) AS submissions, count(*) FILTER (WHERE a.teacher_comment_id IS NULL) AS uncommented "
+            f"FROM {name} a LEFT JOIN students s ON s.id = a.student_id GROUP BY 1, 2) AS counts"
+        )).all()
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+
+    logger.info(f"Detached partition {name}")
+    return {"partition": name, "groups": len(rows)}
+
+
+def drop_partition(db: Session, name: str) -> dict:
+    # Only for detached partitions, once archived: releases their file blobs
+    # and processing jobs, which nothing else cleans up
+    if not _is_archivable(name):
+        raise PartitionError(f"{name} is not an assignments partition")
+    if name in {partition["name"] for partition in list_partitions(db)}:
+        raise PartitionError(f"{name} is still attached, detach it first")
+    if db.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None:
+        raise PartitionError(f"{name} does not exist")
+
+    try:
+        counts = dict(db.execute(text(
+            f"SELECT blob_sha256, count(*) FROM {name} WHERE blob_sha256 IS NOT NULL GROUP BY blob_sha256"
+        )).all())
+        db.execute(text(f"DELETE FROM processing_jobs WHERE assignment_id IN (SELECT id FROM {name})"))
+        db.execute(text(f"DROP TABLE {name}"))
+        released = release_blobs(db, counts)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+
+    # Files go only after the commit, and only once nothing references them
+    remove_blob_files(db, released)
+    logger.info(f"Dropped partition {name}, released {len(released)} blobs")
+    return {"partition": name, "released_blobs": len(released)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of the assignments table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show attached partitions")
+    ensure = commands.add_parser("ensure", help="create the partitions for the coming months, run daily from cron")
+    ensure.add_argument("--ahead", type=int, default=PARTITIONS_AHEAD)
+    commands.add_parser("detach", help="detach a partition, e.g. after a term ends").add_argument("name")
+    commands.add_parser("drop", help="drop a detached partition once archived (pg_dump -t NAME)").add_argument("name")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        try:
+            if args.command == "list":
+                output = list_partitions(session)
+            elif args.command == "ensure":
+                output = ensure_partitions(session, args.ahead)
+            elif args.command == "detach":
+                output = detach_partition(session, args.name)
+            else:
+                output = drop_partition(session, args.name)
+        except PartitionError as e:
+            parser.error(str(e))
+    print(json.dumps(output, default=str))
@@ -0,0 +1,135 @@
+import threading, time
+from sqlalchemy import event, exc
+
+
+# Upper bounds in seconds for checkout wait times, the last bucket catches the rest
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[index] += 1
+                    break
+            if timed_out:
+                self.timeouts += 1
+
+    def _increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            data = {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_count": self.wait_count,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "wait_seconds_avg": round(self.wait_total / self.wait_count, 6) if self.wait_count else 0.0,
+                "wait_buckets": {
+                    ("+Inf" if bound == float("inf") else str(bound)): count
+                    for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)
+                },
+            }
+
+        # Live gauges only exist on queue pools, NullPool keeps nothing around
+        for gauge in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, gauge, None)
+            data[gauge] = method() if callable(method) else None
+        return data
+
+
+def timed_pool_class(base, metrics: PoolMetrics):
+    # The pool class is rebuilt by engine.dispose(), so metrics ride on the class
+    # rather than on an instance that would be thrown away.
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get, "metrics": metrics})
+
+
+def instrument_engine(engine, metrics: PoolMetrics):
+    # Accepts sync engines and AsyncEngine, events live on the sync pool either way
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics.pool = sync_engine.pool
+
+    @event.listens_for(sync_engine, "engine_disposed")
+    def on_dispose(disposed_engine):
+        metrics.pool = sync_engine.pool
+
+    @event.listens_for(sync_engine.pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics._increment("connects")
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics._increment("checkouts")
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics._increment("checkins")
+
+    @event.listens_for(sync_engine.pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics._increment("invalidations")
+
+
+def to_prometheus(metrics_by_engine: dict) -> str:
+    lines = []
+    counters = ("connects", "checkouts", "checkins", "invalidations", "timeouts")
+    gauges = ("size", "checkedin", "checkedout", "overflow")
+
+    for counter in counters:
+        lines.append(f"# TYPE db_pool_{counter}_total counter")
+        for name, metrics in metrics_by_engine.items():
+            lines.append(f'db_pool_{counter}_total{{engine="{name}"}} {metrics[counter]}')
+
+    for gauge in gauges:
+        lines.append(f"# TYPE db_pool_{gauge} gauge")
+        for name, metrics in metrics_by_engine.items():
+            if metrics[gauge] is not None:
+                lines.append(f'db_pool_{gauge}{{engine="{name}"}} {metrics[gauge]}')
+
+    lines.append("# TYPE db_pool_wait_seconds histogram")
+    for name, metrics in metrics_by_engine.items():
+        cumulative = 0
+        for bound, count in metrics["wait_buckets"].items():
+            cumulative += count
+            lines.append(f'db_pool_wait_seconds_bucket{{engine="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'db_pool_wait_seconds_sum{{engine="{name}"}} {metrics["wait_seconds_total"]}')
+        lines.append(f'db_pool_wait_seconds_count{{engine="{name}"}} {metrics["wait_count"]}')
+
+    return "\n".join(lines) + "\n"
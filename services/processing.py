@@ -0,0 +1,303 @@
+import hashlib, logging, os, re, shutil, tempfile, time, uuid, zipfile, models
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.blob_store import CHUNK_SIZE, open_assignment_file
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", "2"))
+POLL_INTERVAL = 2.0  # seconds between polls when the queue is empty
+LOCK_TIMEOUT = timedelta(minutes=10)  # running jobs older than this are assumed lost
+JOB_TIMEOUT = float(os.getenv("PROCESSING_JOB_TIMEOUT", "300"))  # seconds, must stay below LOCK_TIMEOUT
+RETRY_BASE_DELAY = 30  # seconds, doubled on every attempt
+RETRY_MAX_DELAY = 60 * 60
+MAX_TEXT_LENGTH = 100_000  # characters of extracted text kept per file
+MAX_MANIFEST_ENTRIES = 1000
+
+TEXT_EXTENSIONS = {".pdf", ".docx", ".txt"}
+ARCHIVE_EXTENSIONS = {".zip"}
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def jobs_for_extension(file_extension: str) -> list[str]:
+    kinds = ["checksum"]
+    if file_extension in TEXT_EXTENSIONS:
+        kinds.append("extract_text")
+    if file_extension in ARCHIVE_EXTENSIONS:
+        kinds.append("archive_manifest")
+    return kinds
+
+
+def enqueue_jobs(db: Session | AsyncSession, assignment_id: uuid.UUID, file_extension: str):
+    # Adds jobs to the caller's transaction, the caller commits
+    for kind in jobs_for_extension(file_extension):
+        db.add(models.ProcessingJob(assignment_id=assignment_id, kind=kind, status="pending"))
+
+
+class _SkipJob(Exception):
+    pass
+
+
+def _local_copy(source):
+    # zipfile and PDF readers need to seek, remote bodies cannot
+    if hasattr(source, "seekable") and source.seekable():
+        return source
+    spooled = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 4)
+    shutil.copyfileobj(source, spooled, CHUNK_SIZE)
+    source.close()
+    spooled.seek(0)
+    return spooled
+
+
+def _checksum(source, blob_sha256: str | None) -> dict:
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        digest.update(chunk)
+
+    sha256 = digest.hexdigest()
+    if blob_sha256 and sha256 != blob_sha256:
+        # Stored bytes no longer match their address, retrying will not help
+        return {"sha256": sha256, "size": size, "verified": False}
+    return {"sha256": sha256, "size": size, "verified": blob_sha256 is not None}
+
+
+def _extract_docx(source) -> dict:
+    with zipfile.ZipFile(source) as archive:
+        document = ElementTree.fromstring(archive.read("word/document.xml"))
+        paragraphs = []
+        for paragraph in document.iter(f"{WORD_NAMESPACE}p"):
+            paragraphs.append("".join(node.text or "" for node in paragraph.iter(f"{WORD_NAMESPACE}t")))
+        text = "\n".join(paragraphs)
+
+        pages = None
+        if "docProps/app.xml" in archive.namelist():
+            match = re.search(rb"<Pages>(\d+)</Pages>", archive.read("docProps/app.xml"))
+            pages = int(match.group(1)) if match else None
+
+    return {"text": text, "pages": pages}
+
+
+def _extract_pdf(source) -> dict:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise _SkipJob("pypdf is not installed")
+
+    reader = PdfReader(source)
+    parts = []
+    length = 0
+    for page in reader.pages:
+        if length >= MAX_TEXT_LENGTH:
+            break
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+    return {"text": "\n".join(parts), "pages": len(reader.pages)}
+
+
+def _extract_text(source, extension: str) -> dict:
+    if extension == ".txt":
+        result = {"text": source.read(MAX_TEXT_LENGTH * 4).decode("utf-8", errors="replace"), "pages": None}
+    elif extension == ".docx":
+        result = _extract_docx(source)
+    elif extension == ".pdf":
+        result = _extract_pdf(source)
+    else:
+        raise _SkipJob(f"No text extractor for {extension}")
+
+    text = result["text"]
+    result["truncated"] = len(text) > MAX_TEXT_LENGTH
+    result["text"] = text[:MAX_TEXT_LENGTH]
+    return result
+
+
+def _archive_manifest(source) -> dict:
+    with zipfile.ZipFile(source) as archive:
+        infos = archive.infolist()
+        entries = [
+            {"name": info.filename, "size": info.file_size, "compressed_size": info.compress_size}
+            for info in infos[:MAX_MANIFEST_ENTRIES]
+        ]
+    return {
+        "entry_count": len(infos),
+        "total_size": sum(info.file_size for info in infos),
+        "entries": entries,
+        "truncated": len(infos) > MAX_MANIFEST_ENTRIES,
+    }
+
+
+def run_job(kind: str, blob_sha256: str | None, filename: str | None) -> dict:
+    # Runs inside a worker process, so it only takes and returns plain values
+    extension = os.path.splitext(filename or "")[1].lower()
+    try:
+        source = open_assignment_file(blob_sha256, filename)
+        with source:
+            if kind == "checksum":
+                return _checksum(source, blob_sha256)
+
+            source = _local_copy(source)
+            with source:
+                if kind == "extract_text":
+                    return _extract_text(source, extension)
+                if kind == "archive_manifest":
+                    return _archive_manifest(source)
+            raise _SkipJob(f"Unknown job kind {kind}")
+    except _SkipJob as e:
+        return {"skipped": str(e)}
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY))
+
+
+def claim_jobs(db: Session, limit: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    stmt = (
+        select(models.ProcessingJob, models.Assignment.blob_sha256, models.Assignment.filename)
+        .join(models.Assignment, models.ProcessingJob.assignment_id == models.Assignment.id)
+        .where(
+            or_(
+                (models.ProcessingJob.status == "pending") & (models.ProcessingJob.run_after <= now),
+                (models.ProcessingJob.status == "running") & (models.ProcessingJob.locked_at < now - LOCK_TIMEOUT),
+            )
+        )
+        .order_by(models.ProcessingJob.run_after)
+        .limit(limit)
+        # Several workers can poll the same table without handing out a job twice
+        .with_for_update(skip_locked=True, of=models.ProcessingJob)
+    )
+
+    claimed = []
+    for job, blob_sha256, filename in db.execute(stmt).all():
+        if job.status == "running" and job.attempts >= job.max_attempts:
+            # Lost on its last attempt, most likely by taking its worker down
+            # with it, so running it again would only do that again
+            job.status = "failed"
+            job.error = "Worker stopped during the last attempt"
+            job.locked_at = None
+            logger.error(f"Processing job {job.id} ({job.kind}) failed permanently: worker stopped")
+            continue
+
+        job.status = "running"
+        job.locked_at = now
+        job.attempts += 1
+        claimed.append({
+            "id": job.id,
+            "kind": job.kind,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "blob_sha256": blob_sha256,
+            "filename": filename,
+        })
+    db.commit()
+    return claimed
+
+
+def complete_job(db: Session, job_id: uuid.UUID, result: dict):
+    job = db.get(models.ProcessingJob, job_id)
+    if job is None:
+        return
+    job.status = "done"
+    job.result = result
+    job.error = None
+    job.locked_at = None
+    db.commit()
+
+
+def fail_job(db: Session, job_id: uuid.UUID, error: str):
+    job = db.get(models.ProcessingJob, job_id)
+    if job is None:
+        return
+    job.error = error[:2000]
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = "failed"
+        logger.error(f"Processing job {job_id} ({job.kind}) failed permanently: {error}")
+    else:
+        job.status = "pending"
+        job.run_after = datetime.now(timezone.utc) + _retry_delay(job.attempts)
+        logger.warning(f"Processing job {job_id} ({job.kind}) failed, retrying: {error}")
+    db.commit()
+
+
+def _stop_pool(pool: ProcessPoolExecutor):
+    # A running job cannot be cancelled, so its process is terminated. The
+    # executor has no public way to do that before Python 3.14.
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def _restart_pool(pool: ProcessPoolExecutor, max_workers: int) -> ProcessPoolExecutor:
+    logger.warning("Restarting the processing pool")
+    _stop_pool(pool)
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+def _submit(pool: ProcessPoolExecutor, jobs: list[dict]) -> dict:
+    return {pool.submit(run_job, job["kind"], job["blob_sha256"], job["filename"]): job for job in jobs}
+
+
+def run_worker(max_workers: int = PROCESSING_WORKERS, once: bool = False):
+    from database import SessionLocal
+
+    pool = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            with SessionLocal() as db:
+                jobs = claim_jobs(db, max_workers)
+
+            if not jobs:
+                if once:
+                    return
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            try:
+                futures = _submit(pool, jobs)
+            except BrokenProcessPool:
+                # A process died while the pool was idle
+                pool = _restart_pool(pool, max_workers)
+                futures = _submit(pool, jobs)
+            _, timed_out = wait(futures, timeout=JOB_TIMEOUT)
+
+            broken = False
+            with SessionLocal() as db:
+                for future, job in futures.items():
+                    if future in timed_out:
+                        fail_job(db, job["id"], f"Timed out after {JOB_TIMEOUT:g} seconds")
+                        continue
+                    try:
+                        complete_job(db, job["id"], future.result())
+                        logger.info(f"Processing job {job['id']} ({job['kind']}) done")
+                    except BrokenProcessPool as e:
+                        broken = True
+                        fail_job(db, job["id"], f"Worker process died: {e}")
+                    except Exception as e:
+                        fail_job(db, job["id"], f"{type(e).__name__}: {e}")
+
+            # A process that died takes the whole pool with it, and a hung one
+            # would hold its slot for good
+            if timed_out or broken:
+                pool = _restart_pool(pool, max_workers)
+    finally:
+        _stop_pool(pool)
+
+
+if __name__ == "__main__":
+    # Runs as its own process so CPU-heavy work never shares the API's event loop
+    run_worker()
@@ -0,0 +1,50 @@
+import functools, logging, os
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Raise instead of logging when a read path goes over its budget; meant for
+# development and CI, where an N+1 regression should fail loudly
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() in ("1", "true", "yes")
+
+_counter: ContextVar[list | None] = ContextVar("query_budget_counter", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    # Async sessions run statements in a greenlet that shares the caller's
+    # context, so this sees the counter of the request that issued the query
+    counter = _counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def query_budget(max_queries: int):
+    # Caps the statements an async service call may issue, whatever the data
+    # size; a per-row lookup sneaking into a listing shows up on the first run
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            counter = [0]
+            token = _counter.set(counter)
+            try:
+                result = await func(*args, **kwargs)
+            finally:
+                _counter.reset(token)
+
+            if counter[0] > max_queries:
+                message = f"{func.__qualname__} issued {counter[0]} queries, budget is {max_queries}"
+                if QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return result
+        return wrapper
+    return decorator
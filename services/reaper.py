@@ -0,0 +1,143 @@
+import argparse, logging, os, time, models
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+from services.blob_store import UPLOAD_DIR, release_blobs, remove_blob_files
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REAP_BATCH_SIZE = int(os.getenv("REAP_BATCH_SIZE", "200"))  # rows deleted per transaction
+REAP_PAUSE = float(os.getenv("REAP_PAUSE", "0.5"))  # seconds between batches, leaves room for regular traffic
+POLL_INTERVAL = 10.0  # seconds between polls when nothing is waiting
+
+
+def _pause():
+    if REAP_PAUSE:
+        time.sleep(REAP_PAUSE)
+
+
+def _remove_legacy_file(filename: str):
+    # Submissions saved before the blob store own their flat file outright
+    path = os.path.join(UPLOAD_DIR, filename)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Failed to remove {path}: {str(e)}")
+
+
+def reap_student(db: Session, student_id) -> int:
+    # Deletes the submissions a batch at a time, each batch committing with its
+    # blob references released, then the student row itself. The rows' own
+    # ON DELETE CASCADE and triggers take processing jobs and stats with them.
+    removed = 0
+    while True:
+        batch = (
+            select(models.Assignment.id, models.Assignment.submitted_at)
+            .where(models.Assignment.student_id == student_id)
+            .limit(REAP_BATCH_SIZE)
+        )
+        rows = db.execute(
+            delete(models.Assignment)
+            .where(tuple_(models.Assignment.id, models.Assignment.submitted_at).in_(batch))
+            .returning(models.Assignment.blob_sha256, models.Assignment.filename)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not rows:
+            break
+
+        counts = {}
+        legacy = []
+        for sha256, filename in rows:
+            if sha256:
+                counts[sha256] = counts.get(sha256, 0) + 1
+            elif filename:
+                legacy.append(filename)
+        released = release_blobs(db, counts)
+        db.commit()
+
+        # Files go only after the commit, and only once nothing references them
+        remove_blob_files(db, released)
+        for filename in legacy:
+            _remove_legacy_file(filename)
+        removed += len(rows)
+        _pause()
+
+    db.execute(
+        delete(models.Student)
+        .where(models.Student.id == student_id, models.Student.deleted_at.isnot(None))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    logger.info(f"Reaped student {student_id} with {removed} submissions")
+    return removed
+
+
+def reap_teacher(db: Session, teacher_id) -> int:
+    # Comments go in batches; ON DELETE SET NULL puts their submissions back
+    # in the grading queue
+    removed = 0
+    while True:
+        batch = (
+            select(models.TeacherComment.id)
+            .where(models.TeacherComment.teacher_id == teacher_id)
+            .limit(REAP_BATCH_SIZE)
+        )
+        result = db.execute(
+            delete(models.TeacherComment)
+            .where(models.TeacherComment.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if not result.rowcount:
+            break
+        removed += result.rowcount
+        _pause()
+
+    db.execute(
+        delete(models.Teacher)
+        .where(models.Teacher.id == teacher_id, models.Teacher.deleted_at.isnot(None))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    logger.info(f"Reaped teacher {teacher_id} with {removed} comments")
+    return removed
+
+
+def reap(db: Session) -> int:
+    # Oldest deletions first; returns how many accounts were removed
+    students = db.execute(
+        select(models.Student.id).where(models.Student.deleted_at.isnot(None)).order_by(models.Student.deleted_at)
+    ).scalars().all()
+    teachers = db.execute(
+        select(models.Teacher.id).where(models.Teacher.deleted_at.isnot(None)).order_by(models.Teacher.deleted_at)
+    ).scalars().all()
+    db.rollback()
+
+    for student_id in students:
+        reap_student(db, student_id)
+    for teacher_id in teachers:
+        reap_teacher(db, teacher_id)
+    return len(students) + len(teachers)
+
+
+def run_reaper(once: bool = False):
+    from database import SessionLocal
+
+    while True:
+        with SessionLocal() as db:
+            reaped = reap(db)
+        if once:
+            return
+        if not reaped:
+            time.sleep(POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    # Runs as its own process, next to the processing worker
+    parser = argparse.ArgumentParser(description="Remove soft-deleted students and teachers in throttled batches")
+    parser.add_argument("--once", action="store_true", help="reap what is waiting now, then exit")
+    args = parser.parse_args()
+    run_reaper(once=args.once)
@@ -0,0 +1,355 @@
+import argparse, json, logging, os, re, time, uuid, models
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from services.blob_store import UPLOAD_DIR, blob_exists, release_blobs, remove_blob_files
+from services.storage import LocalStorage, get_storage
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PATH = os.path.join(UPLOAD_DIR, ".reconcile", "checkpoint.json")
+# Flat files from before the blob store, listed once; delete it to list them again
+LEGACY_MANIFEST_PATH = os.path.join(UPLOAD_DIR, ".reconcile", "legacy_files.txt")
+ORPHAN_GRACE = 60 * 60  # seconds, younger files may belong to an upload still committing
+SHARD_COUNT = 256 * 256  # ab/cd directories in the blob layout
+DEFAULT_SHARDS_PER_RUN = 1024
+DEFAULT_ROWS_PER_RUN = 5000
+DEFAULT_OPS_PER_SECOND = 500
+
+SHA256_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+class _RateLimiter:
+    def __init__(self, ops_per_second: float):
+        self.interval = 1.0 / ops_per_second if ops_per_second else 0.0
+        self.next_at = time.monotonic()
+
+    def wait(self, ops: int = 1):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + self.interval * ops
+
+
+def _load_checkpoint() -> dict:
+    try:
+        with open(CHECKPOINT_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"shard": 0, "blob_sha256": "", "assignment_id": None, "legacy_offset": 0, "missing_blobs": {}, "missing_legacy_rows": {}}
+
+
+def _save_checkpoint(checkpoint: dict):
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+    temp_path = f"{CHECKPOINT_PATH}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, CHECKPOINT_PATH)
+
+
+def _is_stale(path: str, now: float) -> bool:
+    try:
+        return now - os.path.getmtime(path) > ORPHAN_GRACE
+    except FileNotFoundError:
+        return False
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Failed to remove {path}: {str(e)}")
+
+
+def _remove_orphan_blob(db: Session, sha256: str, path: str):
+    # An unreferenced row is put in first, so the file goes through
+    # remove_blob_files and cannot vanish under a submission of the same
+    # content that stores nothing because the file is already there
+    try:
+        db.execute(
+            insert(models.FileBlob)
+            .values(sha256=sha256, size=os.path.getsize(path), ref_count=0)
+            .on_conflict_do_nothing(index_elements=[models.FileBlob.sha256])
+        )
+        db.commit()
+    except (OSError, SQLAlchemyError) as e:
+        db.rollback()
+        logger.error(f"Failed to remove orphan blob {path}: {str(e)}")
+        return
+    remove_blob_files(db, [sha256])
+
+
+def scan_shards(db: Session, start: int, count: int, limiter: _RateLimiter, delete_orphans: bool, report: dict) -> int:
+    # Walks count shard directories from start, returning where the next run begins
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        return start
+
+    now = time.time()
+    index = start
+    for _ in range(min(count, SHARD_COUNT)):
+        directory = os.path.join(UPLOAD_DIR, f"{index >> 8:02x}", f"{index & 0xff:02x}")
+        index = (index + 1) % SHARD_COUNT
+
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            continue
+        limiter.wait(len(names) or 1)
+
+        blob_names = [name for name in names if SHA256_NAME.match(name)]
+        known = set()
+        if blob_names:
+            known = set(db.execute(
+                select(models.FileBlob.sha256).where(models.FileBlob.sha256.in_(blob_names))
+            ).scalars())
+
+        for name in names:
+            path = os.path.join(directory, name)
+            if name in known or not _is_stale(path, now):
+                continue
+            if name not in blob_names:
+                report["partial_files"].append(path)
+                if delete_orphans:
+                    _remove(path)
+                continue
+
+            report["orphan_blobs"].append(path)
+            if delete_orphans:
+                _remove_orphan_blob(db, name, path)
+
+    return index
+
+
+def scan_blob_rows(
+        db: Session,
+        after: str,
+        limit: int,
+        limiter: _RateLimiter,
+        delete_rows: bool,
+        report: dict,
+        missing: dict,
+) -> str:
+    # missing maps each blob found absent to when that was first seen. A blob
+    # released and acquired again is absent until its writer stores it again
+    # after the commit, so rows are only deleted once the blob was also absent
+    # on an earlier pass, ORPHAN_GRACE or longer ago.
+    now = time.time()
+    still_missing = set()
+    rows = db.execute(
+        select(models.FileBlob.sha256, models.FileBlob.ref_count)
+        .where(models.FileBlob.sha256 > after)
+        .order_by(models.FileBlob.sha256)
+        .limit(limit)
+    ).all()
+
+    for sha256, ref_count in rows:
+        limiter.wait()
+        if ref_count <= 0:
+            # Released but never cleaned up
+            report["unreferenced_blobs"].append(sha256)
+            if delete_rows:
+                db.rollback()
+                remove_blob_files(db, [sha256])
+            continue
+
+        if blob_exists(sha256):
+            continue
+
+        assignment_ids = db.execute(
+            select(models.Assignment.id).where(models.Assignment.blob_sha256 == sha256)
+        ).scalars().all()
+        report["dangling_assignments"].extend(str(assignment_id) for assignment_id in assignment_ids)
+        first_missing = missing.setdefault(sha256, now)
+        if not delete_rows or now - first_missing <= ORPHAN_GRACE:
+            still_missing.add(sha256)
+            continue
+
+        db.execute(delete(models.Assignment).where(models.Assignment.blob_sha256 == sha256))
+        db.flush()
+        release_blobs(db, {sha256: len(assignment_ids)})
+        db.commit()
+
+    # Forget blobs of this slice that turned up again or lost their rows
+    upper = rows[-1].sha256 if len(rows) == limit else None
+    for sha256 in [sha256 for sha256 in missing if sha256 > after and (upper is None or sha256 <= upper)]:
+        if sha256 not in still_missing:
+            del missing[sha256]
+    # Wrap around once the end of the table is reached
+    return upper or ""
+
+
+def scan_legacy_rows(
+        db: Session,
+        after_id,
+        limit: int,
+        limiter: _RateLimiter,
+        delete_rows: bool,
+        report: dict,
+        missing: dict,
+):
+    # missing maps each row whose flat file was found absent to when that was
+    # first seen, as in scan_blob_rows. The layout migration sets blob_sha256
+    # and then removes the flat file, so a row read just before it committed
+    # looks dangling; the grace period and the blob_sha256 check on delete
+    # keep such a row.
+    now = time.time()
+    still_missing = set()
+    rows = db.execute(
+        select(models.Assignment.id, models.Assignment.filename)
+        .where(
+            models.Assignment.blob_sha256.is_(None),
+            *([models.Assignment.id > uuid.UUID(after_id)] if after_id else []),
+        )
+        .order_by(models.Assignment.id)
+        .limit(limit)
+    ).all()
+
+    for assignment_id, filename in rows:
+        limiter.wait()
+        if filename and os.path.isfile(os.path.join(UPLOAD_DIR, filename)):
+            continue
+        report["dangling_assignments"].append(str(assignment_id))
+        first_missing = missing.setdefault(str(assignment_id), now)
+        if not delete_rows or now - first_missing <= ORPHAN_GRACE:
+            still_missing.add(str(assignment_id))
+            continue
+
+        db.execute(delete(models.Assignment).where(
+            models.Assignment.id == assignment_id, models.Assignment.blob_sha256.is_(None)
+        ))
+        db.commit()
+
+    # Forget rows of this slice that turned up again, were migrated or deleted
+    upper = str(rows[-1].id) if len(rows) == limit else None
+    for assignment_id in [key for key in missing if key > (after_id or "") and (upper is None or key <= upper)]:
+        if assignment_id not in still_missing:
+            del missing[assignment_id]
+    return upper
+
+
+def _write_legacy_manifest():
+    # Nothing is written flat into UPLOAD_DIR any more, so one listing covers
+    # every legacy file there will ever be
+    os.makedirs(os.path.dirname(LEGACY_MANIFEST_PATH), exist_ok=True)
+    temp_path = f"{LEGACY_MANIFEST_PATH}.tmp"
+    with open(temp_path, "w") as f, os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith("."):
+                f.write(entry.name + "\n")
+    os.replace(temp_path, LEGACY_MANIFEST_PATH)
+
+
+def scan_legacy_files(db: Session, offset: int, limit: int, limiter: _RateLimiter, delete_orphans: bool, report: dict) -> int:
+    # Reads limit names from the manifest at offset, returning the offset the next run starts at
+    now = time.time()
+    if not os.path.exists(LEGACY_MANIFEST_PATH):
+        _write_legacy_manifest()
+
+    with open(LEGACY_MANIFEST_PATH) as f:
+        f.seek(offset)
+        names = []
+        while len(names) < limit:
+            line = f.readline()
+            if not line:
+                break
+            names.append(line.rstrip("\n"))
+        offset = f.tell() if len(names) == limit else 0
+
+    if not names:
+        return 0
+
+    limiter.wait(len(names))
+    known = set(db.execute(
+        select(models.Assignment.filename).where(
+            models.Assignment.filename.in_(names),
+            models.Assignment.blob_sha256.is_(None),
+        )
+    ).scalars())
+
+    for name in names:
+        path = os.path.join(UPLOAD_DIR, name)
+        if name in known or not _is_stale(path, now):
+            continue
+        report["orphan_files"].append(path)
+        if delete_orphans:
+            _remove(path)
+
+    return offset
+
+
+def reconcile(
+        db: Session,
+        shards: int = DEFAULT_SHARDS_PER_RUN,
+        rows: int = DEFAULT_ROWS_PER_RUN,
+        ops_per_second: float = DEFAULT_OPS_PER_SECOND,
+        delete_orphans: bool = False,
+        delete_rows: bool = False,
+) -> dict:
+    # Each run covers a slice of the disk and of the tables, then saves where it
+    # stopped. Repeated runs cycle through everything without a full rescan.
+    checkpoint = _load_checkpoint()
+    limiter = _RateLimiter(ops_per_second)
+    report = {
+        "orphan_blobs": [],
+        "partial_files": [],
+        "orphan_files": [],
+        "unreferenced_blobs": [],
+        "dangling_assignments": [],
+    }
+
+    checkpoint["shard"] = scan_shards(db, checkpoint["shard"], shards, limiter, delete_orphans, report)
+    _save_checkpoint(checkpoint)
+
+    checkpoint.setdefault("missing_blobs", {})
+    checkpoint["blob_sha256"] = scan_blob_rows(
+        db, checkpoint["blob_sha256"], rows, limiter, delete_rows, report, checkpoint["missing_blobs"]
+    )
+    _save_checkpoint(checkpoint)
+
+    checkpoint.setdefault("missing_legacy_rows", {})
+    checkpoint["assignment_id"] = scan_legacy_rows(
+        db, checkpoint["assignment_id"], rows, limiter, delete_rows, report, checkpoint["missing_legacy_rows"]
+    )
+    _save_checkpoint(checkpoint)
+
+    if os.path.isdir(UPLOAD_DIR):
+        checkpoint["legacy_offset"] = scan_legacy_files(
+            db, checkpoint.get("legacy_offset", 0), rows, limiter, delete_orphans, report
+        )
+        _save_checkpoint(checkpoint)
+
+    for kind, items in report.items():
+        if items:
+            logger.warning(f"Reconcile found {len(items)} {kind.replace('_', ' ')}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile UPLOAD_DIR with the assignments tables")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS_PER_RUN, help="shard directories to walk this run")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS_PER_RUN, help="rows per table to check this run")
+    parser.add_argument("--ops-per-second", type=float, default=DEFAULT_OPS_PER_SECOND)
+    parser.add_argument("--delete", action="store_true", help="remove orphan and partial files")
+    parser.add_argument("--delete-rows", action="store_true", help="remove rows whose files are gone")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        result = reconcile(
+            session,
+            shards=args.shards,
+            rows=args.rows,
+            ops_per_second=args.ops_per_second,
+            delete_orphans=args.delete,
+            delete_rows=args.delete_rows,
+        )
+    print(json.dumps({kind: len(items) for kind, items in result.items()}))
@@ -0,0 +1,48 @@
+import logging, os, time
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", "30"))  # seconds a failed replica is skipped
+
+
+class ReplicaRouter:
+    # Hands out read replicas round-robin. A replica that fails to connect is
+    # skipped for REPLICA_RETRY_AFTER seconds, then tried again with live traffic.
+
+    def __init__(self, engines, retry_after: float = REPLICA_RETRY_AFTER):
+        self.engines = list(engines)
+        self.retry_after = retry_after
+        self._next = 0
+        self._down_until = {}
+
+    def candidates(self) -> list:
+        if not self.engines:
+            return []
+        start = self._next
+        self._next = (self._next + 1) % len(self.engines)
+
+        now = time.monotonic()
+        ordered = self.engines[start:] + self.engines[:start]
+        return [engine for engine in ordered if self._down_until.get(id(engine), 0) <= now]
+
+    def mark_down(self, engine, error: Exception):
+        if self._down_until.get(id(engine), 0) <= time.monotonic():
+            logger.error(f"Read replica {self._name(engine)} failed, skipping it for {self.retry_after}s: {str(error)}")
+        self._down_until[id(engine)] = time.monotonic() + self.retry_after
+
+    def mark_up(self, engine):
+        if self._down_until.pop(id(engine), None) is not None:
+            logger.info(f"Read replica {self._name(engine)} is back")
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {"replica": self._name(engine), "healthy": self._down_until.get(id(engine), 0) <= now}
+            for engine in self.engines
+        ]
+
+    @staticmethod
+    def _name(engine) -> str:
+        return engine.url.render_as_string(hide_password=True)
@@ -0,0 +1,94 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from fastapi import HTTPException, status
+import models, logging
+from services.pagination import InvalidCursorError, paginate
+from services.query_budget import query_budget
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StatsService:
+    # Reads the counter tables kept current by the assignment_stats trigger,
+    # a row per subject or student instead of a pass over assignments
+
+    @staticmethod
+    @query_budget(1)
+    async def get_assignment_stats(db: AsyncSession):
+        try:
+            result = await db.execute(
+                select(
+                    models.AssignmentSubjectStats.subject,
+                    models.AssignmentSubjectStats.submissions,
+                    models.AssignmentSubjectStats.uncommented,
+                ).order_by(models.AssignmentSubjectStats.subject)
+            )
+            subjects = [dict(row) for row in result.mappings()]
+
+            return {
+                "submissions": sum(subject["submissions"] for subject in subjects),
+                "uncommented": sum(subject["uncommented"] for subject in subjects),
+                "subjects": subjects,
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while retrieving assignment stats: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve assignment stats due to database error"
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error while retrieving assignment stats: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while retrieving assignment stats"
+            )
+
+    @staticmethod
+    @query_budget(1)
+    async def get_student_stats(db: AsyncSession, cursor: str | None, limit: int):
+        try:
+            rows, next_cursor = await paginate(
+                db,
+                select(
+                    models.Student.id,
+                    models.Student.name,
+                    models.AssignmentStudentStats.submissions,
+                    models.AssignmentStudentStats.uncommented,
+                )
+                .join(models.AssignmentStudentStats, models.AssignmentStudentStats.student_id == models.Student.id)
+                .where(models.Student.deleted_at.is_(None)),
+                (models.Student.name, models.Student.id),
+                "student_stats",
+                cursor,
+                limit,
+            )
+            logger.info(f"Retrieved stats for {len(rows)} students")
+            items = [
+                {"student_id": row.id, "student_name": row.name, "submissions": row.submissions, "uncommented": row.uncommented}
+                for row in rows
+            ]
+            return {"items": items, "next": next_cursor, "limit": limit}
+        except InvalidCursorError as e:
+            logger.warning(f"Invalid student stats cursor: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while retrieving student stats: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve student stats due to database error"
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error while retrieving student stats: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while retrieving student stats"
+            )
+
+
+stats_service = StatsService()
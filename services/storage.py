@@ -0,0 +1,285 @@
+import base64, logging, os, shutil, tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from urllib.parse import quote
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "assignments"
+MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
+CHUNK_SIZE = 1024 * 1024  # 1MB, upper bound on memory held per upload
+
+# "local" keeps files under UPLOAD_DIR, "s3" uses any S3-compatible store (AWS, MinIO)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "assignments/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+PRESIGN_EXPIRY = int(os.getenv("S3_PRESIGN_EXPIRY", "900"))  # seconds
+
+
+class FileTooLargeError(Exception):
+    pass
+
+
+class DirectUploadNotSupported(Exception):
+    pass
+
+
+def _open_temp_file(directory: str):
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _finish_temp_file(f, temp_path: str, file_path: str):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    # Same directory, so the rename is atomic and readers never see a partial file
+    os.replace(temp_path, file_path)
+
+
+def _discard_temp_file(f, temp_path: str):
+    try:
+        f.close()
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+async def stream_upload_to_disk(file: UploadFile, file_path: str, max_size: int = MAX_FILE_SIZE) -> int:
+    # Reads the upload in CHUNK_SIZE pieces, enforcing max_size as bytes arrive,
+    # and writes through a temp file off the event loop. Returns the byte count.
+    f, temp_path = await run_in_threadpool(_open_temp_file, os.path.dirname(file_path) or ".")
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError(f"Upload exceeded {max_size} bytes")
+            await run_in_threadpool(f.write, chunk)
+
+        await run_in_threadpool(_finish_temp_file, f, temp_path, file_path)
+        return size
+    except BaseException:
+        await run_in_threadpool(_discard_temp_file, f, temp_path)
+        raise
+
+
+class StorageBackend(ABC):
+    supports_direct_upload = False
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def put_upload(self, file: UploadFile, key: str, max_size: int = MAX_FILE_SIZE):
+        ...
+
+    @abstractmethod
+    def put_file(self, source_path: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def copy(self, source_key: str, key: str) -> bool:
+        # Within the store; False when key already exists, like put_file
+        ...
+
+    @abstractmethod
+    def open(self, key: str):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def stat(self, key: str) -> dict | None:
+        ...
+
+    def local_path(self, key: str) -> str | None:
+        return None
+
+    def presign_upload(self, key: str, sha256: str, size: int) -> dict:
+        raise DirectUploadNotSupported()
+
+    def presign_download(self, key: str, filename: str) -> str | None:
+        return None
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    async def put_upload(self, file: UploadFile, key: str, max_size: int = MAX_FILE_SIZE):
+        path = self.local_path(key)
+        await run_in_threadpool(os.makedirs, os.path.dirname(path), exist_ok=True)
+        await stream_upload_to_disk(file, path, max_size)
+
+    def put_file(self, source_path: str, key: str) -> bool:
+        path = self.local_path(key)
+        if os.path.exists(path):
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(source_path, path)
+        except FileExistsError:
+            return False
+        except OSError:
+            # Different filesystem or no hard link support, fall back to a copy.
+            # A temp file of its own per call, as other threads may be storing
+            # the same content right now.
+            f, temp_path = _open_temp_file(os.path.dirname(path))
+            try:
+                with open(source_path, "rb") as source:
+                    shutil.copyfileobj(source, f)
+            except BaseException:
+                _discard_temp_file(f, temp_path)
+                raise
+            _finish_temp_file(f, temp_path, path)
+        return True
+
+    def copy(self, source_key: str, key: str) -> bool:
+        return self.put_file(self.local_path(source_key), key)
+
+    def open(self, key: str):
+        return open(self.local_path(key), "rb")
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def stat(self, key: str) -> dict | None:
+        try:
+            return {"size": os.path.getsize(self.local_path(key)), "checksum_sha256": None}
+        except FileNotFoundError:
+            return None
+
+
+class S3Storage(StorageBackend):
+    supports_direct_upload = True
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str | None = None, region: str | None = None):
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("boto3 is required for STORAGE_BACKEND=s3")
+
+        if not bucket:
+            raise RuntimeError("S3_BUCKET must be set for STORAGE_BACKEND=s3")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        # SigV4 signs the checksum and Content-Length into presigned URLs
+        self._client = boto3.client(
+            "s3", endpoint_url=endpoint_url, region_name=region, config=Config(signature_version="s3v4")
+        )
+        self._client_error = ClientError
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _is_missing(self, error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    async def put_upload(self, file: UploadFile, key: str, max_size: int = MAX_FILE_SIZE):
+        # Size was already enforced while hashing; boto3 streams in multipart chunks
+        await run_in_threadpool(
+            self._client.upload_fileobj, file.file, self.bucket, self._key(key),
+            ExtraArgs={"ChecksumAlgorithm": "SHA256"},
+        )
+
+    def put_file(self, source_path: str, key: str) -> bool:
+        if self.exists(key):
+            return False
+        self._client.upload_file(
+            source_path, self.bucket, self._key(key),
+            ExtraArgs={"ChecksumAlgorithm": "SHA256"},
+        )
+        return True
+
+    def copy(self, source_key: str, key: str) -> bool:
+        if self.exists(key):
+            return False
+        # Server-side, the bytes never pass through the API
+        self._client.copy_object(
+            Bucket=self.bucket, Key=self._key(key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(source_key)},
+            ChecksumAlgorithm="SHA256",
+        )
+        return True
+
+    def open(self, key: str):
+        return self._client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+
+    def delete(self, key: str):
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def stat(self, key: str) -> dict | None:
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._key(key), ChecksumMode="ENABLED")
+        except self._client_error as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return {"size": head["ContentLength"], "checksum_sha256": head.get("ChecksumSHA256")}
+
+    def presign_upload(self, key: str, sha256: str, size: int) -> dict:
+        # The checksum is signed into the URL, so the store rejects any other content
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self._client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ContentLength": size,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=PRESIGN_EXPIRY,
+        )
+        return {
+            "url": url,
+            "method": "PUT",
+            "headers": {"x-amz-checksum-sha256": checksum, "Content-Length": str(size)},
+            "expires_in": PRESIGN_EXPIRY,
+        }
+
+    def presign_download(self, key: str, filename: str) -> str:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentDisposition": f"attachment; filename*=utf-8''{quote(filename)}",
+            },
+            ExpiresIn=PRESIGN_EXPIRY,
+        )
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION)
+    return LocalStorage(UPLOAD_DIR)
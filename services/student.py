@@ -1,9 +1,15 @@
+import uuid
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from fastapi import HTTPException, status
 import models,logging
 from schemas.student import StudentCreate
+from services.bulk_import import BulkImportError, insert_rows, validate_rows
+from services.cache import cached
+from services.pagination import InvalidCursorError, estimate_total, paginate
 
 
 logging.basicConfig(level=logging.INFO)
@@ -12,7 +18,7 @@ logger = logging.getLogger(__name__)
 
 class StudentService:
     @staticmethod
-    def create_student(db: Session, student_in: StudentCreate):
+    async def create_student(db: AsyncSession, student_in: StudentCreate):
         try:
             if not student_in.name or not student_in.name.strip():
                 logger.error("Student name is required")
@@ -28,40 +34,45 @@ class StudentService:
                     detail="Student email is required"
                 )
 
-            # Check if student already exists
-            existing_student = db.query(models.Student).filter(
-                models.Student.email == student_in.email
-            ).first()
+            # One round trip: an existing email shows up as no row returned
+            # instead of a SELECT beforehand that a concurrent insert could race
+            email = student_in.email.strip()
+            result = await db.execute(
+                insert(models.Student)
+                .values(id=uuid.uuid4(), name=student_in.name.strip(), email=email)
+                .on_conflict_do_nothing(index_elements=[models.Student.email], index_where=models.Student.deleted_at.is_(None))
+                .returning(models.Student.id, models.Student.name, models.Student.email)
+            )
+            student = result.mappings().first()
 
-            if existing_student:
-                logger.warning(f"Student with email {student_in.email} already exists")
+            if student is None:
+                await db.rollback()
+                logger.warning(f"Student with email {email} already exists")
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
-                    detail=f"Student with email {student_in.email} already exists"
+                    detail=f"Student with email {email} already exists"
                 )
 
-            # Create new student
-            db_student = models.Student(
-                name=student_in.name.strip(),
-                email=student_in.email.strip()
-            )
-
-            db.add(db_student)
-            db.commit()
-            db.refresh(db_student)
+            await db.commit()
 
-            logger.info(f"Student created successfully: {db_student.id}")
-            return db_student
+            logger.info(f"Student created successfully: {student['id']}")
+            return student
 
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
+            if "students_name_live_key" in str(e.orig) or "students.name" in str(e.orig):
+                logger.warning(f"Student with name {student_in.name.strip()} already exists")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Student with name {student_in.name.strip()} already exists"
+                )
             logger.error(f"Database integrity error while creating student: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid data provided for student creation"
             )
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error while creating student: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,7 +81,7 @@ class StudentService:
         except HTTPException:
             raise
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Unexpected error while creating student: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -78,11 +89,68 @@ class StudentService:
             )
 
     @staticmethod
-    def get_all_students(db: Session):
+    async def bulk_create_students(db: AsyncSession, rows: list):
+        try:
+            valid, outcomes = validate_rows(
+                rows,
+                name_max_length=100,
+                email_max_length=255,
+                lowercase_email=False,
+                unique_name=True,
+            )
+            result = await insert_rows(db, models.Student, valid, outcomes)
+            # One transaction for the whole import
+            await db.commit()
+
+            logger.info(
+                f"Bulk student import: {result['created']} created, "
+                f"{result['duplicate']} duplicate, {result['invalid']} invalid"
+            )
+            return result
+
+        except BulkImportError as e:
+            logger.warning(f"Rejected bulk student import: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Database error while importing students: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to import students due to database error"
+            )
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Unexpected error while importing students: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while importing students"
+            )
+
+    @staticmethod
+    @cached("students")
+    async def get_all_students(db: AsyncSession, cursor: str | None, limit: int, include_total: bool = False):
         try:
-            students = db.query(models.Student).all()
-            logger.info(f"Retrieved {len(students)} students")
-            return students
+            rows, next_cursor = await paginate(
+                db,
+                select(models.Student.id, models.Student.name, models.Student.email)
+                .where(models.Student.deleted_at.is_(None)),
+                (models.Student.name, models.Student.id),
+                "students",
+                cursor,
+                limit,
+            )
+            total = await estimate_total(db, "students") if include_total else None
+            logger.info(f"Retrieved {len(rows)} students")
+            return {"items": [dict(row._mapping) for row in rows], "next": next_cursor, "limit": limit, "total": total}
+        except InvalidCursorError as e:
+            logger.warning(f"Invalid students cursor: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
         except SQLAlchemyError as e:
             logger.error(f"Database error while retrieving students: {str(e)}")
             raise HTTPException(
@@ -97,13 +165,11 @@ class StudentService:
             )
 
     @staticmethod
-    def get_student_by_id(db: Session, student_id: UUID):
+    async def get_student_by_id(db: AsyncSession, student_id: UUID):
         try:
-            student = db.query(models.Student).filter(
-                models.Student.id == student_id
-            ).first()
+            student = await db.get(models.Student, student_id)
 
-            if not student:
+            if not student or student.deleted_at is not None:
                 logger.warning(f"Student with ID {student_id} not found")
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -127,36 +193,41 @@ class StudentService:
             )
 
     @staticmethod
-    def delete_student(db: Session, student_id: UUID):
+    async def delete_student(db: AsyncSession, student_id: UUID):
         try:
-            student = db.query(models.Student).filter(
-                models.Student.id == student_id
-            ).first()
+            # Only marks the student; services.reaper removes the submissions
+            # and their files in small batches afterwards
+            result = await db.execute(
+                update(models.Student)
+                .where(models.Student.id == student_id, models.Student.deleted_at.is_(None))
+                .values(deleted_at=func.now())
+                .returning(models.Student.id)
+            )
 
-            if not student:
+            if result.first() is None:
                 logger.warning(f"Student with ID {student_id} not found")
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Student with ID {student_id} not found"
                 )
 
-            db.delete(student)
-            db.commit()
+            await db.commit()
 
             logger.info(f"Student deleted successfully: {student_id}")
             return {"message": f"Student with ID {student_id} deleted successfully"}
 
         except HTTPException:
+            await db.rollback()
             raise
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error while deleting student: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete student due to database error"
             )
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Unexpected error while deleting student: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
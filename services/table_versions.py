@@ -0,0 +1,75 @@
+import argparse, logging
+from sqlalchemy import BigInteger, cast, func, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Narrower keys in table_versions, bumped by the writes that can change the
+# assignments of one student or one subject (see the scope version triggers)
+def student_scope(name: str) -> str:
+    return f"student:{name}"
+
+
+def subject_scope(subject: str) -> str:
+    return f"subject:{subject}"
+
+
+async def read_table_versions(db: AsyncSession, tables) -> list[int]:
+    # The table_versions triggers bump a table's counter in every transaction
+    # that writes to it. Read once per session, i.e. per request, so the ETag
+    # and the cache key of a response describe the same state; both are read
+    # before the data, which can then only be as new or newer.
+    known = db.info.setdefault("table_versions", {})
+    missing = [table for table in tables if table not in known]
+    if missing:
+        # A counter is spread over one row per writing backend, see the shard
+        # migration; the sum only grows, by one per committed transaction
+        result = await db.execute(
+            select(models.TableVersion.table_name, cast(func.sum(models.TableVersion.version), BigInteger))
+            .where(models.TableVersion.table_name.in_(missing))
+            .group_by(models.TableVersion.table_name)
+        )
+        versions = dict(result.all())
+        known.update({table: versions.get(table, 0) for table in missing})
+    return [known[table] for table in tables]
+
+
+def fold_table_versions(db: Session) -> int:
+    # Every backend that ever wrote a key leaves a row for it. Fold those into
+    # shard 0, leaving the sums as they are; rows a transaction in progress
+    # holds are skipped rather than waited for, and folded on the next run.
+    try:
+        folded = db.execute(text("""
+            WITH folded AS (
+                DELETE FROM table_versions v USING (
+                    SELECT table_name, shard FROM table_versions WHERE shard <> 0 FOR UPDATE SKIP LOCKED
+                ) AS idle
+                WHERE v.table_name = idle.table_name AND v.shard = idle.shard
+                RETURNING v.table_name, v.version
+            )
+            INSERT INTO table_versions AS v (table_name, shard, version)
+            SELECT table_name, 0, sum(version) FROM folded GROUP BY table_name
+            ON CONFLICT (table_name, shard) DO UPDATE SET version = v.version + excluded.version
+        """)).rowcount
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Failed to fold table versions: {str(e)}")
+        raise
+    logger.info(f"Folded the table versions of {folded} keys")
+    return folded
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Fold the per-backend table_versions rows, run daily from cron").parse_args()
+
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        fold_table_versions(session)
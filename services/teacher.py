@@ -1,9 +1,15 @@
+import uuid
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from fastapi import HTTPException, status
 import models, logging
 from schemas.teacher import TeacherCreate
+from services.bulk_import import BulkImportError, insert_rows, validate_rows
+from services.cache import cached
+from services.pagination import InvalidCursorError, estimate_total, paginate
 
 
 logging.basicConfig(level=logging.INFO)
@@ -12,7 +18,7 @@ logger = logging.getLogger(__name__)
 
 class TeacherService:
     @staticmethod
-    def create_teacher(db: Session, teacher_in: TeacherCreate):
+    async def create_teacher(db: AsyncSession, teacher_in: TeacherCreate):
         try:
             # Validate input data
             if not teacher_in.name or not teacher_in.name.strip():
@@ -29,39 +35,38 @@ class TeacherService:
                     detail="Teacher email is required"
                 )
 
-            existing_teacher = db.query(models.Teacher).filter(
-                models.Teacher.email == teacher_in.email
-            ).first()
+            # Emails are stored lowercased, the conflict check has to compare the same form
+            email = teacher_in.email.strip().lower()
+            result = await db.execute(
+                insert(models.Teacher)
+                .values(id=uuid.uuid4(), name=teacher_in.name.strip(), email=email)
+                .on_conflict_do_nothing(index_elements=[models.Teacher.email], index_where=models.Teacher.deleted_at.is_(None))
+                .returning(models.Teacher.id, models.Teacher.name, models.Teacher.email)
+            )
+            teacher = result.mappings().first()
 
-            if existing_teacher:
-                logger.warning(f"Teacher with email {teacher_in.email} already exists")
+            if teacher is None:
+                await db.rollback()
+                logger.warning(f"Teacher with email {email} already exists")
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
-                    detail=f"Teacher with email {teacher_in.email} already exists"
+                    detail=f"Teacher with email {email} already exists"
                 )
 
-            # Create new teacher
-            db_teacher = models.Teacher(
-                name=teacher_in.name.strip(),
-                email=teacher_in.email.strip().lower()
-            )
-
-            db.add(db_teacher)
-            db.commit()
-            db.refresh(db_teacher)
+            await db.commit()
 
-            logger.info(f"Teacher created successfully: {db_teacher.id}")
-            return db_teacher
+            logger.info(f"Teacher created successfully: {teacher['id']}")
+            return teacher
 
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database integrity error while creating teacher: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid data provided for teacher creation"
             )
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error while creating teacher: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,7 +75,7 @@ class TeacherService:
         except HTTPException:
             raise
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Unexpected error while creating teacher: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -78,11 +83,68 @@ class TeacherService:
             )
 
     @staticmethod
-    def get_all_teachers(db: Session):
+    async def bulk_create_teachers(db: AsyncSession, rows: list):
+        try:
+            valid, outcomes = validate_rows(
+                rows,
+                name_max_length=50,
+                email_max_length=None,
+                lowercase_email=True,
+                unique_name=False,
+            )
+            result = await insert_rows(db, models.Teacher, valid, outcomes)
+            # One transaction for the whole import
+            await db.commit()
+
+            logger.info(
+                f"Bulk teacher import: {result['created']} created, "
+                f"{result['duplicate']} duplicate, {result['invalid']} invalid"
+            )
+            return result
+
+        except BulkImportError as e:
+            logger.warning(f"Rejected bulk teacher import: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Database error while importing teachers: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to import teachers due to database error"
+            )
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Unexpected error while importing teachers: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An unexpected error occurred while importing teachers"
+            )
+
+    @staticmethod
+    @cached("teachers")
+    async def get_all_teachers(db: AsyncSession, cursor: str | None, limit: int, include_total: bool = False):
         try:
-            teachers = db.query(models.Teacher).all()
-            logger.info(f"Retrieved {len(teachers)} teachers")
-            return teachers
+            rows, next_cursor = await paginate(
+                db,
+                select(models.Teacher.id, models.Teacher.name, models.Teacher.email)
+                .where(models.Teacher.deleted_at.is_(None)),
+                (models.Teacher.name, models.Teacher.id),
+                "teachers",
+                cursor,
+                limit,
+            )
+            total = await estimate_total(db, "teachers") if include_total else None
+            logger.info(f"Retrieved {len(rows)} teachers")
+            return {"items": [dict(row._mapping) for row in rows], "next": next_cursor, "limit": limit, "total": total}
+        except InvalidCursorError as e:
+            logger.warning(f"Invalid teachers cursor: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
         except SQLAlchemyError as e:
             logger.error(f"Database error while retrieving teachers: {str(e)}")
             raise HTTPException(
@@ -97,13 +159,11 @@ class TeacherService:
             )
 
     @staticmethod
-    def get_teacher_by_id(db: Session, teacher_id: UUID):
+    async def get_teacher_by_id(db: AsyncSession, teacher_id: UUID):
         try:
-            teacher = db.query(models.Teacher).filter(
-                models.Teacher.id == teacher_id
-            ).first()
+            teacher = await db.get(models.Teacher, teacher_id)
 
-            if not teacher:
+            if not teacher or teacher.deleted_at is not None:
                 logger.warning(f"Teacher with ID {teacher_id} not found")
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -127,11 +187,31 @@ class TeacherService:
             )
 
     @staticmethod
-    def update_teacher(db: Session, teacher_id: UUID, teacher_in: TeacherCreate):
+    async def update_teacher(db: AsyncSession, teacher_id: UUID, teacher_in: TeacherCreate):
         try:
-            teacher = db.query(models.Teacher).filter(
-                models.Teacher.id == teacher_id
-            ).first()
+            values = {}
+            if teacher_in.name:
+                values["name"] = teacher_in.name.strip()
+            if teacher_in.email:
+                values["email"] = teacher_in.email.strip().lower()
+
+            # The unique constraint on email answers "taken by another teacher"
+            # within the UPDATE itself, no SELECT beforehand
+            try:
+                result = await db.execute(
+                    update(models.Teacher)
+                    .where(models.Teacher.id == teacher_id, models.Teacher.deleted_at.is_(None))
+                    .values(**values)
+                    .returning(models.Teacher.id, models.Teacher.name, models.Teacher.email)
+                )
+            except IntegrityError:
+                await db.rollback()
+                logger.warning(f"Email {values.get('email')} is already taken by another teacher")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Email {values.get('email')} is already taken by another teacher"
+                )
+            teacher = result.mappings().first()
 
             if not teacher:
                 logger.warning(f"Teacher with ID {teacher_id} not found")
@@ -140,45 +220,23 @@ class TeacherService:
                     detail=f"Teacher with ID {teacher_id} not found"
                 )
 
-
-            # Check if email is already taken by another teacher
-            if teacher_in.email and teacher_in.email != teacher.email:
-                existing_teacher = db.query(models.Teacher).filter(
-                    models.Teacher.email == teacher_in.email,
-                    models.Teacher.id != teacher_id
-                ).first()
-
-                if existing_teacher:
-                    logger.warning(f"Email {teacher_in.email} is already taken by another teacher")
-                    raise HTTPException(
-                        status_code=status.HTTP_409_CONFLICT,
-                        detail=f"Email {teacher_in.email} is already taken by another teacher"
-                    )
-
-            # Update teacher fields
-            if teacher_in.name:
-                teacher.name = teacher_in.name.strip()
-            if teacher_in.email:
-                teacher.email = teacher_in.email.strip().lower()
-
-            db.commit()
-            db.refresh(teacher)
+            await db.commit()
 
             logger.info(f"Teacher updated successfully: {teacher_id}")
             return teacher
 
         except HTTPException:
-            db.rollback()
+            await db.rollback()
             raise
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error while updating teacher: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to update teacher due to database error"
             )
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Unexpected error while updating teacher: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -186,37 +244,40 @@ class TeacherService:
             )
 
     @staticmethod
-    def delete_teacher(db: Session, teacher_id: UUID):
+    async def delete_teacher(db: AsyncSession, teacher_id: UUID):
         try:
-            teacher = db.query(models.Teacher).filter(
-                models.Teacher.id == teacher_id
-            ).first()
+            # Only marks the teacher; services.reaper removes the comments afterwards
+            result = await db.execute(
+                update(models.Teacher)
+                .where(models.Teacher.id == teacher_id, models.Teacher.deleted_at.is_(None))
+                .values(deleted_at=func.now())
+                .returning(models.Teacher.id)
+            )
 
-            if not teacher:
+            if result.first() is None:
                 logger.warning(f"Teacher with ID {teacher_id} not found")
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Teacher with ID {teacher_id} not found"
                 )
 
-            db.delete(teacher)
-            db.commit()
+            await db.commit()
 
             logger.info(f"Teacher deleted successfully: {teacher_id}")
             return {"message": f"Teacher with ID {teacher_id} deleted successfully"}
 
         except HTTPException:
-            db.rollback()
+            await db.rollback()
             raise
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error while deleting teacher: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete teacher due to database error"
             )
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Unexpected error while deleting teacher: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,220 @@
+import fcntl, json, logging, os, shutil, time, uuid
+from datetime import datetime, timezone
+from fastapi.concurrency import run_in_threadpool
+from services.blob_store import UPLOAD_DIR, FileTooLargeError
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Partial uploads live on local disk next to the blob store, one directory per session
+SESSION_DIR = os.path.join(UPLOAD_DIR, ".sessions")
+SESSION_TTL = 24 * 60 * 60  # seconds a session may stay open
+GC_INTERVAL = 10 * 60  # seconds between opportunistic sweeps
+
+_last_gc = 0.0
+
+
+class SessionNotFoundError(Exception):
+    pass
+
+
+class SessionBusyError(Exception):
+    pass
+
+
+class OffsetMismatchError(Exception):
+    def __init__(self, offset: int):
+        super().__init__(f"Upload offset is {offset}")
+        self.offset = offset
+
+
+def _session_dir(session_id: uuid.UUID) -> str:
+    return os.path.join(SESSION_DIR, str(session_id))
+
+
+def _meta_path(session_id: uuid.UUID) -> str:
+    return os.path.join(_session_dir(session_id), "meta.json")
+
+
+def data_path(session_id: uuid.UUID) -> str:
+    return os.path.join(_session_dir(session_id), "data.part")
+
+
+def _read_meta(session_id: uuid.UUID) -> dict:
+    try:
+        with open(_meta_path(session_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        raise SessionNotFoundError(str(session_id))
+
+
+def _with_offset(meta: dict, offset: int) -> dict:
+    return {
+        **meta,
+        "offset": offset,
+        "expires_at": datetime.fromtimestamp(meta["expires_at"], tz=timezone.utc),
+    }
+
+
+def create_session(details: dict) -> dict:
+    session_id = uuid.uuid4()
+    directory = _session_dir(session_id)
+    os.makedirs(directory)
+
+    meta = {**details, "id": str(session_id), "expires_at": time.time() + SESSION_TTL}
+    open(data_path(session_id), "wb").close()
+
+    temp_path = f"{_meta_path(session_id)}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(temp_path, _meta_path(session_id))
+
+    return _with_offset(meta, 0)
+
+
+def load_session(session_id: uuid.UUID) -> dict:
+    meta = _read_meta(session_id)
+    if meta["expires_at"] < time.time():
+        raise SessionNotFoundError(str(session_id))
+
+    try:
+        offset = os.path.getsize(data_path(session_id))
+    except FileNotFoundError:
+        raise SessionNotFoundError(str(session_id))
+    return _with_offset(meta, offset)
+
+
+def _open_for_append(session_id: uuid.UUID, offset: int):
+    try:
+        f = open(data_path(session_id), "r+b")
+    except FileNotFoundError:
+        raise SessionNotFoundError(str(session_id))
+
+    try:
+        # One writer per session across all workers
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise SessionBusyError(str(session_id))
+
+    current = os.fstat(f.fileno()).st_size
+    if current != offset:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        f.close()
+        raise OffsetMismatchError(current)
+
+    f.seek(offset)
+    return f
+
+
+def _close_after_append(f, truncate_to: int | None = None):
+    try:
+        if truncate_to is not None:
+            f.truncate(truncate_to)
+        f.flush()
+        os.fsync(f.fileno())
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        f.close()
+
+
+async def append_chunk(session_id: uuid.UUID, offset: int, chunks) -> int:
+    # Appends an async stream of bytes at offset. Bytes received before a client
+    # disconnect are kept so the next PATCH can resume from there.
+    session = load_session(session_id)
+    f = await run_in_threadpool(_open_for_append, session_id, offset)
+
+    position = offset
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if position + len(chunk) > session["size"]:
+                raise FileTooLargeError(f"Upload exceeded {session['size']} bytes")
+            await run_in_threadpool(f.write, chunk)
+            position += len(chunk)
+    except FileTooLargeError:
+        await run_in_threadpool(_close_after_append, f, offset)
+        raise
+    except BaseException:
+        await run_in_threadpool(_close_after_append, f)
+        raise
+
+    await run_in_threadpool(_close_after_append, f)
+    return position
+
+
+def _claimed_path(session_id: uuid.UUID) -> str:
+    return f"{_meta_path(session_id)}.claimed"
+
+
+def claim_session(session_id: uuid.UUID):
+    # Renaming meta.json is atomic, so of two concurrent completes only one
+    # goes on to create the assignment; the session is invisible meanwhile
+    try:
+        os.rename(_meta_path(session_id), _claimed_path(session_id))
+    except FileNotFoundError:
+        if os.path.exists(_claimed_path(session_id)):
+            raise SessionBusyError(str(session_id))
+        raise SessionNotFoundError(str(session_id))
+
+
+def release_session(session_id: uuid.UUID):
+    # Undoes claim_session when completing failed, so the client can retry
+    try:
+        os.rename(_claimed_path(session_id), _meta_path(session_id))
+    except FileNotFoundError:
+        pass
+
+
+def discard_session(session_id: uuid.UUID):
+    shutil.rmtree(_session_dir(session_id), ignore_errors=True)
+
+
+def purge_expired_sessions(now: float | None = None) -> int:
+    now = now or time.time()
+    purged = 0
+    try:
+        entries = os.listdir(SESSION_DIR)
+    except FileNotFoundError:
+        return 0
+
+    for entry in entries:
+        try:
+            session_id = uuid.UUID(entry)
+        except ValueError:
+            continue
+
+        try:
+            expires_at = _read_meta(session_id)["expires_at"]
+        except SessionNotFoundError:
+            # Crashed before meta.json was written or while claimed, fall back to the directory age
+            try:
+                expires_at = os.path.getmtime(_session_dir(session_id)) + SESSION_TTL
+            except FileNotFoundError:
+                continue
+
+        if expires_at < now:
+            discard_session(session_id)
+            purged += 1
+
+    if purged:
+        logger.info(f"Purged {purged} expired upload sessions")
+    return purged
+
+
+def maybe_purge_expired_sessions():
+    global _last_gc
+    if time.time() - _last_gc < GC_INTERVAL:
+        return
+    _last_gc = time.time()
+    try:
+        purge_expired_sessions()
+    except OSError as e:
+        logger.error(f"Failed to purge expired upload sessions: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Run from cron to sweep sessions on instances that see little upload traffic
+    purge_expired_sessions()
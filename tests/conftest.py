@@ -0,0 +1,172 @@
+import os, tempfile
+from contextlib import contextmanager
+
+# database.py builds its engines at import, so this goes before any app import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+# A scratch Postgres database for the locking and trigger tests SQLite cannot
+# stand in for; it is wiped and migrated to head, the tests skip without it
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+import pytest
+from sqlalchemy import bindparam, create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import functions
+from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql.expression import Values
+import database, models
+
+
+# SQLite stand-ins for the Postgres types and full-text search the models use
+@compiles(JSONB, "sqlite")
+def _compile_jsonb(element, compiler, **kw):
+    return "JSON"
+
+
+@compiles(TSVECTOR, "sqlite")
+def _compile_tsvector(element, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(functions.now, "sqlite")
+def _compile_now(element, compiler, **kw):
+    # In the format SQLAlchemy stores datetimes in, so a server default
+    # compares equal to the same value bound as a parameter
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+@compiles(BinaryExpression, "sqlite")
+def _compile_binary(element, compiler, **kw):
+    if getattr(element.operator, "opstring", None) == "@@":
+        return f"ts_match({compiler.process(element.left, **kw)}, {compiler.process(element.right, **kw)})"
+    return compiler.visit_binary(element, **kw)
+
+
+@compiles(Values, "sqlite")
+def _compile_values(element, compiler, **kw):
+    # SQLite takes no column names after a VALUES alias, selecting them does the same
+    rows = [row for chunk in element._data for row in chunk]
+    selects = " UNION ALL ".join(
+        "SELECT " + ", ".join(
+            f"{compiler.process(bindparam(None, value, type_=column.type), **kw)} AS {column.name}"
+            for column, value in zip(element.columns, row)
+        )
+        for row in rows
+    )
+    return f"({selects}) AS {element.name}"
+
+
+def _ts_match(vector, query):
+    # Prefix terms joined with &, as AssignmentService._search_query builds them
+    words = (vector or "").split()
+    terms = [term.removesuffix(":*") for term in query.split(" & ")]
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+
+@event.listens_for(database.engine, "connect")
+@event.listens_for(database.async_engine.sync_engine, "connect")
+def _register_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("to_tsquery", 2, lambda config, query: query)
+    dbapi_connection.create_function("ts_rank_cd", 2, lambda vector, query: 1.0)
+    dbapi_connection.create_function("ts_match", 2, _ts_match)
+
+
+@contextmanager
+def count_statements():
+    counter = [0]
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    engine = database.async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+VERSIONED_TABLES = ["students", "teachers", "assignments", "teacher_comments"]
+# The student and subject keys each row maps to, as in the scope version migration
+SCOPE_KEYS = {
+    "students": "SELECT 'student:' || {row}.name AS key",
+    "assignments": (
+        "SELECT 'subject:' || {row}.subject AS key "
+        "UNION SELECT 'student:' || name FROM students WHERE id = {row}.student_id"
+    ),
+    "teacher_comments": (
+        "SELECT 'subject:' || subject AS key FROM assignments WHERE teacher_comment_id = {row}.id "
+        "UNION SELECT 'student:' || s.name FROM assignments a JOIN students s ON s.id = a.student_id "
+        "WHERE a.teacher_comment_id = {row}.id"
+    ),
+}
+
+
+def _create_version_triggers():
+    # Per row rather than per statement as in the migration, which SQLite lacks
+    with database.engine.begin() as connection:
+        for table in VERSIONED_TABLES:
+            connection.exec_driver_sql(f"INSERT INTO table_versions (table_name, shard, version) VALUES ('{table}', 0, 0)")
+            for operation in ("INSERT", "UPDATE", "DELETE"):
+                connection.exec_driver_sql(f"""
+                    CREATE TRIGGER {table}_version_{operation.lower()} AFTER {operation} ON {table}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                    END
+                """)
+            if table not in SCOPE_KEYS:
+                continue
+            for operation, rows in (("INSERT", ["NEW"]), ("UPDATE", ["NEW", "OLD"]), ("DELETE", ["OLD"])):
+                keys = " UNION ".join(SCOPE_KEYS[table].format(row=row) for row in rows)
+                if table == "students" and operation == "UPDATE":
+                    keys += (" UNION SELECT 'subject:' || subject FROM assignments WHERE student_id = NEW.id"
+                             " AND (OLD.deleted_at IS NULL) <> (NEW.deleted_at IS NULL)")
+                connection.exec_driver_sql(f"""
+                    CREATE TRIGGER {table}_scope_version_{operation.lower()} AFTER {operation} ON {table}
+                    BEGIN
+                        INSERT INTO table_versions (table_name, shard, version)
+                        SELECT key, 0, 1 FROM ({keys}) WHERE key IS NOT NULL
+                        ON CONFLICT (table_name, shard) DO UPDATE SET version = version + 1;
+                    END
+                """)
+
+
+@pytest.fixture
+def db_schema():
+    models.Base.metadata.drop_all(database.engine)
+    models.Base.metadata.create_all(database.engine)
+    _create_version_triggers()
+    yield
+    models.Base.metadata.drop_all(database.engine)
+
+
+def _reset_postgres_schema(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP SCHEMA public CASCADE")
+        connection.exec_driver_sql("CREATE SCHEMA public")
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    from alembic import command
+    from alembic.config import Config
+
+    engine = create_engine(TEST_POSTGRES_URL)
+    _reset_postgres_schema(engine)
+    # alembic/env.py takes the database from DATABASE_URL
+    sqlite_url = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = TEST_POSTGRES_URL
+    try:
+        command.upgrade(Config(os.path.join(os.path.dirname(__file__), "..", "alembic.ini")), "head")
+    finally:
+        os.environ["DATABASE_URL"] = sqlite_url
+    yield engine
+    _reset_postgres_schema(engine)
+    engine.dispose()
@@ -0,0 +1,115 @@
+import uuid
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+import database, models
+from conftest import count_statements
+from schemas.assignment import CommentBatchIn
+from services import assignment as assignment_service
+from services.assignment import AssignmentService
+
+pytestmark = pytest.mark.anyio
+
+
+def seed(count: int):
+    with database.SessionLocal() as db:
+        teacher = models.Teacher(name="ada", email="ada@example.com")
+        student = models.Student(name="grace", email="grace@example.com")
+        db.add_all([teacher, student])
+        db.flush()
+        assignments = [
+            models.Assignment(
+                student_id=student.id, subject="maths", description=f"essay {index}",
+                filename=f"essay{index}.txt", submitted_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+            )
+            for index in range(count)
+        ]
+        db.add_all(assignments)
+        db.commit()
+        return teacher.id, student.id, [assignment.id for assignment in assignments]
+
+
+async def grade(teacher_id, items):
+    batch = CommentBatchIn(teacher_id=teacher_id, items=[
+        {"assignment_id": assignment_id, "comment": comment} for assignment_id, comment in items
+    ])
+    async with database.AsyncSessionLocal() as db:
+        return await AssignmentService.add_teacher_comments(db, batch)
+
+
+def comments() -> dict:
+    with database.SessionLocal() as db:
+        return dict(db.execute(
+            select(models.Assignment.id, models.TeacherComment.comment)
+            .join(models.TeacherComment, models.Assignment.teacher_comment_id == models.TeacherComment.id)
+        ).all())
+
+
+async def test_each_item_gets_its_own_outcome(db_schema):
+    teacher_id, _, (first, second, third) = seed(3)
+    missing = uuid.uuid4()
+
+    result = await grade(teacher_id, [
+        (first, "good"),
+        (second, "  "),
+        (first, "again"),
+        (missing, "lost"),
+        (third, "fine"),
+    ])
+
+    assert [row["status"] for row in result["rows"]] == ["created", "invalid", "duplicate", "not_found", "created"]
+    assert (result["created"], result["updated"], result["not_found"], result["duplicate"], result["invalid"]) == (2, 0, 1, 1, 1)
+    assert comments() == {first: "good", third: "fine"}
+
+
+async def test_regrading_rewrites_the_existing_comment(db_schema):
+    teacher_id, _, (first, second) = seed(2)
+    await grade(teacher_id, [(first, "draft")])
+    with database.SessionLocal() as db:
+        comment_id = db.get(models.Assignment, first).teacher_comment_id
+
+    result = await grade(teacher_id, [(first, " final "), (second, "new")])
+
+    assert [row["status"] for row in result["rows"]] == ["updated", "created"]
+    assert comments() == {first: "final", second: "new"}
+    with database.SessionLocal() as db:
+        assert db.get(models.Assignment, first).teacher_comment_id == comment_id
+        assert db.scalar(select(func.count()).select_from(models.TeacherComment)) == 2
+
+
+async def test_statement_count_does_not_grow_with_the_batch(db_schema):
+    teacher_id, _, ids = seed(6)
+    await grade(teacher_id, [(ids[0], "draft"), (ids[1], "draft")])
+
+    # Teacher, locking read, rewrite, insert and link, for six items as for one
+    with count_statements() as counter:
+        await grade(teacher_id, [(assignment_id, "final") for assignment_id in ids])
+    assert counter[0] == 5
+
+
+async def test_deleted_student_submissions_are_not_found(db_schema):
+    teacher_id, student_id, (first,) = seed(1)
+    with database.SessionLocal() as db:
+        db.get(models.Student, student_id).deleted_at = func.now()
+        db.commit()
+
+    result = await grade(teacher_id, [(first, "good")])
+    assert result["rows"][0]["status"] == "not_found"
+    assert comments() == {}
+
+
+async def test_unknown_teacher_is_404(db_schema):
+    _, _, (first,) = seed(1)
+    with pytest.raises(HTTPException) as error:
+        await grade(uuid.uuid4(), [(first, "good")])
+    assert error.value.status_code == 404
+    assert comments() == {}
+
+
+async def test_oversized_batch_is_400(db_schema, monkeypatch):
+    monkeypatch.setattr(assignment_service, "BATCH_MAX_COMMENTS", 1)
+    teacher_id, _, ids = seed(2)
+    with pytest.raises(HTTPException) as error:
+        await grade(teacher_id, [(assignment_id, "good") for assignment_id in ids])
+    assert error.value.status_code == 400
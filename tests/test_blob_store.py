@@ -0,0 +1,48 @@
+import pytest
+import database, models
+from services import blob_store
+from services.blob_store import blob_key, release_blobs, remove_blob_files
+from services.storage import LocalStorage
+
+SHA256 = "ab" * 32
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, db_schema):
+    store = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(blob_store, "get_storage", lambda: store)
+    source = tmp_path / "source"
+    source.write_bytes(b"essay")
+    store.put_file(str(source), blob_key(SHA256))
+    with database.SessionLocal() as db:
+        db.add(models.FileBlob(sha256=SHA256, size=5, ref_count=2))
+        db.commit()
+    return store
+
+
+def release(count: int) -> list[str]:
+    with database.SessionLocal() as db:
+        released = release_blobs(db, {SHA256: count})
+        db.commit()
+    return released
+
+
+def test_release_keeps_the_row_until_the_file_is_removed(store):
+    assert release(1) == []
+    assert release(1) == [SHA256]
+    with database.SessionLocal() as db:
+        assert db.get(models.FileBlob, SHA256).ref_count == 0
+        remove_blob_files(db, [SHA256])
+        assert db.get(models.FileBlob, SHA256) is None
+    assert not store.exists(blob_key(SHA256))
+
+
+def test_blob_acquired_again_before_removal_is_kept(store):
+    released = release(2)
+    # A submission of the same content committing in between
+    with database.SessionLocal() as db:
+        db.get(models.FileBlob, SHA256).ref_count = 1
+        db.commit()
+        remove_blob_files(db, released)
+        assert db.get(models.FileBlob, SHA256).ref_count == 1
+    assert store.exists(blob_key(SHA256))
@@ -0,0 +1,125 @@
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import select
+import database, models
+from router.student import student_router
+from router.teacher import teacher_router
+from services import bulk_import
+from services.student import StudentService
+from services.teacher import TeacherService
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(db_schema):
+    app = FastAPI()
+    app.include_router(student_router)
+    app.include_router(teacher_router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_each_row_gets_its_own_outcome(db_schema):
+    with database.SessionLocal() as db:
+        db.add(models.Student(name="taken", email="taken@example.com"))
+        db.commit()
+
+    rows = [
+        {"name": "ada", "email": "ada@example.com"},
+        {"name": "", "email": "blank@example.com"},
+        {"name": "bob", "email": "not-an-email"},
+        {"name": "ada again", "email": "ada@example.com"},
+        {"name": "someone", "email": "taken@example.com"},
+        "not an object",
+        {"name": "cy", "email": "cy@example.com"},
+    ]
+    async with database.AsyncSessionLocal() as db:
+        result = await StudentService.bulk_create_students(db, rows)
+
+    assert (result["created"], result["duplicate"], result["invalid"]) == (2, 2, 3)
+    assert [row["row"] for row in result["rows"]] == list(range(len(rows)))
+    assert [row["status"] for row in result["rows"]] == [
+        "created", "invalid", "invalid", "duplicate", "duplicate", "invalid", "created",
+    ]
+    assert result["rows"][1]["error"] == "Name is required"
+    assert result["rows"][2]["error"] == "Email is not valid"
+    assert result["rows"][3]["error"] == "Repeated earlier in this import"
+    assert result["rows"][4]["error"] == "Already exists"
+
+    with database.SessionLocal() as db:
+        stored = {student.email: student.id for student in db.scalars(select(models.Student))}
+    assert set(stored) == {"taken@example.com", "ada@example.com", "cy@example.com"}
+    assert stored["ada@example.com"] == result["rows"][0]["id"]
+
+
+async def test_repeated_student_name_is_a_duplicate(db_schema):
+    rows = [{"name": "ada", "email": "one@example.com"}, {"name": "ada", "email": "two@example.com"}]
+    async with database.AsyncSessionLocal() as db:
+        result = await StudentService.bulk_create_students(db, rows)
+    assert [row["status"] for row in result["rows"]] == ["created", "duplicate"]
+
+
+async def test_teacher_emails_are_compared_lowercased(db_schema):
+    rows = [
+        {"name": "ada", "email": "Ada@Example.com"},
+        {"name": "ada", "email": "ada@example.com"},
+        {"name": "x" * 51, "email": "long@example.com"},
+    ]
+    async with database.AsyncSessionLocal() as db:
+        result = await TeacherService.bulk_create_teachers(db, rows)
+
+    assert [row["status"] for row in result["rows"]] == ["created", "duplicate", "invalid"]
+    assert result["rows"][0]["email"] == "ada@example.com"
+    assert result["rows"][2]["error"] == "Name is longer than 50 characters"
+
+
+async def test_inserts_span_several_batches(db_schema, monkeypatch):
+    monkeypatch.setattr(bulk_import, "INSERT_BATCH_SIZE", 2)
+    rows = [{"name": f"student{index}", "email": f"student{index}@example.com"} for index in range(5)]
+    async with database.AsyncSessionLocal() as db:
+        result = await StudentService.bulk_create_students(db, rows)
+
+    assert result["created"] == 5
+    with database.SessionLocal() as db:
+        assert len(db.scalars(select(models.Student)).all()) == 5
+
+
+async def test_too_many_rows_is_rejected_whole(db_schema, monkeypatch):
+    monkeypatch.setattr(bulk_import, "BULK_MAX_ROWS", 2)
+    rows = [{"name": f"student{index}", "email": f"student{index}@example.com"} for index in range(3)]
+    async with database.AsyncSessionLocal() as db:
+        with pytest.raises(HTTPException) as error:
+            await StudentService.bulk_create_students(db, rows)
+    assert error.value.status_code == 400
+
+    with database.SessionLocal() as db:
+        assert db.scalars(select(models.Student)).all() == []
+
+
+async def test_csv_endpoint_reports_data_rows(client):
+    body = "\ufeffName,Email\nada,ada@example.com\n,missing@example.com\n".encode()
+    response = await client.post("/student/bulk/csv", files={"file": ("students.csv", body, "text/csv")})
+
+    assert response.status_code == 200
+    assert [(row["row"], row["status"]) for row in response.json()["rows"]] == [(0, "created"), (1, "invalid")]
+
+
+async def test_csv_without_the_columns_is_rejected(client):
+    body = b"full name,mail\nada,ada@example.com\n"
+    response = await client.post("/teacher/bulk/csv", files={"file": ("teachers.csv", body, "text/csv")})
+    assert response.status_code == 400
+
+
+async def test_csv_must_be_utf8(client):
+    body = "name,email\nJosé,jose@example.com\n".encode("latin-1")
+    response = await client.post("/student/bulk/csv", files={"file": ("students.csv", body, "text/csv")})
+    assert response.status_code == 400
+
+
+async def test_json_endpoint_returns_outcomes(client):
+    response = await client.post("/teacher/bulk", json=[{"name": "ada", "email": "ada@example.com"}, 5])
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert response.json()["invalid"] == 1
@@ -0,0 +1,164 @@
+import uuid
+import pytest
+from sqlalchemy import func
+import database, models
+from conftest import count_statements
+from schemas.assignment import AssignmentFilters
+from services import cache
+from services.assignment import AssignmentService
+from services.student import StudentService
+
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeRedis:
+    # The part of redis.asyncio.Redis that SharedCache uses, one instance
+    # standing in for the server every process talks to
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+@pytest.fixture
+def redis(monkeypatch, db_schema):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "response_cache", cache.ResponseCache(cache.LocalCache(), cache.SharedCache(redis)))
+    return redis
+
+
+def add_student(name: str):
+    with database.SessionLocal() as db:
+        db.add(models.Student(name=name, email=f"{name}@example.com"))
+        db.commit()
+
+
+async def list_students():
+    async with database.AsyncSessionLocal() as db:
+        with count_statements() as counter:
+            page = await StudentService.get_all_students(db, None, 50)
+    return sorted(student["name"] for student in page["items"]), counter[0]
+
+
+async def test_repeat_read_only_reads_the_versions(redis):
+    add_student("ada")
+    assert (await list_students())[0] == ["ada"]
+    assert await list_students() == (["ada"], 1)
+    assert cache.response_cache.local.counters["hits"] == 1
+
+
+async def test_write_changes_the_key(redis):
+    add_student("ada")
+    await list_students()
+    add_student("grace")
+    assert (await list_students())[0] == ["ada", "grace"]
+    assert len(redis.values) == 2
+
+
+async def test_other_process_reads_the_shared_tier(redis, monkeypatch):
+    add_student("ada")
+    await list_students()
+
+    # Another worker: its own local tier, the same Redis
+    other = cache.ResponseCache(cache.LocalCache(), cache.SharedCache(redis))
+    monkeypatch.setattr(cache, "response_cache", other)
+    assert await list_students() == (["ada"], 1)
+    assert other.shared.counters["hits"] == 1
+
+    # A write made through the first worker is seen by the second
+    add_student("grace")
+    assert (await list_students())[0] == ["ada", "grace"]
+
+
+async def test_entry_filled_at_older_versions_is_not_served(redis):
+    # What a lagging replica does: fill an entry for versions the primary has
+    # moved past. A reader pinned to the primary must not get it.
+    add_student("ada")
+    async with database.AsyncSessionLocal() as db:
+        db.info["table_versions"] = {"students": 0}
+        page = await StudentService.get_all_students(db, None, 50)
+    assert [student["name"] for student in page["items"]] == ["ada"]
+
+    add_student("grace")
+    assert (await list_students())[0] == ["ada", "grace"]
+
+
+async def test_unreadable_versions_read_through(redis):
+    add_student("ada")
+    with database.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE table_versions")
+    assert await list_students() == (["ada"], 2)
+    assert redis.values == {}
+    # The pooled connection keeps the dropped table's triggers half-resolved,
+    # later tests need fresh ones
+    await database.async_engine.dispose()
+
+
+def add_assignment(student_name: str, subject: str, comment: str | None = None):
+    with database.SessionLocal() as db:
+        student = db.query(models.Student).filter_by(name=student_name).one()
+        assignment = models.Assignment(student_id=student.id, subject=subject, description=f"{subject} essay")
+        if comment:
+            assignment.teacher_comment_id = uuid.uuid4()
+            db.add(models.TeacherComment(id=assignment.teacher_comment_id, comment=comment))
+        db.add(assignment)
+        db.commit()
+        return assignment.teacher_comment_id
+
+
+async def list_assignments(**filters):
+    async with database.AsyncSessionLocal() as db:
+        with count_statements() as counter:
+            page = await AssignmentService.get_all_assignments(db, AssignmentFilters(**filters), None, 50)
+    return sorted(((item["subject"], item["comment"]) for item in page["items"]), key=str), counter[0]
+
+
+async def test_subject_listing_ignores_writes_to_other_subjects(redis):
+    add_student("ada")
+    add_assignment("ada", "maths")
+    assert (await list_assignments(subject="maths"))[0] == [("maths", None)]
+
+    add_student("grace")
+    add_assignment("grace", "art")
+    # Only the subject key is read, and it has not moved
+    assert await list_assignments(subject="maths") == ([("maths", None)], 1)
+
+    add_assignment("grace", "maths")
+    assert (await list_assignments(subject="maths"))[0] == [("maths", None), ("maths", None)]
+
+
+async def test_student_listing_follows_its_comments_and_deletion(redis):
+    add_student("ada")
+    add_student("grace")
+    comment_id = add_assignment("ada", "maths", comment="draft")
+    assert (await list_assignments(student_name="ada"))[0] == [("maths", "draft")]
+
+    add_assignment("grace", "maths")
+    assert await list_assignments(student_name="ada") == ([("maths", "draft")], 1)
+
+    with database.SessionLocal() as db:
+        db.get(models.TeacherComment, comment_id).comment = "final"
+        db.commit()
+    assert (await list_assignments(student_name="ada"))[0] == [("maths", "final")]
+
+    # A soft delete takes the student's rows out of its subjects' listings too
+    assert len((await list_assignments(subject="maths"))[0]) == 2
+    with database.SessionLocal() as db:
+        db.query(models.Student).filter_by(name="ada").one().deleted_at = func.now()
+        db.commit()
+    assert (await list_assignments(student_name="ada"))[0] == []
+    assert (await list_assignments(subject="maths"))[0] == [("maths", None)]
+
+
+async def test_unfiltered_listing_follows_every_write(redis):
+    add_student("ada")
+    add_assignment("ada", "maths")
+    await list_assignments()
+    add_assignment("ada", "art")
+    assert (await list_assignments())[0] == [("art", None), ("maths", None)]
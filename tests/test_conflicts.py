@@ -0,0 +1,90 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+import database, models
+from schemas.student import StudentCreate
+from schemas.teacher import TeacherCreate
+from services.student import StudentService
+from services.teacher import TeacherService
+
+pytestmark = pytest.mark.anyio
+
+
+async def call(method, *args):
+    async with database.AsyncSessionLocal() as db:
+        return await method(db, *args)
+
+
+async def expect_status(code, method, *args):
+    with pytest.raises(HTTPException) as error:
+        await call(method, *args)
+    assert error.value.status_code == code
+    return error.value
+
+
+def count(model) -> int:
+    with database.SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(model))
+
+
+async def test_student_email_clash_is_409(db_schema):
+    created = await call(StudentService.create_student, StudentCreate(name="ada", email="ada@example.com"))
+    assert created["email"] == "ada@example.com"
+
+    error = await expect_status(
+        409, StudentService.create_student, StudentCreate(name="other", email="ada@example.com"),
+    )
+    assert "ada@example.com" in error.detail
+    assert count(models.Student) == 1
+
+
+async def test_student_name_clash_is_409(db_schema):
+    await call(StudentService.create_student, StudentCreate(name="ada", email="one@example.com"))
+
+    error = await expect_status(
+        409, StudentService.create_student, StudentCreate(name="ada", email="two@example.com"),
+    )
+    assert "name ada" in error.detail
+    assert count(models.Student) == 1
+
+
+async def test_teacher_email_clash_ignores_case(db_schema):
+    await call(TeacherService.create_teacher, TeacherCreate(name="ada", email="Ada@Example.com"))
+    await expect_status(409, TeacherService.create_teacher, TeacherCreate(name="bob", email="ADA@example.com"))
+    assert count(models.Teacher) == 1
+
+
+async def test_teacher_update_onto_taken_email_is_409(db_schema):
+    await call(TeacherService.create_teacher, TeacherCreate(name="ada", email="ada@example.com"))
+    bob = await call(TeacherService.create_teacher, TeacherCreate(name="bob", email="bob@example.com"))
+
+    await expect_status(
+        409, TeacherService.update_teacher, bob["id"], TeacherCreate(name="bob", email="ADA@example.com"),
+    )
+    with database.SessionLocal() as db:
+        assert db.get(models.Teacher, bob["id"]).email == "bob@example.com"
+
+    updated = await call(
+        TeacherService.update_teacher, bob["id"], TeacherCreate(name="robert", email="robert@example.com"),
+    )
+    assert (updated["name"], updated["email"]) == ("robert", "robert@example.com")
+
+
+async def test_teacher_update_of_missing_or_deleted_is_404(db_schema):
+    await expect_status(
+        404, TeacherService.update_teacher, uuid.uuid4(), TeacherCreate(name="ada", email="ada@example.com"),
+    )
+
+    ada = await call(TeacherService.create_teacher, TeacherCreate(name="ada", email="ada@example.com"))
+    await call(TeacherService.delete_teacher, ada["id"])
+    await expect_status(
+        404, TeacherService.update_teacher, ada["id"], TeacherCreate(name="ada", email="ada@example.com"),
+    )
+    await expect_status(404, TeacherService.delete_teacher, ada["id"])
+
+
+async def test_student_delete_twice_is_404(db_schema):
+    ada = await call(StudentService.create_student, StudentCreate(name="ada", email="ada@example.com"))
+    await call(StudentService.delete_student, ada["id"])
+    await expect_status(404, StudentService.delete_student, ada["id"])
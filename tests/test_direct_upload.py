@@ -0,0 +1,104 @@
+import hashlib, uuid
+from urllib.parse import parse_qs, urlparse
+import pytest
+import requests
+from moto import mock_aws
+import database, models
+from schemas.assignment import DirectUploadConfirm, DirectUploadCreate
+from services import assignment, blob_store, cache
+from services.assignment import AssignmentService
+from services.blob_store import blob_key, staging_key
+from services.storage import S3Storage
+
+pytestmark = pytest.mark.anyio
+
+CONTENT = b"my essay"
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def s3(monkeypatch, db_schema):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        storage = S3Storage("submissions", "assignments/", region="us-east-1")
+        storage._client.create_bucket(Bucket="submissions")
+        monkeypatch.setattr(assignment, "get_storage", lambda: storage)
+        monkeypatch.setattr(blob_store, "get_storage", lambda: storage)
+        monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+        with database.SessionLocal() as db:
+            db.add(models.Student(name="ada", email="ada@example.com"))
+            db.commit()
+        yield storage
+
+
+def upload_fields(**overrides) -> dict:
+    return {"name": "ada", "subject": "maths", "description": "essay", "filename": "essay.txt",
+            "size": len(CONTENT), "sha256": SHA256, **overrides}
+
+
+async def create(**overrides) -> dict:
+    async with database.AsyncSessionLocal() as db:
+        return await AssignmentService.create_direct_upload(db, DirectUploadCreate(**upload_fields(**overrides)))
+
+
+async def confirm(upload_id, **overrides) -> dict:
+    async with database.AsyncSessionLocal() as db:
+        return await AssignmentService.confirm_direct_upload(
+            db, DirectUploadConfirm(upload_id=upload_id, **upload_fields(**overrides))
+        )
+
+
+def put(presigned: dict, content: bytes):
+    # moto only records the checksum along with the algorithm header SDKs send
+    headers = {**presigned["headers"], "x-amz-sdk-checksum-algorithm": "SHA256"}
+    return requests.put(presigned["url"], data=content, headers=headers)
+
+
+async def test_upload_is_confirmed_into_the_blob(s3):
+    presigned = await create()
+    assert presigned["upload_required"] and presigned["method"] == "PUT"
+    assert put(presigned, CONTENT).status_code == 200
+
+    result = await confirm(presigned["upload_id"])
+    assert result["subject"] == "maths"
+    assert s3.open(blob_key(SHA256)).read() == CONTENT
+    assert s3.stat(staging_key(presigned["upload_id"])) is None
+    with database.SessionLocal() as db:
+        assert db.get(models.FileBlob, SHA256).ref_count == 1
+
+
+async def test_known_content_still_has_to_be_uploaded(s3):
+    presigned = await create()
+    put(presigned, CONTENT)
+    await confirm(presigned["upload_id"])
+
+    # Knowing the hash of a stored blob is not enough to claim it
+    presigned = await create()
+    assert presigned["upload_required"]
+    with pytest.raises(assignment.HTTPException) as error:
+        await confirm(presigned["upload_id"])
+    assert error.value.status_code == 409
+
+
+async def test_presigned_url_signs_the_checksum_and_size(s3):
+    presigned = await create()
+    signed = parse_qs(urlparse(presigned["url"]).query)["X-Amz-SignedHeaders"][0].split(";")
+    assert {"content-length", "x-amz-checksum-sha256"} <= set(signed)
+
+
+async def test_content_other_than_declared_is_rejected(s3):
+    # S3 itself refuses a body that does not match the signed checksum or
+    # length; moto stores it, which stands in for a store that did not check
+    presigned = await create()
+    put(presigned, b"a longer essay")
+    with pytest.raises(assignment.HTTPException) as error:
+        await confirm(presigned["upload_id"])
+    assert error.value.status_code == 409
+    assert not s3.exists(blob_key(SHA256))
+
+
+async def test_confirm_for_an_unknown_upload(s3):
+    with pytest.raises(assignment.HTTPException) as error:
+        await confirm(uuid.uuid4())
+    assert error.value.status_code == 409
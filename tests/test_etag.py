@@ -0,0 +1,67 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+import database, models
+from conftest import count_statements
+from router.student import student_router
+from services import cache
+
+
+pytestmark = pytest.mark.anyio
+
+app = FastAPI()
+app.include_router(student_router)
+
+
+@pytest.fixture
+async def client(monkeypatch, db_schema):
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "response_cache", cache.ResponseCache(cache.LocalCache()))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def add_student(name: str):
+    with database.SessionLocal() as db:
+        db.add(models.Student(name=name, email=f"{name}@example.com"))
+        db.commit()
+
+
+def names(response) -> list[str]:
+    return sorted(student["name"] for student in response.json()["items"])
+
+
+async def test_matching_etag_is_answered_before_the_query(client):
+    add_student("ada")
+    etag = (await client.get("/student/")).headers["etag"]
+
+    with count_statements() as counter:
+        response = await client.get("/student/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert counter[0] == 1
+
+
+async def test_cached_body_shares_the_versions_read_for_the_etag(client):
+    add_student("ada")
+    await client.get("/student/")
+
+    with count_statements() as counter:
+        response = await client.get("/student/")
+    assert names(response) == ["ada"]
+    assert counter[0] == 1
+
+
+async def test_write_changes_etag_and_body_together(client):
+    add_student("ada")
+    etag = (await client.get("/student/")).headers["etag"]
+    add_student("grace")
+
+    # The cache still holds the old listing, under the old versions
+    response = await client.get("/student/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert names(response) == ["ada", "grace"]
+
+    response = await client.get("/student/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
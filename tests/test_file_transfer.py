@@ -0,0 +1,106 @@
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from services.file_transfer import file_response
+
+pytestmark = pytest.mark.anyio
+
+ETAG = '"abc"'
+CONTENT = b"0123456789"
+
+
+@pytest.fixture
+async def client(tmp_path):
+    path = tmp_path / "essay.pdf"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def download(request: Request):
+        return file_response(request, str(path), "essay.pdf", ETAG)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_whole_file(client):
+    response = await client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == ETAG
+
+
+@pytest.mark.parametrize("header, body, content_range", [
+    ("bytes=2-5", b"2345", "bytes 2-5/10"),
+    ("bytes=7-", b"789", "bytes 7-9/10"),
+    ("bytes=-3", b"789", "bytes 7-9/10"),
+    ("bytes=8-100", b"89", "bytes 8-9/10"),
+])
+async def test_single_range(client, header, body, content_range):
+    response = await client.get("/file", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == body
+    assert response.headers["content-range"] == content_range
+    assert response.headers["content-length"] == str(len(body))
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,4-5", "items=0-1", "bytes=5-2"])
+async def test_unsupported_range_sends_the_whole_file(client, header):
+    response = await client.get("/file", headers={"Range": header})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+async def test_range_past_the_end(client):
+    response = await client.get("/file", headers={"Range": "bytes=10-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+
+async def test_if_range_applies_the_range_only_for_the_current_etag(client):
+    response = await client.get("/file", headers={"Range": "bytes=0-1", "If-Range": ETAG})
+    assert response.status_code == 206
+    response = await client.get("/file", headers={"Range": "bytes=0-1", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    # A weak validator never allows a range
+    response = await client.get("/file", headers={"Range": "bytes=0-1", "If-Range": "W/" + ETAG})
+    assert response.status_code == 200
+
+
+async def test_if_range_date(client):
+    response = await client.get("/file")
+    last_modified = response.headers["last-modified"]
+    response = await client.get("/file", headers={"Range": "bytes=0-1", "If-Range": last_modified})
+    assert response.status_code == 206
+    response = await client.get("/file", headers={"Range": "bytes=0-1", "If-Range": "Thu, 01 Jan 1970 00:00:00 GMT"})
+    assert response.status_code == 200
+
+
+async def test_if_none_match(client):
+    response = await client.get("/file", headers={"If-None-Match": "W/" + ETAG})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+async def test_zero_copy_send_hands_over_the_file(tmp_path):
+    path = tmp_path / "essay.pdf"
+    path.write_bytes(CONTENT)
+    scope = {
+        "type": "http", "method": "GET", "path": "/file", "headers": [(b"range", b"bytes=3-6")],
+        "query_string": b"", "extensions": {"http.response.zerocopysend": {}},
+    }
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            file = message["file"]
+            file.seek(message["offset"])
+            message = {**message, "data": file.read(message["count"])}
+        messages.append(message)
+
+    response = file_response(Request(scope), str(path), "essay.pdf", ETAG)
+    await response(scope, None, send)
+    assert messages[0]["status"] == 206
+    assert messages[1]["data"] == b"3456"
@@ -0,0 +1,64 @@
+import hashlib
+import pytest
+import database, models
+from services import blob_store, layout_migration
+from services.blob_store import blob_key
+from services.storage import LocalStorage
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch, db_schema):
+    store = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(layout_migration, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(blob_store, "get_storage", lambda: store)
+    return tmp_path
+
+
+def add_legacy(upload_dir, *names: str) -> list:
+    with database.SessionLocal() as db:
+        student = models.Student(name="ada", email="ada@example.com")
+        db.add(student)
+        db.flush()
+        assignments = []
+        for name in names:
+            (upload_dir / name).write_bytes(name.encode())
+            assignments.append(models.Assignment(student_id=student.id, subject="maths", description=name, filename=name))
+        db.add_all(assignments)
+        db.commit()
+        return [assignment.id for assignment in assignments]
+
+
+def migrate():
+    with database.SessionLocal() as db:
+        return layout_migration.migrate_batch(db, None, 10, layout_migration._Throttle(0))
+
+
+def test_files_move_into_the_blob_layout(upload_dir):
+    add_legacy(upload_dir, "a.txt", "b.txt")
+    assert migrate()[1] == 2
+
+    sha256 = hashlib.sha256(b"a.txt").hexdigest()
+    assert (upload_dir / blob_key(sha256)).read_bytes() == b"a.txt"
+    assert not (upload_dir / "a.txt").exists()
+    with database.SessionLocal() as db:
+        assert db.get(models.FileBlob, sha256).ref_count == 1
+        assert {assignment.blob_sha256 for assignment in db.query(models.Assignment)} == {
+            sha256, hashlib.sha256(b"b.txt").hexdigest()
+        }
+
+
+def test_row_deleted_during_the_batch_takes_no_reference(upload_dir, monkeypatch):
+    gone, kept = add_legacy(upload_dir, "a.txt", "b.txt")
+    hash_legacy_file = layout_migration._hash_legacy_file
+
+    def reaped_meanwhile(path, throttle):
+        with database.SessionLocal() as db:
+            db.query(models.Assignment).filter(models.Assignment.id == gone).delete()
+            db.commit()
+        return hash_legacy_file(path, throttle)
+
+    monkeypatch.setattr(layout_migration, "_hash_legacy_file", reaped_meanwhile)
+    assert migrate()[1] == 1
+    with database.SessionLocal() as db:
+        assert db.get(models.FileBlob, hashlib.sha256(b"a.txt").hexdigest()) is None
+        assert db.get(models.FileBlob, hashlib.sha256(b"b.txt").hexdigest()).ref_count == 1
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+import database, models
+from schemas.assignment import AssignmentFilters
+from services import cache
+from services.assignment import AssignmentService
+from services.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from services.student import StudentService
+
+pytestmark = pytest.mark.anyio
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch, db_schema):
+    monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+
+
+def seed():
+    # Pairs of submissions share a timestamp, so pages must break ties by id
+    with database.SessionLocal() as db:
+        students = [models.Student(name=f"student{index}", email=f"student{index}@example.com") for index in range(7)]
+        db.add_all(students)
+        db.flush()
+        db.add_all(
+            models.Assignment(
+                student_id=students[index % 7].id, subject="maths", description=f"essay {index}",
+                filename=f"essay{index}.txt", submitted_at=BASE_TIME + timedelta(hours=index // 2),
+            )
+            for index in range(9)
+        )
+        db.commit()
+
+
+async def walk(call) -> list:
+    items, cursor = [], None
+    while True:
+        async with database.AsyncSessionLocal() as db:
+            page = await call(db, cursor)
+        assert len(page["items"]) <= 3
+        items.extend(page["items"])
+        cursor = page["next"]
+        if cursor is None:
+            return items
+
+
+async def test_students_pages_cover_every_row_once():
+    seed()
+    items = await walk(lambda db, cursor: StudentService.get_all_students(db, cursor, 3))
+    assert [item["name"] for item in items] == [f"student{index}" for index in range(7)]
+
+
+@pytest.mark.parametrize("sort", ["newest", "oldest"])
+async def test_assignment_pages_break_timestamp_ties(sort):
+    seed()
+    filters = AssignmentFilters(sort=sort)
+    items = await walk(lambda db, cursor: AssignmentService.get_all_assignments(db, filters, cursor, 3))
+
+    assert sorted(item["description"] for item in items) == sorted(f"essay {index}" for index in range(9))
+    keys = [(item["submitted_at"], item["id"]) for item in items]
+    assert keys == sorted(keys, reverse=sort == "newest")
+
+
+async def test_cursor_from_another_listing_is_rejected():
+    seed()
+    async with database.AsyncSessionLocal() as db:
+        cursor = (await StudentService.get_all_students(db, None, 3))["next"]
+        with pytest.raises(HTTPException) as error:
+            await AssignmentService.get_all_assignments(db, AssignmentFilters(), cursor, 3)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not base64 !", encode_cursor("students", ["a"]), "e30"])
+def test_malformed_cursors(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("students", cursor, (models.Student.name, models.Student.id))
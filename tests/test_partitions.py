@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy.exc import OperationalError
+from services import partitions
+
+NOW = datetime(2026, 3, 15, 12, tzinfo=timezone.utc)
+
+
+class RecordingSession:
+    # Partition DDL is Postgres-only; this records the statements ensure_partitions
+    # issues and answers the default partition's row counts per month start
+    def __init__(self, stray: dict | None = None, fail_on: str | None = None):
+        self.stray = stray or {}
+        self.fail_on = fail_on
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def scalar(self, statement, params=None):
+        return self.stray.get(params["start"], 0)
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        if self.fail_on and self.fail_on in sql:
+            raise OperationalError(sql, params, Exception("lock timeout"))
+        self.statements.append(sql)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def attached(monkeypatch):
+    names = []
+    monkeypatch.setattr(partitions, "list_partitions", lambda db: [{"name": name} for name in names])
+    return names
+
+
+def ddl(db) -> list[str]:
+    return [sql for sql in db.statements if not sql.startswith("SET LOCAL")]
+
+
+def test_series_continues_from_the_newest_partition(attached):
+    attached.extend(["assignments_legacy", "assignments_p2026_02", "assignments_p2026_03", "assignments_default"])
+    db = RecordingSession()
+
+    created = partitions.ensure_partitions(db, ahead=2, now=NOW)
+
+    assert created == ["assignments_p2026_04", "assignments_p2026_05"]
+    assert ddl(db) == [
+        "CREATE TABLE assignments_p2026_04 PARTITION OF assignments "
+        "FOR VALUES FROM ('2026-04-01T00:00:00+00:00') TO ('2026-05-01T00:00:00+00:00')",
+        "CREATE TABLE assignments_p2026_05 PARTITION OF assignments "
+        "FOR VALUES FROM ('2026-05-01T00:00:00+00:00') TO ('2026-06-01T00:00:00+00:00')",
+    ]
+    assert db.commits == 2
+
+
+def test_nothing_to_do_when_far_enough_ahead(attached):
+    attached.extend(["assignments_p2026_06"])
+    db = RecordingSession()
+    assert partitions.ensure_partitions(db, ahead=3, now=NOW) == []
+    assert db.statements == []
+
+
+def test_series_crosses_the_year(attached):
+    db = RecordingSession()
+    created = partitions.ensure_partitions(db, ahead=2, now=datetime(2026, 11, 30, tzinfo=timezone.utc))
+    assert created == ["assignments_p2026_11", "assignments_p2026_12", "assignments_p2027_01"]
+
+
+def test_rows_already_in_the_default_are_moved_into_the_new_month(attached):
+    attached.extend(["assignments_p2026_03"])
+    april = datetime(2026, 4, 1, tzinfo=timezone.utc)
+    db = RecordingSession(stray={april: 7})
+
+    created = partitions.ensure_partitions(db, ahead=1, now=NOW)
+
+    assert created == ["assignments_p2026_04"]
+    bounds = "FROM ('2026-04-01T00:00:00+00:00') TO ('2026-05-01T00:00:00+00:00')"
+    assert ddl(db) == [
+        "ALTER TABLE assignments DETACH PARTITION assignments_default",
+        "CREATE TABLE assignments_p2026_04 (LIKE assignments INCLUDING ALL)",
+        "INSERT INTO assignments_p2026_04 SELECT * FROM assignments_default "
+        "WHERE submitted_at >= :start AND submitted_at < :end",
+        "DELETE FROM assignments_default WHERE submitted_at >= :start AND submitted_at < :end",
+        f"ALTER TABLE assignments ATTACH PARTITION assignments_p2026_04 FOR VALUES {bounds}",
+        "ALTER TABLE assignments ATTACH PARTITION assignments_default DEFAULT",
+    ]
+    # One transaction: the default is never left detached
+    assert db.commits == 1
+
+
+def test_failure_rolls_back_and_raises(attached):
+    attached.extend(["assignments_p2026_03"])
+    db = RecordingSession(fail_on="assignments_p2026_05")
+
+    with pytest.raises(OperationalError):
+        partitions.ensure_partitions(db, ahead=2, now=NOW)
+    assert db.commits == 1
+    assert db.rollbacks == 1
@@ -0,0 +1,77 @@
+import os, time
+from datetime import datetime, timedelta, timezone
+import pytest
+import database, models
+from services import processing
+
+
+def hang_or_crash(kind, blob_sha256, filename):
+    if kind == "hang":
+        time.sleep(60)
+    if kind == "crash":
+        os._exit(1)
+    return {"kind": kind}
+
+
+@pytest.fixture
+def worker(monkeypatch, db_schema):
+    monkeypatch.setattr(processing, "run_job", hang_or_crash)
+    monkeypatch.setattr(processing, "JOB_TIMEOUT", 2)
+
+
+def add_jobs(*kinds: str, **fields) -> list:
+    with database.SessionLocal() as db:
+        student = models.Student(name="ada", email="ada@example.com")
+        db.add(student)
+        db.flush()
+        assignment = models.Assignment(student_id=student.id, subject="maths", description="essay", filename="essay.txt")
+        db.add(assignment)
+        db.flush()
+        jobs = [
+            models.ProcessingJob(
+                assignment_id=assignment.id, kind=kind,
+                **{"status": "pending", "run_after": datetime(2025, 1, 1, index, tzinfo=timezone.utc), **fields},
+            )
+            for index, kind in enumerate(kinds)
+        ]
+        db.add_all(jobs)
+        db.commit()
+        return [job.id for job in jobs]
+
+
+def jobs_by_kind() -> dict:
+    with database.SessionLocal() as db:
+        return {job.kind: job for job in db.query(models.ProcessingJob)}
+
+
+def test_hung_job_times_out_and_the_rest_still_run(worker):
+    add_jobs("hang", "checksum")
+    processing.run_worker(max_workers=2, once=True)
+    jobs = jobs_by_kind()
+    assert jobs["checksum"].status == "done"
+    assert jobs["hang"].status == "pending"
+    assert jobs["hang"].error == "Timed out after 2 seconds"
+
+
+def test_crashed_process_does_not_stop_the_worker(worker):
+    # One job per round, the crash first
+    add_jobs("crash", "checksum", max_attempts=1)
+    processing.run_worker(max_workers=1, once=True)
+    jobs = jobs_by_kind()
+    assert jobs["crash"].status == "failed"
+    assert jobs["crash"].error.startswith("Worker process died")
+    assert jobs["checksum"].status == "done"
+
+
+def test_lost_job_on_its_last_attempt_is_not_reclaimed(db_schema):
+    stale = datetime.now(timezone.utc) - processing.LOCK_TIMEOUT - timedelta(minutes=1)
+    last, retry = add_jobs("extract_text", "checksum", status="running", locked_at=stale, attempts=3, max_attempts=3)
+    with database.SessionLocal() as db:
+        db.get(models.ProcessingJob, retry).max_attempts = 5
+        db.commit()
+        claimed = processing.claim_jobs(db, 10)
+
+    assert [job["id"] for job in claimed] == [retry]
+    failed = jobs_by_kind()["extract_text"]
+    assert failed.status == "failed"
+    assert failed.locked_at is None
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+import database, models
+from conftest import count_statements
+from schemas.assignment import AssignmentFilters
+from services import cache
+from services.assignment import AssignmentService
+
+
+pytestmark = pytest.mark.anyio
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch, db_schema):
+    # A cache hit would issue no statements at all
+    monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+
+
+def seed(rows: int, one_student: bool = False):
+    # Every row commented, and by default from a student of its own, so any
+    # per-row student or comment lookup shows up as extra statements
+    with database.SessionLocal() as db:
+        teacher = models.Teacher(name="teacher", email="teacher@example.com")
+        db.add(teacher)
+        db.flush()
+
+        students = []
+        for index in range(1 if one_student else rows):
+            student = models.Student(name=f"student{index}", email=f"student{index}@example.com")
+            db.add(student)
+            students.append(student)
+        db.flush()
+
+        for index in range(rows):
+            comment = models.TeacherComment(teacher_id=teacher.id, comment=f"comment {index}")
+            db.add(comment)
+            db.flush()
+            db.add(models.Assignment(
+                student_id=students[index % len(students)].id,
+                subject="maths",
+                description=f"essay {index}",
+                filename=f"essay{index}.pdf",
+                teacher_comment_id=comment.id,
+                submitted_at=BASE_TIME + timedelta(minutes=index),
+                search_vector=f"maths essay {index}",
+            ))
+        db.commit()
+
+
+async def statements_for(call, rows: int, one_student: bool = False):
+    seed(rows, one_student)
+    async with database.AsyncSessionLocal() as db:
+        with count_statements() as counter:
+            page = await call(db)
+    assert len(page["items"]) == rows
+    return counter[0]
+
+
+@pytest.mark.parametrize("rows", [1, 20])
+async def test_get_all_assignments_statements_do_not_grow_with_rows(rows):
+    call = lambda db: AssignmentService.get_all_assignments(db, AssignmentFilters(), None, 50)
+    assert await statements_for(call, rows) == 1
+
+
+@pytest.mark.parametrize("rows", [1, 20])
+async def test_get_assignments_by_student_name_statements_do_not_grow_with_rows(rows):
+    call = lambda db: AssignmentService.get_assignments_by_student_name(db, "student0", AssignmentFilters(), None, 50)
+    assert await statements_for(call, rows, one_student=True) == 2
+
+
+@pytest.mark.parametrize("rows", [1, 20])
+async def test_search_assignments_statements_do_not_grow_with_rows(rows):
+    call = lambda db: AssignmentService.search_assignments(db, "essay", None, 50)
+    assert await statements_for(call, rows) == 1
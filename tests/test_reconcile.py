@@ -0,0 +1,62 @@
+import time
+import pytest
+import database, models
+from services import reconcile
+
+
+@pytest.fixture
+def legacy_row(tmp_path, monkeypatch, db_schema):
+    monkeypatch.setattr(reconcile, "UPLOAD_DIR", str(tmp_path))
+    with database.SessionLocal() as db:
+        student = models.Student(name="ada", email="ada@example.com")
+        db.add(student)
+        db.flush()
+        assignment = models.Assignment(student_id=student.id, subject="maths", description="essay", filename="gone.txt")
+        db.add(assignment)
+        db.commit()
+        return assignment.id
+
+
+def report() -> dict:
+    return {"dangling_assignments": []}
+
+
+def scan(missing: dict, found: dict | None = None):
+    found = found if found is not None else report()
+    with database.SessionLocal() as db:
+        reconcile.scan_legacy_rows(db, None, 10, reconcile._RateLimiter(0), True, found, missing)
+    return found
+
+
+def remaining() -> int:
+    with database.SessionLocal() as db:
+        return db.query(models.Assignment).count()
+
+
+def test_dangling_row_is_deleted_only_after_the_grace_period(legacy_row):
+    missing = {}
+    assert scan(missing)["dangling_assignments"] == [str(legacy_row)]
+    assert remaining() == 1
+    assert str(legacy_row) in missing
+
+    missing[str(legacy_row)] = time.time() - reconcile.ORPHAN_GRACE - 1
+    scan(missing)
+    assert remaining() == 0
+    assert missing == {}
+
+
+def test_row_migrated_meanwhile_is_kept(legacy_row, monkeypatch):
+    # The migration commits blob_sha256 between the scan's read and its delete
+    missing = {str(legacy_row): time.time() - reconcile.ORPHAN_GRACE - 1}
+    limiter = reconcile._RateLimiter(0)
+
+    def migrate_then_wait(ops: int = 1):
+        with database.SessionLocal() as db:
+            db.add(models.FileBlob(sha256="ab" * 32, size=1, ref_count=1))
+            db.query(models.Assignment).update({"blob_sha256": "ab" * 32})
+            db.commit()
+
+    monkeypatch.setattr(limiter, "wait", migrate_then_wait)
+    with database.SessionLocal() as db:
+        reconcile.scan_legacy_rows(db, None, 10, limiter, True, report(), missing)
+    assert remaining() == 1
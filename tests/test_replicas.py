@@ -0,0 +1,111 @@
+import time
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+import database, models
+from router import metrics
+from router.student import student_router
+from services import cache
+from services.replicas import ReplicaRouter
+
+pytestmark = pytest.mark.anyio
+
+
+def sqlite_file(path, student_name: str) -> str:
+    # A second database file standing in for a replica that has only this student
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(models.Student.__table__.insert().values(name=student_name, email=f"{student_name}@example.com"))
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+async def replicas(db_schema, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+    engines = [
+        create_async_engine(database._async_url(sqlite_file(tmp_path / "replica.db", "on-replica"))),
+        # The directory does not exist, so connecting fails
+        create_async_engine(database._async_url(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")),
+    ]
+    replica_router = ReplicaRouter(engines, retry_after=60)
+    monkeypatch.setattr(database, "replica_engines", engines)
+    monkeypatch.setattr(database, "replica_router", replica_router)
+    monkeypatch.setattr(metrics, "replica_router", replica_router)
+    yield replica_router
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def client(replicas):
+    app = FastAPI()
+    app.include_router(student_router)
+    app.include_router(metrics.metrics_router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def names(client) -> list[str]:
+    response = await client.get("/student/")
+    assert response.status_code == 200
+    return [student["name"] for student in response.json()["items"]]
+
+
+async def test_reads_go_to_a_replica(client):
+    with database.SessionLocal() as db:
+        db.add(models.Student(name="on-primary", email="on-primary@example.com"))
+        db.commit()
+
+    assert await names(client) == ["on-replica"]
+
+
+async def test_dead_replica_fails_over_and_is_reported(client, replicas):
+    # Round-robin starts on the live replica, the next read starts on the dead one
+    assert await names(client) == ["on-replica"]
+    assert await names(client) == ["on-replica"]
+
+    status = (await client.get("/metrics/replicas")).json()
+    assert [replica["healthy"] for replica in status] == [True, False]
+    # Skipped outright while it is marked down
+    assert [engine.url.database for engine in replicas.candidates()] == [replicas.engines[0].url.database]
+
+
+async def test_primary_is_used_when_every_replica_is_down(client, replicas):
+    for engine in replicas.engines:
+        replicas.mark_down(engine, OSError("down"))
+    assert await names(client) == []
+
+
+async def test_a_committed_write_pins_reads_to_the_primary(client):
+    response = await client.post("/student/", json={"name": "new", "email": "new@example.com"})
+    assert response.status_code == 201
+
+    pinned_until = int(client.cookies[database.PRIMARY_COOKIE])
+    assert time.time() < pinned_until <= time.time() + database.READ_YOUR_WRITES_SECONDS
+    assert await names(client) == ["new"]
+
+    client.cookies.clear()
+    assert await names(client) == ["on-replica"]
+
+
+async def test_a_rejected_write_does_not_pin(client):
+    await client.post("/student/", json={"name": "new", "email": "new@example.com"})
+    client.cookies.clear()
+
+    response = await client.post("/student/", json={"name": "other", "email": "new@example.com"})
+    assert response.status_code == 409
+    assert database.PRIMARY_COOKIE not in response.cookies
+    assert await names(client) == ["on-replica"]
+
+
+async def test_expired_or_garbled_cookie_reads_from_a_replica(client):
+    client.cookies.set(database.PRIMARY_COOKIE, str(int(time.time()) - 1))
+    assert await names(client) == ["on-replica"]
+
+    client.cookies.set(database.PRIMARY_COOKIE, "soon")
+    assert await names(client) == ["on-replica"]
@@ -0,0 +1,145 @@
+import threading, time
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import func, select, text, update
+import database, models
+from schemas.student import StudentCreate
+from schemas.teacher import TeacherCreate
+from router.stats import stats_router
+from services import blob_store, reaper
+from services.blob_store import acquire_blob, blob_key
+from services.storage import LocalStorage
+from services.student import StudentService
+from services.teacher import TeacherService
+
+SHA256 = "cd" * 32
+
+
+def soft_delete(model, row_id):
+    with database.SessionLocal() as db:
+        db.execute(update(model).where(model.id == row_id).values(deleted_at=func.now()))
+        db.commit()
+
+
+@pytest.mark.anyio
+async def test_deleted_accounts_free_their_email_and_name(db_schema):
+    async with database.AsyncSessionLocal() as db:
+        student = await StudentService.create_student(db, StudentCreate(name="ada", email="ada@example.com"))
+    async with database.AsyncSessionLocal() as db:
+        teacher = await TeacherService.create_teacher(db, TeacherCreate(name="ada", email="ada@example.com"))
+    soft_delete(models.Student, student["id"])
+    soft_delete(models.Teacher, teacher["id"])
+
+    async with database.AsyncSessionLocal() as db:
+        again = await StudentService.create_student(db, StudentCreate(name="ada", email="ada@example.com"))
+    async with database.AsyncSessionLocal() as db:
+        await TeacherService.create_teacher(db, TeacherCreate(name="ada", email="ada@example.com"))
+    assert again["id"] != student["id"]
+
+    with database.SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(models.Student)) == 2
+        assert db.scalar(select(func.count()).select_from(models.Teacher)) == 2
+
+
+def test_reaper_removes_blob_and_legacy_files(db_schema, tmp_path, monkeypatch):
+    store = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(blob_store, "get_storage", lambda: store)
+    monkeypatch.setattr(reaper, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(reaper, "REAP_PAUSE", 0)
+    monkeypatch.setattr(reaper, "REAP_BATCH_SIZE", 1)
+
+    source = tmp_path / "source"
+    source.write_bytes(b"essay")
+    store.put_file(str(source), blob_key(SHA256))
+    (tmp_path / "ada-essay.txt").write_bytes(b"old essay")
+    (tmp_path / "grace-essay.txt").write_bytes(b"kept")
+
+    with database.SessionLocal() as db:
+        ada = models.Student(name="ada", email="ada@example.com")
+        grace = models.Student(name="grace", email="grace@example.com")
+        db.add_all([ada, grace])
+        db.flush()
+        acquire_blob(db, SHA256, 5)
+        db.add_all([
+            models.Assignment(student_id=ada.id, subject="maths", blob_sha256=SHA256, filename="essay.txt"),
+            models.Assignment(student_id=ada.id, subject="maths", filename="ada-essay.txt"),
+            models.Assignment(student_id=grace.id, subject="maths", filename="grace-essay.txt"),
+        ])
+        db.commit()
+        ada_id = ada.id
+    soft_delete(models.Student, ada_id)
+
+    with database.SessionLocal() as db:
+        assert reaper.reap_student(db, ada_id) == 2
+
+    assert not store.exists(blob_key(SHA256))
+    assert not (tmp_path / "ada-essay.txt").exists()
+    assert (tmp_path / "grace-essay.txt").exists()
+    with database.SessionLocal() as db:
+        assert db.get(models.Student, ada_id) is None
+        assert db.get(models.FileBlob, SHA256) is None
+
+
+@pytest.mark.anyio
+async def test_assignment_stats_etag_changes_with_a_student_delete(db_schema):
+    with database.SessionLocal() as db:
+        student = models.Student(name="ada", email="ada@example.com")
+        db.add(student)
+        db.commit()
+        student_id = student.id
+
+    app = FastAPI()
+    app.include_router(stats_router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        etag = (await client.get("/stats/assignments")).headers["ETag"]
+        # The students trigger rewrites the subject counters on a soft delete
+        soft_delete(models.Student, student_id)
+        response = await client.get("/stats/assignments", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def _wait_for_lock_wait(engine, thread: threading.Thread):
+    # Until the thread's statement is queued behind a lock, or has finished without one
+    deadline = time.monotonic() + 5
+    while thread.is_alive() and time.monotonic() < deadline:
+        with engine.connect() as connection:
+            waiting = connection.scalar(text(
+                "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND wait_event_type = 'Lock'"
+            ))
+        if waiting:
+            return
+        time.sleep(0.05)
+
+
+def test_submission_racing_its_students_delete_is_counted_once(pg_engine):
+    with pg_engine.begin() as connection:
+        student_id = connection.scalar(text(
+            "INSERT INTO students (id, name, email) VALUES (gen_random_uuid(), 'racer', 'racer@example.com') RETURNING id"
+        ))
+
+    def submit():
+        with pg_engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO assignments (id, student_id, subject) VALUES (gen_random_uuid(), :id, 'racing')"),
+                {"id": student_id},
+            )
+
+    # The soft delete is in progress, the submission's stats trigger has to wait for it
+    deleting = pg_engine.connect()
+    transaction = deleting.begin()
+    deleting.execute(text("UPDATE students SET deleted_at = now() WHERE id = :id"), {"id": student_id})
+    submitting = threading.Thread(target=submit)
+    submitting.start()
+    _wait_for_lock_wait(pg_engine, submitting)
+    transaction.commit()
+    deleting.close()
+    submitting.join()
+
+    with pg_engine.connect() as connection:
+        # Out of the subject counters, as every other submission of a deleted student
+        assert connection.scalar(text("SELECT submissions FROM assignment_subject_stats WHERE subject = 'racing'")) is None
+        assert connection.scalar(
+            text("SELECT submissions FROM assignment_student_stats WHERE student_id = :id"), {"id": student_id}
+        ) == 1
@@ -0,0 +1,65 @@
+import io, os, threading
+import pytest
+from fastapi import UploadFile
+from services import storage
+from services.storage import FileTooLargeError, LocalStorage, stream_upload_to_disk
+
+
+def upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="essay.pdf")
+
+
+@pytest.mark.anyio
+async def test_stream_upload_writes_the_whole_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 4)
+    path = tmp_path / "essay.pdf"
+    assert await stream_upload_to_disk(upload(b"0123456789"), str(path), max_size=10) == 10
+    assert path.read_bytes() == b"0123456789"
+    assert os.listdir(tmp_path) == ["essay.pdf"]
+
+
+@pytest.mark.anyio
+async def test_stream_upload_over_the_limit_leaves_nothing_behind(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 4)
+    with pytest.raises(FileTooLargeError):
+        await stream_upload_to_disk(upload(b"0123456789"), str(tmp_path / "essay.pdf"), max_size=9)
+    assert os.listdir(tmp_path) == []
+
+
+def test_put_file_copies_concurrently_without_hard_links(tmp_path, monkeypatch):
+    # Two threads storing the same content both get past the exists check
+    # and only move their copies into place once both are written
+    def no_link(source, target):
+        raise OSError("cross-device link")
+
+    barrier = threading.Barrier(2, timeout=5)
+    replace = os.replace
+
+    def replace_together(source, target):
+        barrier.wait()
+        replace(source, target)
+
+    monkeypatch.setattr(os, "link", no_link)
+    monkeypatch.setattr(os.path, "exists", lambda path: False)
+    monkeypatch.setattr(os, "replace", replace_together)
+    source = tmp_path / "source"
+    source.write_bytes(b"x" * 1024 * 1024)
+    store = LocalStorage(str(tmp_path / "store"))
+
+    errors = []
+
+    def put():
+        try:
+            store.put_file(str(source), "ab/cd/blob")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert (tmp_path / "store" / "ab" / "cd" / "blob").read_bytes() == source.read_bytes()
+    assert os.listdir(tmp_path / "store" / "ab" / "cd") == ["blob"]
@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import text
+import database, models
+from services.table_versions import fold_table_versions, read_table_versions
+
+
+def add_student(connection, name: str):
+    connection.execute(
+        text("INSERT INTO students (id, name, email) VALUES (gen_random_uuid(), :name, :name || '@example.com')"),
+        {"name": name},
+    )
+
+
+def summed_version(connection, key: str) -> int:
+    return connection.scalar(
+        text("SELECT coalesce(sum(version), 0) FROM table_versions WHERE table_name = :key"), {"key": key}
+    )
+
+
+@pytest.mark.anyio
+async def test_versions_are_summed_over_their_shards(db_schema):
+    with database.SessionLocal() as db:
+        db.add_all([
+            models.TableVersion(table_name="students", shard=101, version=4),
+            models.TableVersion(table_name="students", shard=102, version=3),
+            models.TableVersion(table_name="student:ada", shard=101, version=2),
+        ])
+        db.commit()
+
+    async with database.AsyncSessionLocal() as db:
+        assert await read_table_versions(db, ["students", "student:ada", "teachers", "student:grace"]) == [7, 2, 0, 0]
+
+
+def test_concurrent_writers_do_not_wait_for_each_other(pg_engine):
+    with pg_engine.connect() as connection:
+        before = summed_version(connection, "students")
+
+    # The first writer's transaction stays open, holding the version rows it bumped
+    first = pg_engine.connect()
+    transaction = first.begin()
+    add_student(first, "ada")
+    try:
+        with pg_engine.begin() as second:
+            # Fails with LockNotAvailable instead of waiting for the first commit
+            second.execute(text("SET LOCAL lock_timeout = '2s'"))
+            add_student(second, "grace")
+        transaction.commit()
+    finally:
+        first.close()
+
+    with pg_engine.connect() as connection:
+        assert summed_version(connection, "students") == before + 2
+        assert summed_version(connection, "student:ada") == 1
+        assert summed_version(connection, "student:grace") == 1
+
+
+def test_fold_keeps_the_sums_and_skips_rows_in_use(pg_engine):
+    with pg_engine.begin() as connection:
+        add_student(connection, "hopper")
+    with pg_engine.connect() as connection:
+        before = summed_version(connection, "students")
+
+    # A transaction in progress holds its backend's row
+    writing = pg_engine.connect()
+    transaction = writing.begin()
+    add_student(writing, "lovelace")
+    try:
+        with database.SessionLocal(bind=pg_engine) as db:
+            assert fold_table_versions(db) > 0
+        with pg_engine.connect() as connection:
+            assert summed_version(connection, "students") == before
+            assert connection.scalar(text(
+                "SELECT count(*) FROM table_versions WHERE shard <> 0 AND table_name = 'student:hopper'"
+            )) == 0
+        transaction.commit()
+    finally:
+        writing.close()
+
+    with pg_engine.connect() as connection:
+        assert summed_version(connection, "students") == before + 1
+        assert connection.scalar(text(
+            "SELECT count(*) FROM table_versions WHERE shard <> 0 AND table_name = 'students'"
+        )) == 1
@@ -0,0 +1,82 @@
+import uuid
+import pytest
+from services import upload_session
+from services.blob_store import FileTooLargeError
+from services.upload_session import OffsetMismatchError, SessionBusyError, SessionNotFoundError
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def session_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_session, "SESSION_DIR", str(tmp_path))
+
+
+def new_session(size: int = 10) -> uuid.UUID:
+    return uuid.UUID(upload_session.create_session({"size": size, "filename": "essay.pdf"})["id"])
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def test_chunks_resume_from_the_reported_offset():
+    session_id = new_session()
+    assert await upload_session.append_chunk(session_id, 0, chunks(b"0123")) == 4
+    assert upload_session.load_session(session_id)["offset"] == 4
+    assert await upload_session.append_chunk(session_id, 4, chunks(b"45", b"6789")) == 10
+    with open(upload_session.data_path(session_id), "rb") as f:
+        assert f.read() == b"0123456789"
+
+
+async def test_wrong_offset_reports_the_current_one():
+    session_id = new_session()
+    await upload_session.append_chunk(session_id, 0, chunks(b"0123"))
+    with pytest.raises(OffsetMismatchError) as error:
+        await upload_session.append_chunk(session_id, 2, chunks(b"23"))
+    assert error.value.offset == 4
+
+
+async def test_chunk_past_the_declared_size_is_dropped_whole():
+    session_id = new_session(size=6)
+    await upload_session.append_chunk(session_id, 0, chunks(b"0123"))
+    with pytest.raises(FileTooLargeError):
+        await upload_session.append_chunk(session_id, 4, chunks(b"4", b"56"))
+    assert upload_session.load_session(session_id)["offset"] == 4
+
+
+async def test_bytes_before_a_disconnect_are_kept():
+    async def disconnecting():
+        yield b"0123"
+        raise ConnectionError()
+
+    session_id = new_session()
+    with pytest.raises(ConnectionError):
+        await upload_session.append_chunk(session_id, 0, disconnecting())
+    assert upload_session.load_session(session_id)["offset"] == 4
+
+
+def test_only_one_claim_succeeds_until_released():
+    session_id = new_session()
+    upload_session.claim_session(session_id)
+    with pytest.raises(SessionBusyError):
+        upload_session.claim_session(session_id)
+    with pytest.raises(SessionNotFoundError):
+        upload_session.load_session(session_id)
+
+    upload_session.release_session(session_id)
+    assert upload_session.load_session(session_id)["offset"] == 0
+    upload_session.claim_session(session_id)
+
+
+def test_unknown_session_cannot_be_claimed():
+    with pytest.raises(SessionNotFoundError):
+        upload_session.claim_session(uuid.uuid4())
+
+
+def test_expired_sessions_are_purged():
+    session_id = new_session()
+    assert upload_session.purge_expired_sessions(now=upload_session.time.time() + upload_session.SESSION_TTL + 1) == 1
+    with pytest.raises(SessionNotFoundError):
+        upload_session.load_session(session_id)
@@ -0,0 +1,44 @@
+import io, zipfile
+from datetime import datetime
+import pytest
+from services import zip_export
+from services.zip_export import stream_zip
+
+FILES = {"a" * 64: b"first essay " * 100, "b" * 64: b"PK already zipped"}
+
+
+@pytest.fixture(autouse=True)
+def files(monkeypatch):
+    def open_assignment_file(blob_sha256, filename):
+        if blob_sha256 not in FILES:
+            raise FileNotFoundError(filename)
+        return io.BytesIO(FILES[blob_sha256])
+
+    monkeypatch.setattr(zip_export, "open_assignment_file", open_assignment_file)
+    monkeypatch.setattr(zip_export, "CHUNK_SIZE", 64)
+
+
+def entry(sha256, filename, student_name="ada"):
+    return {"blob_sha256": sha256, "filename": filename, "student_name": student_name, "submitted_at": datetime(2025, 3, 1, 9, 30)}
+
+
+def test_archive_streams_every_file():
+    chunks = list(stream_zip([
+        entry("a" * 64, "essay.pdf"),
+        entry("a" * 64, "essay.pdf"),
+        entry("b" * 64, "bundle.zip", student_name="grace"),
+    ]))
+    assert len(chunks) > 3
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["ada/essay.pdf", "ada/essay (1).pdf", "grace/bundle.zip"]
+        assert archive.read("ada/essay (1).pdf") == FILES["a" * 64]
+        assert archive.getinfo("ada/essay.pdf").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("grace/bundle.zip").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("ada/essay.pdf").date_time == (2025, 3, 1, 9, 30, 0)
+
+
+def test_missing_files_are_skipped():
+    data = b"".join(stream_zip([entry("c" * 64, "gone.pdf"), entry("a" * 64, "essay.pdf"), entry(None, None)]))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == ["ada/essay.pdf"]